@@ -0,0 +1,92 @@
+"""
+상품 페이지 조회 메모리 벤치마크
+
+로컬 교보문고 대역 서버의 아주 큰 상세 페이지(추천 목록 5만 개, 약 6MB)를
+동시에 N건 조회할 때의 최대 RSS 증가량을 잰다.
+본문 읽기 상한(KYOBO_MAX_PAGE_BYTES)을 둔 경우와 두지 않은 경우를 비교하며,
+측정마다 새 프로세스를 띄워서 이전 측정의 최대 RSS가 섞이지 않게 한다.
+
+    python bench_memory.py
+    python bench_memory.py --concurrency 1 4 16 --limit 1048576
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from kyobo_standin import PRODUCTS, product_url, start_standin
+
+LARGE_PRODUCT = max(PRODUCTS, key=lambda pid: PRODUCTS[pid].get("filler", 0))
+
+
+def peak_rss_mb():
+    """지금까지의 최대 RSS (MB, 리눅스 기준 ru_maxrss는 KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(base_url, concurrency):
+    """자식 프로세스: 동시에 concurrency건 조회하고 결과를 JSON 한 줄로 출력"""
+    import kyobo_extractor
+
+    url = product_url(base_url, LARGE_PRODUCT)
+    # 모듈/규칙 로딩 등 한 번만 드는 메모리는 기준값에 포함
+    kyobo_extractor.get_book_info_advanced(product_url(base_url, "S000000000001"), profile="local")
+    baseline = peak_rss_mb()
+
+    barrier = threading.Barrier(concurrency)
+
+    def lookup(_):
+        barrier.wait()
+        return kyobo_extractor.get_book_info_advanced(url, profile="local")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lookup, range(concurrency)))
+    peak = peak_rss_mb()
+    print(json.dumps({
+        "baseline_mb": baseline,
+        "peak_mb": peak,
+        "priced": sum(1 for info in results if info and info.get("price")),
+    }))
+
+
+def measure(base_url, concurrency, limit):
+    env = dict(os.environ, KYOBO_MAX_PAGE_BYTES=str(limit))
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", base_url, "--concurrency", str(concurrency)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="큰 상품 페이지 동시 조회 시 최대 RSS 측정")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8], help="동시 조회 수")
+    parser.add_argument("--limit", type=int, default=1024 * 1024, help="본문 읽기 상한 (바이트)")
+    parser.add_argument("--child", metavar="BASE_URL", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.concurrency[0])
+        return
+
+    server, base_url = start_standin()
+    try:
+        print(f"대역 서버: {base_url}, 상품 {LARGE_PRODUCT} (추천 목록 {PRODUCTS[LARGE_PRODUCT]['filler']:,}개)")
+        print(f"{'상한':<10}{'동시':>6}{'기준(MB)':>10}{'최대(MB)':>10}{'증가(MB)':>10}{'건당(MB)':>10}{'가격':>6}")
+        for limit in (0, args.limit):
+            label = "없음" if not limit else f"{limit / 1024 / 1024:.1f}MB"
+            for concurrency in args.concurrency:
+                r = measure(base_url, concurrency, limit)
+                delta = r["peak_mb"] - r["baseline_mb"]
+                print(f"{label:<10}{concurrency:>6}{r['baseline_mb']:>10.1f}{r['peak_mb']:>10.1f}"
+                      f"{delta:>10.1f}{delta / concurrency:>10.1f}{r['priced']:>4}/{concurrency}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
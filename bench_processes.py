@@ -0,0 +1,81 @@
+"""
+추출 워커 프로세스 벤치마크
+
+대역 서버와 같은 상품 페이지 HTML을 여러 장 만들어서
+  - 스레드 N개로 파싱 (GIL 때문에 코어를 하나만 씀)
+  - 추출 워커 프로세스 N개로 파싱 (parse_pages, KYOBO_EXTRACT_PROCESSES)
+의 초당 처리 페이지 수를 비교한다. 프로세스 풀은 프로세스당 하나이므로
+측정마다 새 프로세스를 띄운다.
+
+    python bench_processes.py
+    python bench_processes.py --workers 1 2 4 8 --pages 400
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import kyobo_extractor
+from kyobo_standin import PRODUCTS, make_product_page
+
+
+def make_pages(count):
+    """가격이 들어 있는 보통 크기 상품 페이지를 count장"""
+    products = [(pid, p) for pid, p in PRODUCTS.items() if p["behavior"] == "ok" and "filler" not in p]
+    return [make_product_page(*products[i % len(products)]) for i in range(count)]
+
+
+def run_child(mode, workers, pages, parser):
+    """자식 프로세스: 파싱 시간을 재고 결과를 JSON 한 줄로 출력"""
+    html = make_pages(pages)
+    if mode == "processes":
+        # 워커 시작 시간은 빼고 파싱만 재도록 한 번 먼저 돌림
+        kyobo_extractor.parse_pages(html[:workers], parser, processes=workers)
+        started = time.perf_counter()
+        results = kyobo_extractor.parse_pages(html, parser, processes=workers)
+    else:
+        kyobo_extractor.parse_pages(html[:1], parser, processes=0)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda page: kyobo_extractor.parse_pages([page], parser, processes=0)[0], html))
+    seconds = time.perf_counter() - started
+    print(json.dumps({
+        "pages_per_sec": pages / seconds,
+        "titled": sum(1 for info in results if info and info.get("title")),
+    }))
+
+
+def measure(mode, workers, pages, parser):
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode, "--workers", str(workers), "--pages", str(pages),
+         "--parser", parser],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스레드 / 추출 워커 프로세스 파싱 처리량 비교")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="스레드 / 프로세스 수")
+    parser.add_argument("--pages", type=int, default=200, help="파싱할 페이지 수")
+    parser.add_argument("--parser", default="enhanced", choices=sorted(kyobo_extractor.PARSERS))
+    parser.add_argument("--child", choices=["threads", "processes"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.workers[0], args.pages, args.parser)
+        return
+
+    print(f"CPU {os.cpu_count()}개, 페이지 {args.pages}장, 파서 {args.parser}")
+    print(f"{'방식':<12}{'수':>4}{'페이지/초':>12}{'추출':>8}")
+    for mode in ("threads", "processes"):
+        for workers in args.workers:
+            r = measure(mode, workers, args.pages, args.parser)
+            print(f"{mode:<12}{workers:>4}{r['pages_per_sec']:>12.1f}{r['titled']:>8}")
+
+
+if __name__ == "__main__":
+    main()
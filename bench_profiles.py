@@ -0,0 +1,110 @@
+"""
+추출 프로필 비교 벤치마크
+
+로컬 교보문고 대역 서버(kyobo_standin.py)에 대해 프로필(web / local / basic)별로
+조회 시간, 성공률, 가격 추출률을 측정하고, 파서별 순수 파싱 시간도 따로 잰다.
+
+    python bench_profiles.py --rounds 3
+    python bench_profiles.py --profiles web local
+"""
+import argparse
+import statistics
+import time
+
+import kyobo_extractor
+from kyobo_standin import PRODUCTS, make_product_page, product_url, products_api_url, start_standin
+
+
+def bench_lookup(base_url, profile, product_ids, rounds):
+    """프로필 하나로 상품들을 rounds번 조회한 결과 요약"""
+    timings, succeeded, priced = [], 0, 0
+    for _ in range(rounds):
+        for product_id in product_ids:
+            started = time.perf_counter()
+            book_info = kyobo_extractor.get_book_info_advanced(product_url(base_url, product_id), profile=profile)
+            timings.append((time.perf_counter() - started) * 1000)
+            if book_info:
+                succeeded += 1
+                priced += bool(book_info.get("price"))
+    total = len(timings)
+    return {
+        "profile": profile,
+        "lookups": total,
+        "success": succeeded / total,
+        "price": priced / total,
+        "mean_ms": statistics.mean(timings),
+        "p95_ms": sorted(timings)[max(0, int(total * 0.95) - 1)],
+    }
+
+
+def bench_json_batch(base_url, profile, product_ids, rounds):
+    """상품 API로 묶어서 조회하고 부족한 것만 HTML로 추출 (get_books_info)"""
+    timings, succeeded, priced = [], 0, 0
+    urls = [product_url(base_url, pid) for pid in product_ids]
+    for _ in range(rounds):
+        started = time.perf_counter()
+        results = kyobo_extractor.get_books_info(urls, profile=profile, api_url=products_api_url(base_url),
+                                                 use_cache=False)
+        # 배치 한 번의 시간을 URL 수로 나눠 URL당 시간으로 비교
+        timings.extend([(time.perf_counter() - started) * 1000 / len(urls)] * len(urls))
+        succeeded += sum(1 for info in results.values() if info)
+        priced += sum(1 for info in results.values() if info and info.get("price"))
+    total = len(timings)
+    return {
+        "profile": f"{profile}+api",
+        "lookups": total,
+        "success": succeeded / total,
+        "price": priced / total,
+        "mean_ms": statistics.mean(timings),
+        "p95_ms": sorted(timings)[max(0, int(total * 0.95) - 1)],
+    }
+
+
+def bench_parse(parser_name, rounds):
+    """네트워크 없이 파서만 측정 (상품 페이지당 평균 ms)"""
+    from bs4 import BeautifulSoup
+
+    parse = kyobo_extractor.PARSERS[parser_name]
+    pages = [make_product_page(pid, p) for pid, p in PRODUCTS.items() if p["behavior"] in ("ok", "flaky") and "filler" not in p]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            parse(BeautifulSoup(html, "html.parser"))
+    return (time.perf_counter() - started) * 1000 / (rounds * len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추출 프로필별 조회 성능 비교")
+    parser.add_argument("--rounds", type=int, default=3, help="상품별 반복 횟수")
+    parser.add_argument("--profiles", nargs="+", default=sorted(kyobo_extractor.PROFILES),
+                        choices=sorted(kyobo_extractor.PROFILES))
+    args = parser.parse_args()
+
+    server, base_url = start_standin()
+    try:
+        # 대역 서버 결과 유형별로 상품을 골고루 포함 (메모리 측정용 큰 페이지는 bench_memory.py에서)
+        product_ids = sorted(pid for pid, p in PRODUCTS.items() if "filler" not in p)
+        print(f"대역 서버: {base_url} (상품 {len(product_ids)}개 × {args.rounds}회)")
+        print(f"{'프로필':<12}{'조회':>6}{'성공률':>9}{'가격률':>9}{'평균(ms)':>11}{'p95(ms)':>11}")
+        results = [bench_lookup(base_url, name, product_ids, args.rounds) for name in args.profiles]
+        results += [bench_json_batch(base_url, name, product_ids, args.rounds) for name in args.profiles]
+        for r in results:
+            print(f"{r['profile']:<12}{r['lookups']:>6}{r['success']:>9.0%}{r['price']:>9.0%}"
+                  f"{r['mean_ms']:>11.1f}{r['p95_ms']:>11.1f}")
+
+        print("\n파서별 순수 파싱 시간 (페이지당)")
+        for name in sorted(kyobo_extractor.PARSERS):
+            print(f"  {name:<10}{bench_parse(name, args.rounds * 10):>8.2f} ms")
+
+        fastest = min(results, key=lambda r: (-r["price"], r["mean_ms"]))
+        print(f"\n가격 추출률 대비 가장 빠른 프로필: {fastest['profile']}")
+
+        stats = kyobo_extractor.fetch_stats()
+        print(f"페이지 요청 {stats['fetches']}회 / 조회 {stats['lookups']}회, 가격 누락 {stats['price_missing']}회, "
+              f"재요청 {stats['refetches']}회 (가격 찾음 {stats['refetch_recovered']}회)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+추출 서비스 부하 테스트
+
+교보문고 대역 서버(kyobo_standin.py)와 추출 서비스(extractor_service.py)를 각각
+새 프로세스로 띄우고, 클라이언트 스레드 N개가 정해진 시간 동안 요청을 보내서
+시나리오별 초당 요청 수와 지연 시간을 잰다.
+
+    시나리오  cached : GET /book (공유 캐시 적중)
+              fresh  : GET /book?fresh=1 (매번 대역 서버에서 HTML 추출)
+              batch  : POST /books (상품 전체를 한 요청으로)
+
+    python bench_service.py
+    python bench_service.py --clients 1 4 16 --duration 5 --api
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from kyobo_standin import PRODUCTS, product_url, products_api_url
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_process(args, ready_url, env=None, timeout=15):
+    """스크립트를 새 프로세스로 띄우고 ready_url이 응답할 때까지 기다림"""
+    process = subprocess.Popen([sys.executable, *args], cwd=HERE, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        try:
+            requests.get(ready_url, timeout=1)
+            return process
+        except requests.exceptions.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{args[0]} 시작 실패")
+
+
+def run_load(send, clients, duration):
+    """클라이언트 스레드 clients개가 duration초 동안 send(session) 반복 → 결과 요약"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        mine, failed = [], 0
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                ok = send(session)
+            except requests.exceptions.RequestException:
+                ok = False
+            if ok:
+                mine.append((time.perf_counter() - started) * 1000)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    ordered = sorted(latencies) or [0.0]
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(ordered),
+        "p95_ms": ordered[max(0, int(len(ordered) * 0.95) - 1)],
+        "errors": errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추출 서비스 초당 요청 수 측정")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16], help="동시 클라이언트 수")
+    parser.add_argument("--duration", type=float, default=3.0, help="시나리오별 측정 시간 (초)")
+    parser.add_argument("--scenarios", nargs="+", default=["cached", "fresh", "batch"],
+                        choices=["cached", "fresh", "batch"])
+    parser.add_argument("--api", action="store_true", help="대역 서버의 상품 JSON API도 사용")
+    args = parser.parse_args()
+
+    standin_port, service_port = free_port(), free_port()
+    standin_url = f"http://127.0.0.1:{standin_port}"
+    service_url = f"http://127.0.0.1:{service_port}"
+    cache_dir = tempfile.mkdtemp(prefix="kyobo_service_bench_")
+    env = dict(os.environ, KYOBO_CACHE_PATH=os.path.join(cache_dir, "cache.sqlite3"))
+
+    service_args = ["extractor_service.py", "--port", str(service_port), "--profile", "local"]
+    if args.api:
+        service_args += ["--api-url", products_api_url(standin_url)]
+    processes = []
+    try:
+        processes.append(start_process(["kyobo_standin.py", "--port", str(standin_port)],
+                                       f"{standin_url}/search", env))
+        processes.append(start_process(service_args, f"{service_url}/health", env))
+
+        # 정상 응답하는 보통 크기 상품만 (가격을 찾는 상품이어야 캐시에 적중)
+        urls = [product_url(standin_url, pid) for pid, p in sorted(PRODUCTS.items())
+                if p["behavior"] == "ok" and p["price_in"] != "none" and "filler" not in p]
+        counter = iter(range(10 ** 9))
+
+        def send_single(fresh):
+            def send(session):
+                url = urls[next(counter) % len(urls)]
+                params = {"url": url, "fresh": "1"} if fresh else {"url": url}
+                response = session.get(f"{service_url}/book", params=params, timeout=30)
+                return response.status_code == 200 and response.json()["book"] is not None
+            return send
+
+        def send_batch(session):
+            response = session.post(f"{service_url}/books", json={"urls": urls}, timeout=30)
+            return response.status_code == 200 and all(response.json()["results"].values())
+
+        scenarios = {"cached": send_single(False), "fresh": send_single(True), "batch": send_batch}
+        # 캐시 시나리오가 처음부터 적중하도록 한 번씩 미리 조회
+        requests.post(f"{service_url}/books", json={"urls": urls}, timeout=60)
+
+        print(f"대역 서버 {standin_url}, 추출 서비스 {service_url}, 상품 {len(urls)}개, "
+              f"상품 API {'사용' if args.api else '안 씀'}")
+        print(f"{'시나리오':<10}{'클라이언트':>8}{'요청/초':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'오류':>6}")
+        for name in args.scenarios:
+            for clients in args.clients:
+                r = run_load(scenarios[name], clients, args.duration)
+                print(f"{name:<10}{clients:>8}{r['rps']:>10.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+                      f"{r['errors']:>6}")
+
+        health = requests.get(f"{service_url}/health", timeout=5).json()
+        print(f"\n서비스 캐시: {health['cache']}")
+        print(f"서비스 페이지 요청: {health['fetch']}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+콜드 스타트 벤치마크
+
+kyobobook.py에서 로그인 화면이 그려지기 전에 실행되는 모듈 수준 import만 모아서
+새 파이썬 프로세스에서 import 시간을 측정하고, 무거운 모듈이 로그인 전에
+import 되지 않는지 확인한다.
+
+사용법:
+    python bench_startup.py                 # 기본 기준(ms)으로 검사
+    python bench_startup.py --max-ms 1500   # 로그인 전 import 허용 시간 지정
+"""
+import argparse
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+APP_PATH = Path(__file__).with_name("kyobobook.py")
+
+# 로그인 이후(실제로 쓰는 함수 안)에서만 import 해야 하는 모듈
+HEAVY_MODULES = ["requests", "bs4", "pandas", "gspread", "google.oauth2.service_account", "pytz"]
+
+
+def _is_login_gate(node):
+    """st.login(...)을 호출하는 최상위 if 문인지 확인"""
+    if not isinstance(node, ast.If):
+        return False
+    for child in ast.walk(node):
+        if isinstance(child, ast.Attribute) and child.attr == "login":
+            return True
+    return False
+
+
+def pre_login_imports(path=APP_PATH):
+    """로그인 체크 전까지 모듈 수준에서 import 되는 모듈 목록"""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    modules = []
+    for node in tree.body:
+        if _is_login_gate(node):
+            break
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return modules
+
+
+def measure_import_ms(modules):
+    """새 프로세스에서 주어진 모듈들을 import 하는 데 걸린 시간 (ms), 실패 시 None"""
+    code = (
+        "import time\n"
+        "t = time.perf_counter()\n"
+        + "".join(f"import {name}\n" for name in modules)
+        + "print((time.perf_counter() - t) * 1000)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=APP_PATH.parent)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로그인 화면 콜드 스타트 import 시간 측정")
+    parser.add_argument("--max-ms", type=float, default=1500.0,
+                        help="로그인 전 import에 허용할 최대 시간 (ms)")
+    args = parser.parse_args()
+
+    modules = pre_login_imports()
+    print(f"로그인 전 import: {', '.join(modules)}")
+
+    failed = False
+    eager_heavy = [m for m in modules if m in HEAVY_MODULES]
+    if eager_heavy:
+        print(f"❌ 로그인 전에 무거운 모듈을 import 함: {', '.join(eager_heavy)}")
+        failed = True
+
+    pre_login_ms = measure_import_ms(modules)
+    if pre_login_ms is None:
+        print("⚠️ 로그인 전 모듈을 import 할 수 없습니다 (설치 여부 확인)")
+    else:
+        print(f"로그인 전 import 시간: {pre_login_ms:.1f} ms (기준 {args.max_ms:.0f} ms)")
+        if pre_login_ms > args.max_ms:
+            failed = True
+
+    # 참고용: 지연 로딩되는 모듈 각각의 import 비용
+    for name in HEAVY_MODULES:
+        ms = measure_import_ms([name])
+        print(f"  지연 로딩 {name}: " + ("설치되지 않음" if ms is None else f"{ms:.1f} ms"))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
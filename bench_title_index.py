@@ -0,0 +1,77 @@
+"""
+도서명 자동완성 인덱스 벤치마크
+
+가짜 도서 N건으로 TitleIndex를 만들고 접두어/부분/오타 검색 시간을 측정한다.
+
+    python bench_title_index.py --size 50000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from title_index import TitleIndex
+
+_SYLLABLES = [chr(0xAC00 + i * 97) for i in range(120)]
+_FAMILY = ["김", "이", "박", "최", "정", "강", "조", "윤", "장", "임"]
+_PUBLISHERS = ["한빛미디어", "위키북스", "길벗", "인사이트", "이지스퍼블리싱"]
+
+
+def make_books(size, seed=0):
+    """음절을 무작위로 이어 붙인 도서명(2~4단어)과 저자명으로 가짜 도서 목록 생성"""
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(rng.choices(_SYLLABLES, k=rng.randint(2, 4)))
+
+    return [
+        {
+            "title": " ".join(word() for _ in range(rng.randint(2, 4))),
+            "author": rng.choice(_FAMILY) + "".join(rng.choices(_SYLLABLES, k=2)),
+            "publisher": rng.choice(_PUBLISHERS),
+            "price": str(rng.randrange(10000, 50000, 100)),
+        }
+        for _ in range(size)
+    ]
+
+
+def _typo(text, rng):
+    """글자 하나를 빼서 오타 흉내"""
+    if len(text) < 4:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="도서명 자동완성 인덱스 검색 시간 측정")
+    parser.add_argument("--size", type=int, default=50000, help="색인할 도서 수")
+    parser.add_argument("--queries", type=int, default=200, help="검색 유형별 쿼리 수")
+    args = parser.parse_args()
+
+    books = make_books(args.size)
+    started = time.perf_counter()
+    index = TitleIndex(books)
+    print(f"색인: {len(index):,}건, {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    rng = random.Random(1)
+    samples = rng.sample(books, args.queries)
+    cases = {
+        "접두어": [b["title"][:5] for b in samples],
+        "부분": [b["title"].split(" ", 1)[1] for b in samples],
+        "오타": [_typo(b["title"], rng) for b in samples],
+    }
+    print(f"{'유형':<8}{'평균(ms)':>10}{'p95(ms)':>10}{'적중률':>8}")
+    for name, queries in cases.items():
+        timings, hits = [], 0
+        for query, book in zip(queries, samples):
+            t = time.perf_counter()
+            results = index.search(query)
+            timings.append((time.perf_counter() - t) * 1000)
+            hits += any(r["title"] == book["title"] for r in results)
+        p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"{name:<8}{statistics.mean(timings):>10.2f}{p95:>10.2f}{hits / len(queries):>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+추출한 도서 정보 로컬 캐시
+
+한 번이라도 추출한 상품은 SQLite 파일에 상품번호 기준으로 저장하고 ISBN으로도 찾을 수
+있게 인덱스를 둔다. 여러 세션/프로세스가 같은 파일을 함께 쓴다.
+상품 페이지의 ETag/Last-Modified도 함께 저장해서 가격 재확인 시 조건부 요청에 쓴다.
+경로는 KYOBO_CACHE_PATH로 바꿀 수 있다.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.getenv(
+    "KYOBO_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "kyobo_cache.sqlite3"),
+)
+
+BOOK_FIELDS = ["title", "author", "publisher", "price", "isbn", "extraction_method"]
+
+
+def normalize_isbn(value):
+    """
+    ISBN-10 / ISBN-13(하이픈, 공백 포함)을 ISBN-13 숫자 문자열로 정규화
+    ISBN 형식이 아니면 None
+    """
+    digits = re.sub(r"[\s-]", "", str(value or "")).upper()
+    if re.fullmatch(r"\d{13}", digits):
+        return digits
+    if re.fullmatch(r"\d{9}[\dX]", digits):
+        core = "978" + digits[:9]
+        total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(core))
+        return core + str((10 - total % 10) % 10)
+    return None
+
+
+class BookCache:
+    """상품번호 → 도서 정보 (ISBN 인덱스 포함)"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            # 여러 프로세스가 동시에 읽을 수 있도록 WAL 사용
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS products ("
+                " product_id TEXT PRIMARY KEY, url TEXT, isbn TEXT,"
+                " title TEXT, author TEXT, publisher TEXT, price TEXT,"
+                " extraction_method TEXT, updated_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS products_isbn ON products(isbn)")
+            # 예전 캐시 파일에는 조건부 요청용 컬럼이 없음
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(products)")}
+            for column in ("etag", "last_modified"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE products ADD COLUMN {column} TEXT")
+
+    @staticmethod
+    def _to_info(row):
+        if row is None:
+            return None
+        info = {field: row[field] or "" for field in BOOK_FIELDS}
+        info["original_price"] = ""
+        info["url"] = row["url"]
+        info["product_id"] = row["product_id"]
+        info["updated_at"] = row["updated_at"]
+        return info
+
+    def put(self, product_id, url, info):
+        """
+        추출 결과 저장 (이미 있으면 비어 있지 않은 값만 덮어씀)
+        갱신 시각은 가격을 추출했을 때만 바꾼다 (가격 추출에 실패한 결과로 예전 가격이
+        방금 확인한 값처럼 보이지 않도록, 가격이 없는 새 항목은 오래된 것으로 저장)
+        """
+        if not info:
+            return
+        values = {field: str(info.get(field) or "") for field in BOOK_FIELDS}
+        values["isbn"] = normalize_isbn(values["isbn"]) or ""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO products (product_id, url, isbn, title, author, publisher, price,"
+                " extraction_method, updated_at)"
+                " VALUES (:product_id, :url, :isbn, :title, :author, :publisher, :price,"
+                " :extraction_method, :updated_at)"
+                " ON CONFLICT(product_id) DO UPDATE SET"
+                " url = excluded.url,"
+                " isbn = COALESCE(NULLIF(excluded.isbn, ''), products.isbn),"
+                " title = COALESCE(NULLIF(excluded.title, ''), products.title),"
+                " author = COALESCE(NULLIF(excluded.author, ''), products.author),"
+                " publisher = COALESCE(NULLIF(excluded.publisher, ''), products.publisher),"
+                " price = COALESCE(NULLIF(excluded.price, ''), products.price),"
+                " extraction_method = excluded.extraction_method,"
+                " updated_at = CASE WHEN excluded.price = '' THEN products.updated_at"
+                " ELSE excluded.updated_at END",
+                dict(values, product_id=product_id or url, url=url,
+                     updated_at=time.time() if values["price"] else 0),
+            )
+
+    def validators(self, product_id):
+        """조건부 요청에 쓸 (ETag, Last-Modified), 없으면 빈 문자열"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM products WHERE product_id = ?", (product_id,)
+            ).fetchone()
+        if row is None:
+            return "", ""
+        return row["etag"] or "", row["last_modified"] or ""
+
+    def set_validators(self, product_id, etag, last_modified):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE products SET etag = ?, last_modified = ? WHERE product_id = ?",
+                (etag or "", last_modified or "", product_id),
+            )
+
+    def get(self, product_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM products WHERE product_id = ?", (product_id,)).fetchone()
+        return self._to_info(row)
+
+    def lookup(self, product_id, max_age=None, require=()):
+        """
+        읽기 통과(read-through) 조회: max_age(초)보다 오래됐거나 require 필드가 비어 있는
+        항목은 없는 것으로 본다. 적중/실패 횟수를 센다
+        """
+        info = self.get(product_id)
+        if info and max_age is not None and time.time() - (info["updated_at"] or 0) > max_age:
+            info = None
+        if info and not all(info.get(field) for field in require):
+            info = None
+        with self._lock:
+            if info:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return info
+
+    def is_fresh(self, product_id, max_age):
+        """max_age(초) 안에 갱신된 항목이 있는지 (적중률에는 세지 않음)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at FROM products WHERE product_id = ?", (product_id,)
+            ).fetchone()
+        return row is not None and time.time() - (row["updated_at"] or 0) <= max_age
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def get_by_isbn(self, isbn):
+        isbn = normalize_isbn(isbn)
+        if not isbn:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM products WHERE isbn = ? ORDER BY updated_at DESC LIMIT 1", (isbn,)
+            ).fetchone()
+        return self._to_info(row)
+
+    def all(self):
+        """저장된 모든 도서 정보 (최근 갱신 순)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM products ORDER BY updated_at DESC").fetchall()
+        return [self._to_info(row) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path=None):
+    """경로별로 BookCache 하나만 만들어서 공유"""
+    path = path or CACHE_PATH
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = BookCache(path)
+        return _caches[path]
@@ -0,0 +1,278 @@
+"""
+교보문고 도서 정보 추출 서비스 (로컬 HTTP/JSON API)
+
+추출 엔진(kyobo_extractor)과 로컬 캐시를 작은 HTTP 서버로 띄워서
+Streamlit 앱과 다른 내부 도구가 같은 캐시와 연결 풀을 나눠 쓰게 한다.
+
+    GET  /health                      상태, 캐시/페이지 요청 통계
+    GET  /book?url=<상품 URL>          도서 하나 (캐시 → 상품 API → HTML 추출)
+    GET  /book?isbn=<ISBN>             ISBN으로 도서 하나
+    POST /books  {"urls": [...]}       여러 도서 한꺼번에 (최대 MAX_BATCH개)
+
+/book, /books 모두 deadline(초)을 넘기면 그 시간 안에서만 조회하고,
+fresh=1(/books는 "fresh": true)이면 캐시를 건너뛰고 새로 추출한다.
+앱은 KYOBO_SERVICE_URL이 설정되어 있으면 이 서비스에 묻는다.
+
+    python extractor_service.py --port 8766
+    python extractor_service.py --port 8766 --profile local --pool-size 16
+"""
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import kyobo_extractor
+from book_cache import get_cache
+
+SERVICE_URL = os.getenv("KYOBO_SERVICE_URL")  # 예: http://127.0.0.1:8766
+MAX_BATCH = 100          # /books 요청 한 번에 받을 URL 수
+MAX_DEADLINE = 120       # 요청자가 줄 수 있는 최대 시간 예산 (초)
+POOL_SIZE = 16           # 교보문고로 가는 연결 풀 크기
+REQUEST_QUEUE_SIZE = 64  # 처리 전 대기할 수 있는 연결 수 (listen backlog, 기본 5면 동시 접속 시 연결이 끊김)
+
+
+class ServiceUnavailable(Exception):
+    """추출 서비스에 연결할 수 없거나 서비스가 오류를 돌려준 경우"""
+
+
+# ==================== 서버 ====================
+def make_adapter(pool_size=POOL_SIZE):
+    """모든 요청 스레드가 나눠 쓸 연결 풀 (HTTPAdapter)"""
+    from requests.adapters import HTTPAdapter
+
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+
+def _deadline(value):
+    """요청의 deadline 값(초) → Deadline (없거나 잘못된 값이면 None = 프로필 기본값)"""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return kyobo_extractor.Deadline(min(max(seconds, 1.0), MAX_DEADLINE)) if seconds > 0 else None
+
+
+class ExtractorHandler(BaseHTTPRequestHandler):
+    """추출 서비스 요청 처리 (서버 설정은 self.server의 속성으로 받음)"""
+
+    def log_message(self, format, *args):
+        # 요청마다 찍히는 접근 로그는 끔 (오류는 엔진 로그로 남음)
+        pass
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _engine_options(self):
+        return {
+            "profile": self.server.profile,
+            "api_url": self.server.api_url,
+            "session": self.server.session(),
+        }
+
+    def _handle_health(self):
+        self._send_json(200, {
+            "ok": True,
+            "profile": self.server.profile,
+            "cache": get_cache().stats(),
+            "fetch": kyobo_extractor.fetch_stats(),
+        })
+
+    def _handle_book(self, query):
+        params = {name: values[0] for name, values in parse_qs(query).items()}
+        deadline = _deadline(params.get("deadline"))
+        diagnostics = {}
+        if params.get("isbn"):
+            if not kyobo_extractor.normalize_isbn(params["isbn"]):
+                self._send_json(400, {"error": "ISBN 형식이 아닙니다"})
+                return
+            book_info = kyobo_extractor.get_book_info_by_isbn(params["isbn"], search_url=self.server.search_url,
+                                                              deadline=deadline, **self._engine_options())
+            url = book_info["url"] if book_info else None
+        elif params.get("url"):
+            url = params["url"]
+            book_info = kyobo_extractor.get_books_info([url], deadline=deadline, diagnostics=diagnostics, workers=1,
+                                                       use_cache=params.get("fresh") != "1",
+                                                       **self._engine_options())[url]
+        else:
+            self._send_json(400, {"error": "url 또는 isbn이 필요합니다"})
+            return
+        self._send_json(200, {"url": url, "book": book_info, "diagnostics": diagnostics.get(url)})
+
+    def _handle_books(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            urls = [str(url) for url in payload.get("urls", [])]
+        except (ValueError, AttributeError, TypeError):
+            self._send_json(400, {"error": "JSON 본문 {\"urls\": [...]}이 필요합니다"})
+            return
+        if not urls or len(urls) > MAX_BATCH:
+            self._send_json(400, {"error": f"urls는 1~{MAX_BATCH}개여야 합니다"})
+            return
+        diagnostics = {}
+        results = kyobo_extractor.get_books_info(urls, deadline=_deadline(payload.get("deadline")),
+                                                 diagnostics=diagnostics, workers=self.server.workers,
+                                                 use_cache=not payload.get("fresh"), **self._engine_options())
+        self._send_json(200, {"results": results, "diagnostics": diagnostics})
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        try:
+            if parts.path == "/health":
+                self._handle_health()
+            elif parts.path == "/book":
+                self._handle_book(parts.query)
+            else:
+                self._send_json(404, {"error": "Not Found"})
+        except Exception as e:
+            kyobo_extractor.default_log("error", f"추출 서비스 오류 ({self.path}): {e}")
+            self._send_json(500, {"error": str(e)})
+
+    def do_POST(self):
+        try:
+            if urlsplit(self.path).path == "/books":
+                self._handle_books()
+            else:
+                self._send_json(404, {"error": "Not Found"})
+        except Exception as e:
+            kyobo_extractor.default_log("error", f"추출 서비스 오류 ({self.path}): {e}")
+            self._send_json(500, {"error": str(e)})
+
+
+class ExtractorServer(ThreadingHTTPServer):
+    """요청마다 스레드 하나, 대기 연결은 REQUEST_QUEUE_SIZE개까지"""
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+    def session(self):
+        """
+        이 요청 스레드의 requests.Session
+        쿠키 등 Session 상태는 스레드마다 따로 두고 연결 풀(adapter)만 모든 스레드가 나눠 쓴다
+        (Session.close()는 공유 adapter까지 닫으므로 닫지 않는다)
+        """
+        import requests
+
+        session = getattr(self.sessions, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self.sessions.session = session
+        return session
+
+
+def make_server(host="127.0.0.1", port=0, profile=None, api_url=None, search_url=None, workers=4,
+                pool_size=POOL_SIZE):
+    """추출 서비스 서버 생성 (serve_forever는 호출한 쪽에서)"""
+    server = ExtractorServer((host, port), ExtractorHandler)
+    server.daemon_threads = True
+    server.profile = profile
+    server.api_url = api_url
+    server.search_url = search_url
+    server.workers = workers
+    server.adapter = make_adapter(pool_size)
+    server.sessions = threading.local()
+    return server
+
+
+# ==================== 클라이언트 (앱에서 사용) ====================
+def _is_connection_reset(exc):
+    """requests 예외의 원인 중에 ConnectionResetError가 있는지"""
+    pending, seen = [exc], set()
+    while pending:
+        exc = pending.pop()
+        if exc is None or id(exc) in seen:
+            continue
+        if isinstance(exc, ConnectionResetError):
+            return True
+        seen.add(id(exc))
+        # urllib3/requests는 원래 예외를 args나 __cause__에 담아서 감싼다
+        pending += [arg for arg in exc.args if isinstance(arg, BaseException)]
+        pending += [exc.__cause__, exc.__context__]
+    return False
+
+
+def _request(method, path, service_url=None, deadline=None, **kwargs):
+    """
+    서비스 호출 → JSON 응답 (연결 실패 / 오류 응답이면 ServiceUnavailable)
+    서비스가 바빠서 연결이 끊기면(ConnectionResetError) 한 번 다시 보낸다
+    """
+    import requests
+
+    service_url = (service_url or SERVICE_URL or "").rstrip("/")
+    if not service_url:
+        raise ServiceUnavailable("KYOBO_SERVICE_URL이 설정되지 않았습니다")
+    # 서비스가 예산을 다 쓰고 응답할 시간만큼 여유를 둔다
+    read_timeout = deadline.remaining() + 5 if deadline else MAX_DEADLINE
+    for attempt in range(2):
+        try:
+            response = requests.request(method, f"{service_url}{path}",
+                                        timeout=(kyobo_extractor.CONNECT_TIMEOUT, read_timeout), **kwargs)
+            data = response.json()
+            break
+        except requests.exceptions.ConnectionError as e:
+            if attempt == 0 and _is_connection_reset(e):
+                continue
+            raise ServiceUnavailable(str(e))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise ServiceUnavailable(str(e))
+    if response.status_code != 200:
+        raise ServiceUnavailable(data.get("error") or f"HTTP {response.status_code}")
+    return data
+
+
+def service_lookup(kyobo_url=None, isbn=None, service_url=None, deadline=None):
+    """
+    서비스에 도서 하나 조회
+    반환: (도서 정보 또는 None, 응답 요약 또는 None) — ISBN 조회면 도서 정보에 "url" 포함
+    """
+    params = {"isbn": isbn} if isbn else {"url": kyobo_url}
+    if deadline:
+        params["deadline"] = f"{deadline.remaining():.1f}"
+    data = _request("GET", "/book", service_url, deadline, params=params)
+    return data.get("book"), data.get("diagnostics")
+
+
+def service_lookup_many(urls, service_url=None, deadline=None):
+    """서비스에 여러 도서 조회 → ({URL: 도서 정보 또는 None}, {URL: 응답 요약})"""
+    results, diagnostics = {}, {}
+    urls = list(urls)
+    for start in range(0, len(urls), MAX_BATCH):
+        payload = {"urls": urls[start:start + MAX_BATCH]}
+        if deadline:
+            payload["deadline"] = deadline.remaining()
+        data = _request("POST", "/books", service_url, deadline, json=payload)
+        results.update(data.get("results", {}))
+        diagnostics.update(data.get("diagnostics", {}))
+    return results, diagnostics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="교보문고 도서 정보 추출 서비스 실행")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--profile", choices=sorted(kyobo_extractor.PROFILES), default=None,
+                        help="추출 프로필 (기본: 환경에 맞게 자동 선택)")
+    parser.add_argument("--api-url", default=None, help="상품 JSON API 주소 (기본: KYOBO_PRODUCT_API_URL)")
+    parser.add_argument("--search-url", default=None, help="ISBN 검색 주소 (기본: KYOBO_SEARCH_URL)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="/books 요청 하나의 동시 HTML 추출 수")
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help="교보문고 연결 풀 크기")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, profile=args.profile, api_url=args.api_url,
+                         search_url=args.search_url, workers=args.workers, pool_size=args.pool_size)
+    print(f"추출 서비스: http://{args.host}:{server.server_address[1]} (캐시 {get_cache().path})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1291 @@
+"""
+교보문고 도서 정보 추출 엔진
+
+Streamlit 없이도 동작하도록 화면 출력 대신 log(level, message) 콜백을 사용한다.
+level은 "debug" / "info" / "warning" / "error" 중 하나이며, 콜백을 넘기지 않으면
+표준 logging 모듈로 기록한다.
+
+명령줄에서 URL 목록을 한꺼번에 조회할 수도 있다:
+    python kyobo_extractor.py urls.txt -o results.jsonl --workers 4
+"""
+import argparse
+import json
+import logging
+import numbers
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from book_cache import get_cache, normalize_isbn
+
+# requests / bs4는 실제로 조회할 때 import (Streamlit 로그인 화면 속도 유지)
+
+logger = logging.getLogger("kyobo_extractor")
+
+_LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+def default_log(level, message):
+    """콜백을 넘기지 않았을 때 사용하는 기본 로그 함수"""
+    logger.log(_LOG_LEVELS.get(level, logging.INFO), message)
+
+def to_int(value):
+    """'12,000', '12000원', 12000.0, '12000.0' 같은 값을 정수로 변환 (실패 시 0)"""
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, numbers.Number):
+        return 0 if value != value else int(value)  # NaN 처리
+    digits = re.sub(r"[^\d.-]", "", str(value))
+    try:
+        return int(float(digits)) if digits else 0
+    except ValueError:
+        return 0
+
+# ==================== 선언형 추출 규칙 ====================
+# 가격/메타데이터를 어디서 어떤 순서로 찾을지는 extraction_rules.json에 정의하고
+# 시작할 때 한 번 컴파일한다. 파일이 바뀌면 다음 추출 때 다시 컴파일한다(핫 리로드).
+RULES_PATH = os.getenv("KYOBO_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "extraction_rules.json"))
+
+_NUMBER_PATTERN = re.compile(r'[\d,]+')
+
+
+class _Document:
+    """규칙 평가 중 한 번만 계산하면 되는 값들 (JSON-LD 객체 목록, 페이지 텍스트)"""
+
+    def __init__(self, soup, log, debug):
+        self.soup = soup
+        self.log = log
+        self.debug = debug
+        self._jsonld = None
+        self._text = None
+
+    @property
+    def jsonld(self):
+        if self._jsonld is None:
+            self._jsonld = []
+            for script in self.soup.find_all("script", type="application/ld+json"):
+                try:
+                    data = json.loads(script.string)
+                except Exception as e:
+                    if self.debug:
+                        self.log("debug", f"[DEBUG] JSON-LD 파싱 오류: {e}")
+                    continue
+                # 리스트 형태의 JSON-LD는 펼쳐서 저장
+                for item in (data if isinstance(data, list) else [data]):
+                    if isinstance(item, dict):
+                        self._jsonld.append(item)
+        return self._jsonld
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = self.soup.get_text()
+        return self._text
+
+
+def _walk_path(value, parts):
+    """'a.b[].c' 형태 경로를 따라가며 값들을 차례로 돌려준다"""
+    if not parts:
+        yield value
+        return
+    part, rest = parts[0], parts[1:]
+    is_list = part.endswith("[]")
+    key = part[:-2] if is_list else part
+    if not isinstance(value, dict) or key not in value:
+        return
+    child = value[key]
+    if is_list:
+        if isinstance(child, list):
+            for item in child:
+                yield from _walk_path(item, rest)
+    else:
+        yield from _walk_path(child, rest)
+
+
+# ---------- 값 변환 (필드별 "value") ----------
+def _as_text(raw):
+    return str(raw).strip()
+
+def _as_name(raw):
+    if isinstance(raw, dict):
+        return str(raw.get("name", "")).strip()
+    return str(raw).strip()
+
+def _as_names(raw):
+    if isinstance(raw, list):
+        return ", ".join([a.get("name", "") for a in raw if isinstance(a, dict)])
+    return _as_name(raw)
+
+def _as_price(raw):
+    price = str(raw).replace(",", "").strip()
+    if re.fullmatch(r"\d+(\.\d+)?", price):
+        return str(int(float(price)))
+    return ""
+
+VALUE_CONVERTERS = {
+    "text": _as_text,
+    "name": _as_name,
+    "names": _as_names,
+    "price": _as_price,
+}
+
+
+# ---------- 규칙 종류별 컴파일 ----------
+def _in_range(value, bounds):
+    return bounds is None or (value.isdigit() and bounds[0] <= int(value) <= bounds[1])
+
+def _compile_jsonld(rule, convert):
+    parts = rule["path"].split(".")
+    wanted_type = rule.get("jsonld_type")
+
+    def match(doc):
+        for data in doc.jsonld:
+            if wanted_type and data.get("@type") != wanted_type:
+                continue
+            for raw in _walk_path(data, parts):
+                value = convert(raw) if raw not in (None, "") else ""
+                if value:
+                    return value
+        return ""
+    return match
+
+def _compile_meta(rule, convert):
+    prop = rule["property"]
+
+    def match(doc):
+        tag = doc.soup.find("meta", property=prop)
+        if tag and tag.get("content"):
+            return convert(tag["content"])
+        return ""
+    return match
+
+def _compile_tag_text(rule, convert):
+    tag_name = rule["tag"]
+
+    def match(doc):
+        tag = doc.soup.find(tag_name)
+        return convert(tag.get_text()) if tag else ""
+    return match
+
+def _compile_selector(rule, convert):
+    css = rule["css"]
+    bounds = rule.get("range")                        # 텍스트에서 찾은 숫자에만 적용
+    attribute_bounds = rule.get("data_price_range")   # data-price 속성 값 (기본: 범위 확인 안 함)
+    numeric = convert is _as_price
+
+    def match(doc):
+        for element in doc.soup.select(css):
+            if numeric:
+                # data-price 속성 우선 (추출 방법 이름에 "(data-price)"를 붙임)
+                if element.get("data-price"):
+                    price = convert(element["data-price"])
+                    if price and _in_range(price, attribute_bounds):
+                        return price, "data-price"
+                # 텍스트에서 숫자(쉼표 포함)만 추출
+                for num in _NUMBER_PATTERN.findall(element.get_text(strip=True)):
+                    price = convert(num)
+                    if price and _in_range(price, bounds):
+                        return price
+            else:
+                value = convert(element.get_text(strip=True))
+                if value:
+                    return value
+        return ""
+    return match
+
+def _compile_regex(rule, convert):
+    pattern = re.compile(rule["pattern"])
+    bounds = rule.get("range")
+
+    def match(doc):
+        for found in pattern.finditer(doc.text):
+            value = convert(found.group(1))
+            if value and _in_range(value, bounds):
+                return value
+        return ""
+    return match
+
+RULE_COMPILERS = {
+    "jsonld": _compile_jsonld,
+    "meta": _compile_meta,
+    "tag_text": _compile_tag_text,
+    "selector": _compile_selector,
+    "regex": _compile_regex,
+}
+
+
+class RuleSet:
+    """
+    컴파일된 추출 규칙 묶음
+    필드마다 규칙을 순서대로 평가하고 처음 값을 찾은 규칙에서 멈춘다.
+    규칙은 값 또는 (값, 세부 출처)를 돌려주고, 세부 출처가 있으면 "규칙 이름 (세부 출처)"로 보고한다.
+    규칙별 평가 횟수, 적중 횟수, 누적 시간을 기록한다.
+    """
+
+    def __init__(self, config, source=None, mtime=None):
+        self.source = source
+        self.mtime = mtime
+        self.version = config.get("version")
+        self.fields = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        for field, spec in config["fields"].items():
+            convert = VALUE_CONVERTERS[spec.get("value", "text")]
+            compiled = []
+            for rule in spec["rules"]:
+                if rule["type"] not in RULE_COMPILERS:
+                    raise ValueError(f"알 수 없는 규칙 종류: {rule['type']} ({field}/{rule.get('name')})")
+                matcher = RULE_COMPILERS[rule["type"]](rule, convert)
+                strip = rule.get("strip", [])
+                compiled.append((rule["name"], matcher, strip))
+                self._stats[(field, rule["name"])] = {"evaluations": 0, "hits": 0, "total_ms": 0.0}
+            self.fields[field] = compiled
+
+    def extract(self, doc, field):
+        """(값, 규칙 이름) 반환, 못 찾으면 ("", "")"""
+        for name, matcher, strip in self.fields.get(field, []):
+            started = time.perf_counter()
+            try:
+                value = matcher(doc)
+            except Exception as e:
+                if doc.debug:
+                    doc.log("debug", f"[DEBUG] 규칙 {name} 처리 중 오류: {e}")
+                value = ""
+            value, detail = value if isinstance(value, tuple) else (value, "")
+            for suffix in strip:
+                value = value.replace(suffix, "").strip()
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                stat = self._stats[(field, name)]
+                stat["evaluations"] += 1
+                stat["total_ms"] += elapsed
+                if value:
+                    stat["hits"] += 1
+            if value:
+                return value, f"{name} ({detail})" if detail else name
+        return "", ""
+
+    def stats(self):
+        """규칙별 통계 목록 (필드, 규칙, 평가 횟수, 적중 횟수, 평균 ms)"""
+        with self._lock:
+            return [
+                {"field": field, "rule": name, "evaluations": s["evaluations"], "hits": s["hits"],
+                 "avg_ms": s["total_ms"] / s["evaluations"] if s["evaluations"] else 0.0}
+                for (field, name), s in self._stats.items()
+            ]
+
+
+_rule_set = None
+_rule_set_lock = threading.Lock()
+
+def load_rule_set(path=None):
+    """규칙 파일을 읽어서 RuleSet으로 컴파일"""
+    path = path or RULES_PATH
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return RuleSet(config, source=path, mtime=os.path.getmtime(path))
+
+def get_rule_set():
+    """
+    현재 규칙 묶음 반환
+    규칙 파일의 수정 시각이 바뀌었으면 다시 컴파일하고, 새 파일이 잘못되었으면 기존 규칙을 계속 쓴다
+    """
+    global _rule_set
+    try:
+        mtime = os.path.getmtime(RULES_PATH)
+    except OSError:
+        mtime = None
+    if _rule_set is not None and _rule_set.mtime == mtime:
+        return _rule_set
+    with _rule_set_lock:
+        if _rule_set is None or _rule_set.mtime != mtime:
+            try:
+                _rule_set = load_rule_set()
+            except Exception as e:
+                if _rule_set is None:
+                    raise
+                logger.error("추출 규칙을 다시 읽지 못해 기존 규칙을 사용합니다: %s", e)
+                _rule_set.mtime = mtime
+    return _rule_set
+
+# ==================== 강화된 가격 추출 함수 ====================
+def extract_price_advanced(soup, debug=False, log=None, _doc=None):
+    """
+    강화된 가격 추출 함수
+    extraction_rules.json의 price 규칙을 순서대로 시도하여 가격 정보를 추출
+    """
+    log = log or default_log
+    doc = _doc or _Document(soup, log, debug)
+    price, method = get_rule_set().extract(doc, "price")
+    
+    if debug:
+        if price:
+            log("debug", f"[DEBUG] {method}에서 가격 찾음: {price}")
+        else:
+            log("debug", "[DEBUG] 가격 정보를 찾을 수 없음")
+    
+    return {
+        "price": price,
+        "original_price": "",
+        "discount_rate": "",
+        "extraction_method": method
+    }
+
+# ==================== 강화된 도서 정보 추출 함수 ====================
+def extract_book_info_enhanced(soup, debug=False, log=None):
+    """
+    강화된 도서 정보 추출 함수
+    """
+    log = log or default_log
+    rules = get_rule_set()
+    # JSON-LD와 페이지 텍스트는 필드 사이에서 한 번만 계산
+    doc = _Document(soup, log, debug)
+    
+    title, _ = rules.extract(doc, "title")
+    author, _ = rules.extract(doc, "author")
+    publisher, _ = rules.extract(doc, "publisher")
+    isbn, _ = rules.extract(doc, "isbn")
+    price_info = extract_price_advanced(soup, debug=debug, log=log, _doc=doc)
+    
+    return {
+        "title": title,
+        "author": author,
+        "publisher": publisher,
+        "isbn": isbn,
+        "price": price_info["price"],
+        "original_price": price_info.get("original_price", ""),
+        "extraction_method": price_info.get("extraction_method", "")
+    }
+
+# ==================== 가벼운 도서 정보 추출 함수 ====================
+def extract_book_info_basic(soup, debug=False, log=None):
+    """
+    JSON-LD만 보는 가벼운 추출 함수 (예전 kyobobook local.py / copy.py 방식)
+    가격 선택자/텍스트 패턴을 돌리지 않으므로 빠르지만 가격을 놓칠 수 있다
+    """
+    log = log or default_log
+    title = author = publisher = price = isbn = ""
+    extraction_method = ""
+    
+    # 도서명 추출
+    title_tag = soup.find("meta", property="og:title")
+    if title_tag:
+        title = title_tag.get("content", "").replace(" | 교보문고", "").strip()
+    
+    if not title:
+        title_tag = soup.find("title")
+        if title_tag:
+            title = title_tag.get_text().replace(" | 교보문고", "").strip()
+    
+    # JSON-LD에서 정보 추출
+    json_scripts = soup.find_all("script", type="application/ld+json")
+    for script in json_scripts:
+        try:
+            data = json.loads(script.string)
+            
+            if not title and "name" in data:
+                title = data["name"]
+            
+            if "author" in data and not author:
+                if isinstance(data["author"], list):
+                    author = ", ".join([a.get("name", "") for a in data["author"] if isinstance(a, dict)])
+                elif isinstance(data["author"], dict):
+                    author = data["author"].get("name", "")
+            
+            if "publisher" in data and not publisher:
+                if isinstance(data["publisher"], dict):
+                    publisher = data["publisher"].get("name", "")
+                else:
+                    publisher = str(data["publisher"])
+            
+            if not isbn and data.get("isbn"):
+                isbn = str(data["isbn"]).strip()
+            
+            if not price:
+                offers = data.get("offers", {})
+                if isinstance(offers, dict) and offers.get("price"):
+                    price = str(offers["price"]).replace(",", "")
+                    extraction_method = "JSON-LD offers.price"
+                else:
+                    for field in ["price", "lowPrice", "highPrice"]:
+                        if field in data:
+                            price = str(data[field]).replace(",", "")
+                            extraction_method = f"JSON-LD {field}"
+                            break
+                        
+        except Exception as e:
+            if debug:
+                log("debug", f"[DEBUG] JSON-LD 파싱 오류: {e}")
+            continue
+    
+    return {
+        "title": title,
+        "author": author,
+        "publisher": publisher,
+        "isbn": isbn,
+        "price": price,
+        "original_price": "",
+        "extraction_method": extraction_method
+    }
+
+# ==================== 실행 환경별 설정 프로필 ====================
+# 예전에는 스크립트마다 재시도/헤더/파싱 방식이 달랐던 것을 프로필 하나로 정리
+# max_retries: 최대 시도 횟수, deadline: 조회 한 번에 쓸 수 있는 전체 시간 (초)
+PROFILES = {
+    # Streamlit Cloud 등 웹 환경 (STREAMLIT_SHARING_MODE): 한 번만 시도, SSL 검증, 가격 재요청 없음
+    "web": {
+        "max_retries": 1,
+        "deadline": 15,
+        "verify_ssl": True,
+        "refetch_missing_price": False,
+        "sec_fetch_headers": True,
+        "parser": "enhanced",
+    },
+    # 로컬 실행 (kyobobook.py / kyobobook local2.py)
+    "local": {
+        "max_retries": 3,
+        "deadline": 45,
+        "verify_ssl": False,
+        "refetch_missing_price": True,
+        "sec_fetch_headers": True,
+        "parser": "enhanced",
+    },
+    # JSON-LD만 보는 가벼운 방식 (kyobobook local.py / kyobobook copy.py)
+    "basic": {
+        "max_retries": 3,
+        "deadline": 30,
+        "verify_ssl": False,
+        "refetch_missing_price": False,
+        "sec_fetch_headers": False,
+        "parser": "basic",
+    },
+}
+
+PARSERS = {
+    "enhanced": extract_book_info_enhanced,
+    "basic": extract_book_info_basic,
+}
+
+def detect_profile():
+    """환경 변수로 기본 프로필 이름 결정"""
+    return "web" if os.getenv('STREAMLIT_SHARING_MODE') is not None else "local"
+
+def get_profile(profile=None):
+    """프로필 이름(또는 dict)을 받아 설정 dict 반환 (None이면 환경에 맞게 자동 선택)"""
+    if isinstance(profile, dict):
+        return profile
+    name = profile or detect_profile()
+    if name not in PROFILES:
+        raise ValueError(f"알 수 없는 프로필: {name} (사용 가능: {', '.join(PROFILES)})")
+    return dict(PROFILES[name], name=name)
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15"
+]
+
+def get_realistic_headers(sec_fetch_headers=True):
+    headers = {
+        "User-Agent": random.choice(USER_AGENTS),
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+        "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
+        "Accept-Encoding": "gzip, deflate, br",
+        "DNT": "1",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Referer": "https://www.google.com/",
+        "Cache-Control": "max-age=0",
+    }
+    if sec_fetch_headers:
+        headers.update({
+            "Sec-Fetch-Dest": "document",
+            "Sec-Fetch-Mode": "navigate",
+            "Sec-Fetch-Site": "none",
+            "Sec-Fetch-User": "?1"
+        })
+    return headers
+
+# ==================== 재시도 정책 ====================
+# 실패 종류 (다시 시도해서 나아질 수 있는 것만 재시도)
+#   timeout / connection / throttled(429) / server(5xx) / incomplete(너무 짧은 응답) → 재시도
+#   client(4xx) / maintenance(점검 페이지) / ssl / empty(정보 없음) / error → 바로 실패
+RETRYABLE_FAILURES = {"timeout", "connection", "throttled", "server", "incomplete"}
+
+class FetchError(Exception):
+    """종류(kind)가 분류된 요청 실패"""
+    
+    def __init__(self, kind, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.kind = kind
+        self.status = status
+        self.retry_after = retry_after
+        self.attempts = 0
+
+def classify_exception(exc):
+    """requests 예외 → 실패 종류"""
+    import requests
+    
+    if isinstance(exc, requests.exceptions.SSLError):
+        return "ssl"
+    if isinstance(exc, requests.exceptions.Timeout):
+        return "timeout"
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return "connection"
+    return "error"
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After", "")
+    return float(value) if value.strip().isdigit() else None
+
+def is_maintenance_page(text):
+    return "임시 점검" in text or "점검을 실시합니다" in text
+
+def check_response(response, text=None):
+    """상품 페이지 응답(본문은 text로 따로 넘길 수 있음)을 확인해서 쓸 수 없으면 FetchError"""
+    text = response.text if text is None else text
+    status = response.status_code
+    if status == 429:
+        raise FetchError("throttled", "요청이 너무 많음 (429)", status, _retry_after(response))
+    if status >= 500:
+        raise FetchError("server", f"서버 오류 ({status})", status, _retry_after(response))
+    if status != 200:
+        raise FetchError("client", f"요청 실패 ({status})", status)
+    if is_maintenance_page(text):
+        raise FetchError("maintenance", "교보문고 점검 중", status)
+    if len(text) <= 1000:
+        raise FetchError("incomplete", f"응답이 너무 짧음 ({len(text)}자)", status)
+
+# 연결은 빨리 포기하고(죽은 호스트), 읽기는 페이지가 클 수 있으므로 더 기다린다
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 20
+
+class Deadline:
+    """
+    조회 한 번에 쓸 수 있는 전체 시간 예산 (초)
+    재시도, 가격 재요청, 앱의 대체 요청이 같은 예산을 나눠 쓴다
+    """
+    
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+    
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def expired(self):
+        return self.remaining() <= 0
+    
+    def timeout(self, connect=CONNECT_TIMEOUT, read=READ_TIMEOUT):
+        """남은 예산에 맞춘 requests용 (연결, 읽기) 타임아웃, 예산이 없으면 FetchError"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise FetchError("timeout", f"조회 시간 예산({self.seconds:.0f}초) 초과")
+        return (min(connect, remaining), min(read, remaining))
+
+class RetryPolicy:
+    """
+    지수 백오프 + 지터 재시도
+    재시도할 수 있는 실패만, 최대 시도 횟수와 전체 기한 안에서 다시 시도한다
+    deadline: 기본 기한 (초), run()에 Deadline을 넘기면 그 예산을 대신 쓴다
+    """
+    
+    def __init__(self, max_attempts=3, deadline=30.0, base_delay=0.5, max_delay=8.0,
+                 retry_on=RETRYABLE_FAILURES, min_attempt_time=1.0):
+        self.max_attempts = max(1, max_attempts)
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.min_attempt_time = min_attempt_time  # 남은 시간이 이보다 적으면 새로 시도하지 않음
+    
+    def backoff(self, retry_number, retry_after=None):
+        """retry_number번째 재시도 전 대기 시간 (절반은 고정, 절반은 무작위)"""
+        cap = min(self.max_delay, self.base_delay * (2 ** retry_number))
+        delay = cap / 2 + random.uniform(0, cap / 2)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+    
+    def run(self, attempt_fn, deadline=None, log=None, debug=False):
+        """
+        attempt_fn(시도 번호, Deadline)을 성공할 때까지 호출
+        실패하면 마지막 FetchError를 그대로 올린다
+        """
+        log = log or default_log
+        deadline = deadline or Deadline(self.deadline)
+        attempt = 0
+        while True:
+            try:
+                return attempt_fn(attempt, deadline)
+            except FetchError as e:
+                attempt += 1
+                e.attempts = attempt
+                if e.kind not in self.retry_on or attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt - 1, e.retry_after)
+                if deadline.remaining() - delay < self.min_attempt_time:
+                    raise
+                if debug:
+                    log("debug", f"[DEBUG] {e.kind} 실패: {e} → {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_attempts})")
+                time.sleep(delay)
+
+# ==================== 개선된 고급 스크래핑 함수 ====================
+# 상품 페이지 요청 통계 (프로세스 전체 누적): 가격을 못 찾았을 때 다시 받을 필요가 있었는지 확인용
+#   lookups: 조회 수, fetches: 페이지 요청 수, price_missing: 첫 응답에서 가격 없음,
+#   refetches: 신호가 있어서 다시 받은 수, refetch_recovered: 다시 받아서 가격을 찾은 수
+_fetch_stats = Counter()
+_fetch_stats_lock = threading.Lock()
+
+def _count(name, amount=1):
+    with _fetch_stats_lock:
+        _fetch_stats[name] += amount
+
+def fetch_stats():
+    """상품 페이지 요청 통계 복사본"""
+    with _fetch_stats_lock:
+        return {name: _fetch_stats[name] for name in
+                ("lookups", "fetches", "price_missing", "refetches", "refetch_recovered")}
+
+# 서버 HTML에 가격 자리만 있고 값은 클라이언트에서 채우는 경우 (다시 받으면 채워져 올 수 있음)
+_PRICE_PLACEHOLDER_SELECTORS = "[data-render='client'], span.sell_price, span.price_normal, strong.sell_price"
+
+def price_placeholder_signal(soup):
+    """비어 있는 가격 자리가 있으면 그 위치 설명, 없으면 None"""
+    for element in soup.select(_PRICE_PLACEHOLDER_SELECTORS):
+        if not element.get_text(strip=True):
+            return f"{element.name}.{'.'.join(element.get('class', []))}"
+    return None
+
+# 상품 페이지 본문을 읽을 최대 크기 (0이면 제한 없음)
+# 필요한 정보(JSON-LD, 메타 태그, 가격 영역)는 페이지 앞부분에 있으므로 뒤쪽 추천 목록 등은 버린다
+MAX_PAGE_BYTES = int(os.getenv("KYOBO_MAX_PAGE_BYTES", str(1024 * 1024)))
+
+def read_page(response, limit=None, deadline=None):
+    """
+    stream=True로 받은 응답 본문을 최대 limit 바이트까지만 읽어서 문자열로 반환
+    requests가 response.content / response.text로 본문 사본을 따로 들고 있지 않게 한다
+    deadline: 읽기 타임아웃은 조각마다 적용되므로, 조금씩 흘려보내는 응답이 예산을 넘기면
+    조각 사이에서 멈추고 FetchError("timeout")
+    """
+    limit = MAX_PAGE_BYTES if limit is None else limit
+    body = bytearray()
+    try:
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            if deadline is not None and deadline.expired():
+                raise FetchError("timeout", f"본문을 읽는 중 조회 시간 예산({deadline.seconds:.0f}초) 초과")
+            body += chunk
+            if limit and len(body) >= limit:
+                del body[limit:]
+                break
+    finally:
+        response.close()
+    # charset이 없으면 requests는 ISO-8859-1로 보므로 UTF-8로 읽는다
+    has_charset = "charset" in response.headers.get("content-type", "").lower()
+    return body.decode(response.encoding if has_charset and response.encoding else "utf-8", errors="replace")
+
+def _response_summary(response, text, failure=None):
+    """앱 디버깅 표시에 쓸 응답 요약 (본문 전체는 보관하지 않음)"""
+    return {
+        "status_code": response.status_code,
+        "size": len(text),
+        "content_type": response.headers.get("content-type", "N/A"),
+        "preview": text[:500].replace('<', '&lt;').replace('>', '&gt;'),
+        "failure": failure,
+    }
+
+def get_book_info_advanced(kyobo_url, max_retries=None, debug=False, log=None, profile=None, deadline=None,
+                           diagnostics=None, session=None):
+    """
+    개선된 도서 정보 추출 함수
+    profile: "web" / "local" / "basic" 또는 설정 dict (None이면 환경에 맞게 자동 선택)
+    max_retries를 넘기면 프로필의 재시도 횟수 대신 사용
+    deadline: 호출한 쪽과 나눠 쓸 Deadline (없으면 프로필의 deadline초)
+    diagnostics: dict를 넘기면 diagnostics[URL]에 마지막 응답 요약과 실패 종류를 기록
+    session: 여러 조회가 연결을 재사용하도록 나눠 쓸 requests.Session (없으면 조회마다 새로 만들고 닫음)
+    
+    페이지는 한 번만 받아서 모든 추출 방법을 그 응답에 적용하고, 가격 자리가 비어 있다는
+    신호가 있을 때만(프로필이 허용하면) 한 번 더 받는다
+    """
+    import requests
+    from bs4 import BeautifulSoup
+    
+    if session is None:
+        with requests.Session() as session:
+            return get_book_info_advanced(kyobo_url, max_retries, debug, log, profile, deadline, diagnostics,
+                                          session)
+    
+    log = log or default_log
+    profile = get_profile(profile)
+    is_web = profile.get("name") == "web"
+    parse = PARSERS[profile["parser"]]
+    _count("lookups")
+    
+    if is_web and debug:
+        log("warning", "⚠️ 웹 환경에서는 스크래핑이 제한될 수 있습니다.")
+    
+    verify_ssl = profile["verify_ssl"]
+    policy = RetryPolicy(max_attempts=max_retries if max_retries is not None else profile["max_retries"],
+                         deadline=profile["deadline"])
+    deadline = deadline or Deadline(profile["deadline"])
+    last = {"summary": None}
+    
+    def fetch():
+        """페이지를 받아서 파싱한 soup 반환 (본문 문자열은 함수가 끝나면 바로 해제)"""
+        headers = get_realistic_headers(profile["sec_fetch_headers"])
+        
+        # 쿠키 설정 (교보문고 특화): 여러 스레드가 같은 Session을 쓰므로 Session 쿠키를 바꾸지 않고 요청에만 붙임
+        cookies = {'PCID': str(random.randint(1000000000, 9999999999))}
+        
+        _count("fetches")
+        last["summary"] = None
+        try:
+            response = session.get(kyobo_url, headers=headers, cookies=cookies, timeout=deadline.timeout(),
+                                   verify=verify_ssl, stream=True)
+            text = read_page(response, deadline=deadline)
+        except requests.exceptions.RequestException as e:
+            raise FetchError(classify_exception(e), str(e))
+        last["summary"] = _response_summary(response, text)
+        check_response(response, text)
+        return BeautifulSoup(text, "html.parser")
+    
+    def attempt(number, deadline):
+        try:
+            soup = fetch()
+        finally:
+            summary = last["summary"]
+            if debug and summary is not None:
+                log("debug", f"[DEBUG] 시도 {number+1}: 상태코드={summary['status_code']}, 크기={summary['size']}")
+                if summary["size"] < 100:
+                    log("debug", f"[DEBUG] 응답 내용: {summary['preview'][:100]}")
+        book_info = parse(soup, debug=debug, log=log)
+        if not book_info or not any(book_info.values()):
+            soup.decompose()
+            raise FetchError("empty", "페이지에서 도서 정보를 찾지 못함", last["summary"]["status_code"])
+        return book_info, soup
+    
+    failure = None
+    soup = None
+    try:
+        book_info, soup = policy.run(attempt, deadline=deadline, log=log, debug=debug)
+    except FetchError as e:
+        if debug:
+            log("error", f"[DEBUG] {e.attempts}회 시도 후 실패 ({e.kind}): {e}")
+        book_info, failure = None, e.kind
+    
+    if book_info and not book_info.get("price"):
+        _count("price_missing")
+        # 1) 이미 받은 응답에 가격 추출 규칙 전체 적용 (enhanced 파서는 이미 적용함)
+        if profile["parser"] != "enhanced":
+            price_info = extract_price_advanced(soup, debug=debug, log=log)
+            if price_info["price"]:
+                book_info["price"] = price_info["price"]
+                book_info["extraction_method"] = price_info["extraction_method"]
+    
+    signal = None
+    if book_info and not book_info.get("price") and profile["refetch_missing_price"]:
+        signal = price_placeholder_signal(soup)
+        if not signal and debug:
+            log("debug", "[DEBUG] 가격 자리 신호 없음 → 다시 받지 않음")
+    
+    # 필드를 다 뽑았으므로 트리는 바로 해제 (동시 조회 시 메모리 사용량 제한)
+    if soup is not None:
+        soup.decompose()
+        soup = None
+    
+    # 2) 가격 자리가 비어 있다는 신호가 있고 예산이 남았을 때만 다시 받음
+    if signal and deadline.remaining() > 1 + CONNECT_TIMEOUT:
+        if debug:
+            log("warning", f"⚠️ 가격 자리가 비어 있음({signal}). 페이지를 한 번 더 받는 중...")
+        _count("refetches")
+        try:
+            refetched = fetch()
+            price_info = extract_price_advanced(refetched, debug=debug, log=log)
+            refetched.decompose()
+            if price_info["price"]:
+                _count("refetch_recovered")
+                book_info["price"] = price_info["price"]
+                book_info["extraction_method"] = price_info["extraction_method"]
+        except FetchError as e:
+            if debug:
+                log("error", f"[DEBUG] 가격 재요청 실패: {e}")
+    
+    if diagnostics is not None:
+        summary = last["summary"] or {"status_code": None, "size": 0, "content_type": "N/A", "preview": ""}
+        diagnostics[kyobo_url] = dict(summary, failure=failure)
+    
+    if book_info:
+        return book_info
+    
+    # 웹 환경에서 실패 시 안내
+    if is_web and debug:
+        log("info", "💡 자동 추출이 실패했습니다. 위의 '대체 입력 방법'을 사용해주세요.")
+    
+    return None
+
+# ==================== JSON 상품 API 조회 ====================
+# 상세 페이지가 내부적으로 호출하는 상품 JSON API로 여러 상품을 한 번에 조회한다.
+# 주소는 KYOBO_PRODUCT_API_URL로 지정하며 (예: http://127.0.0.1:8765/api/products),
+# 지정하지 않으면 HTML 추출만 사용한다. 응답 형식:
+#   {"data": [{"saleCmdtid": "S000...", "cmdtName": ..., "chrcName": ..., "pbcmName": ...,
+#              "sellPrice": ..., "isbn": ...}]}
+PRODUCT_API_URL = os.getenv("KYOBO_PRODUCT_API_URL")
+PRODUCT_API_BATCH = 20  # 요청 한 번에 묻는 상품 수
+
+# 응답 필드 → 도서 정보 필드
+PRODUCT_API_FIELDS = {
+    "title": "cmdtName",
+    "author": "chrcName",
+    "publisher": "pbcmName",
+    "price": "sellPrice",
+    "isbn": "isbn",
+}
+
+_PRODUCT_ID_PATTERN = re.compile(r"/detail/(S\d+)")
+
+def product_id_from_url(url):
+    """상품 상세 URL에서 상품번호(S000...) 추출, 없으면 None"""
+    match = _PRODUCT_ID_PATTERN.search(url or "")
+    return match.group(1) if match else None
+
+def fetch_products_json(product_ids, api_url=None, timeout=10, session=None, log=None, deadline=None):
+    """
+    상품번호 목록을 PRODUCT_API_BATCH개씩 묶어 JSON API로 조회
+    {상품번호: 도서 정보} 반환 (응답에 없거나 요청이 실패한 상품은 빠짐)
+    timeout: 읽기 타임아웃 (초), deadline이 있으면 남은 예산 안에서만 요청
+    """
+    import requests
+    
+    log = log or default_log
+    api_url = api_url or PRODUCT_API_URL
+    if not api_url or not product_ids:
+        return {}
+    if session is None:
+        with requests.Session() as session:
+            return fetch_products_json(product_ids, api_url, timeout, session, log, deadline)
+    results = {}
+    unique_ids = list(dict.fromkeys(product_ids))
+    for start in range(0, len(unique_ids), PRODUCT_API_BATCH):
+        batch = unique_ids[start:start + PRODUCT_API_BATCH]
+        if deadline is not None and deadline.expired():
+            break
+        try:
+            request_timeout = deadline.timeout(read=timeout) if deadline else (CONNECT_TIMEOUT, timeout)
+            response = session.get(api_url, params={"ids": ",".join(batch)}, timeout=request_timeout,
+                                   headers={"Accept": "application/json"})
+            response.raise_for_status()
+            items = response.json().get("data", [])
+        except Exception as e:
+            log("warning", f"상품 API 조회 실패 ({len(batch)}건): {e}")
+            continue
+        for item in items:
+            product_id = item.get("saleCmdtid")
+            if product_id not in batch:
+                continue
+            book_info = {field: str(item.get(key) or "").strip() for field, key in PRODUCT_API_FIELDS.items()}
+            book_info["price"] = _as_price(book_info["price"])
+            book_info["original_price"] = ""
+            book_info["extraction_method"] = "JSON API"
+            results[product_id] = book_info
+    return results
+
+def _is_complete(book_info):
+    return bool(book_info and book_info.get("title") and book_info.get("price"))
+
+CACHE_MAX_AGE = float(os.getenv("KYOBO_CACHE_MAX_AGE_HOURS", "24")) * 3600  # 캐시 값을 그대로 쓰는 기간 (초)
+
+def get_books_info(urls, debug=False, log=None, profile=None, api_url=None, workers=4, use_cache=True,
+                   deadline=None, diagnostics=None, session=None):
+    """
+    여러 URL을 한꺼번에 조회해서 {URL: 도서 정보 또는 None} 반환
+    로컬 캐시(CACHE_MAX_AGE 이내) → JSON API 묶음 조회 → HTML 추출 순서로,
+    앞 단계에서 완전한 결과를 얻지 못한 URL만 다음 단계로 넘긴다
+    deadline을 넘기면 모든 단계가 그 시간 예산을 나눠 쓴다
+    diagnostics: HTML 추출한 URL의 응답 요약을 받을 dict (get_book_info_advanced 참고)
+    session: 상품 API와 (스레드) HTML 추출이 나눠 쓸 requests.Session
+    """
+    log = log or default_log
+    cache = get_cache()
+    ids = {url: product_id_from_url(url) for url in urls}
+    cached = {}
+    if use_cache:
+        for url, pid in ids.items():
+            info = cache.lookup(pid, max_age=CACHE_MAX_AGE, require=("title", "price")) if pid else None
+            if info:
+                cached[url] = info
+    if debug and cached:
+        log("debug", f"[DEBUG] 캐시에서 {len(cached)}건 사용")
+    
+    pending = {url: pid for url, pid in ids.items() if url not in cached}
+    found = fetch_products_json([pid for pid in pending.values() if pid], api_url=api_url, log=log,
+                                deadline=deadline, session=session)
+    results = {url: found.get(pid) for url, pid in pending.items()}
+    
+    fallback = [url for url, info in results.items() if not _is_complete(info)]
+    stored = set()  # 워커 프로세스가 이미 캐시에 기록한 URL
+    process_pool = get_process_pool()
+    if fallback and process_pool is not None:
+        if debug:
+            log("debug", f"[DEBUG] JSON API로 찾지 못한 {len(fallback)}건은 추출 워커 프로세스에서 HTML 추출")
+        done = set()
+        try:
+            # Deadline 객체 대신 남은 초를 넘기고 워커에서 새로 만든다
+            remaining = deadline.remaining() if deadline else None
+            futures = [process_pool.submit(_worker_lookup, url, profile, remaining) for url in fallback]
+            for url, future in zip(fallback, futures):
+                info, summary, stats = future.result()
+                with _fetch_stats_lock:
+                    _fetch_stats.update(stats)
+                if diagnostics is not None and summary is not None:
+                    diagnostics[url] = summary
+                if info:
+                    stored.add(url)
+                results[url] = info or results[url]
+                done.add(url)
+        except BrokenProcessPool as e:
+            # 워커가 죽으면 풀을 버리고 남은 URL은 아래에서 스레드로 추출
+            log("warning", f"추출 워커 프로세스 오류로 이 프로세스에서 추출합니다: {e}")
+            shutdown_process_pool()
+        fallback = [url for url in fallback if url not in done]
+    if fallback:
+        if debug:
+            log("debug", f"[DEBUG] JSON API로 찾지 못한 {len(fallback)}건은 HTML에서 추출")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for url, info in zip(fallback, pool.map(
+                    lambda u: get_book_info_advanced(u, debug=debug, log=log, profile=profile, deadline=deadline,
+                                                     diagnostics=diagnostics, session=session),
+                    fallback)):
+                # HTML이 실패하면 불완전하더라도 JSON 결과 유지
+                results[url] = info or results[url]
+    
+    # 새로 추출한 상품은 모두 로컬 캐시(ISBN 인덱스 포함)에 기록
+    for url, info in results.items():
+        if info and url not in stored:
+            cache.put(ids[url], url, info)
+    results.update(cached)
+    return {url: results[url] for url in urls}
+
+def get_book_info(kyobo_url, debug=False, log=None, profile=None, api_url=None, deadline=None, diagnostics=None,
+                  session=None):
+    """URL 하나 조회 (JSON API 우선, 필요할 때만 HTML 추출)"""
+    return get_books_info([kyobo_url], debug=debug, log=log, profile=profile, api_url=api_url, workers=1,
+                          deadline=deadline, diagnostics=diagnostics, session=session)[kyobo_url]
+
+# ==================== 추출 워커 프로세스 ====================
+# HTML 파싱은 CPU를 쓰면서 GIL을 잡고 있어서, 한 서버에서 여러 세션이 동시에 조회하면
+# 스레드로는 파싱이 차례로 줄을 선다. KYOBO_EXTRACT_PROCESSES를 1 이상으로 두면
+# get_books_info의 HTML 추출을 워커 프로세스 N개에 맡긴다 (0이면 지금처럼 스레드에서 추출).
+# 워커는 결과를 같은 디스크 캐시(KYOBO_CACHE_PATH, WAL)에 직접 기록하고 작은 결과만 돌려준다.
+EXTRACT_PROCESSES = int(os.getenv("KYOBO_EXTRACT_PROCESSES", "0"))
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def get_process_pool(processes=None):
+    """추출 워커 프로세스 풀 (processes가 0 이하면 None, 풀은 처음 만들 때의 크기로 프로세스당 하나)"""
+    global _process_pool
+    processes = EXTRACT_PROCESSES if processes is None else processes
+    if processes <= 0:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            import multiprocessing
+            # Streamlit 서버는 스레드가 많으므로 fork 대신 spawn으로 깨끗한 프로세스를 띄운다
+            _process_pool = ProcessPoolExecutor(max_workers=processes,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+def shutdown_process_pool():
+    """추출 워커 프로세스 풀 종료 (다음 get_process_pool 호출 때 새로 만든다)"""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _worker_lookup(kyobo_url, profile, remaining=None):
+    """
+    워커 프로세스: URL 하나를 추출해서 공유 캐시에 기록
+    remaining: 부모 조회의 남은 시간 예산 (초, None이면 프로필 기본값)
+    반환: (도서 정보 또는 None, 응답 요약, 이번 조회의 페이지 요청 통계)
+    """
+    before = Counter(_fetch_stats)
+    diagnostics = {}
+    # monotonic 시계는 프로세스마다 같다는 보장이 없으므로 워커에서 새 Deadline을 만든다
+    deadline = Deadline(remaining) if remaining is not None else None
+    book_info = get_book_info_advanced(kyobo_url, profile=profile, deadline=deadline, diagnostics=diagnostics)
+    product_id = product_id_from_url(kyobo_url)
+    if book_info and product_id:
+        get_cache().put(product_id, kyobo_url, book_info)
+    return book_info, diagnostics.get(kyobo_url), dict(_fetch_stats - before)
+
+def _worker_parse(html, parser):
+    """워커 프로세스: 이미 받은 HTML에서 도서 정보만 추출"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    del html
+    book_info = PARSERS[parser](soup)
+    soup.decompose()
+    return book_info
+
+def parse_pages(pages, parser="enhanced", processes=None):
+    """
+    HTML 문자열 목록 → 도서 정보 목록 (순서 유지)
+    워커 프로세스 풀이 있으면 나눠서 파싱하고, 없으면 이 프로세스에서 차례로 파싱한다
+    """
+    pool = get_process_pool(processes)
+    if pool is None:
+        return [_worker_parse(html, parser) for html in pages]
+    return list(pool.map(_worker_parse, pages, [parser] * len(pages), chunksize=4))
+
+# ==================== ISBN 조회 ====================
+# 캐시에 없는 ISBN은 교보문고 검색 결과에서 상품 URL을 찾아 조회한다
+SEARCH_URL = os.getenv("KYOBO_SEARCH_URL", "https://search.kyobobook.co.kr/search?keyword={isbn}")
+
+_DETAIL_LINK_PATTERN = re.compile(r'href="([^"]*/detail/S\d+)[^"]*"')
+
+def find_product_url_by_isbn(isbn, search_url=None, timeout=10, log=None, deadline=None, session=None):
+    """ISBN으로 검색해서 첫 번째 상품 상세 URL 반환 (없으면 None)"""
+    import requests
+    from urllib.parse import urljoin
+    
+    log = log or default_log
+    url = (search_url or SEARCH_URL).format(isbn=isbn)
+    try:
+        request_timeout = deadline.timeout(read=timeout) if deadline else (CONNECT_TIMEOUT, timeout)
+        response = (session or requests).get(url, headers=get_realistic_headers(), timeout=request_timeout)
+    except Exception as e:
+        log("warning", f"ISBN 검색 실패: {e}")
+        return None
+    if response.status_code != 200:
+        return None
+    match = _DETAIL_LINK_PATTERN.search(response.text)
+    return urljoin(url, match.group(1)) if match else None
+
+def get_book_info_by_isbn(isbn, debug=False, log=None, profile=None, api_url=None, search_url=None, deadline=None,
+                          session=None):
+    """
+    ISBN으로 도서 정보 조회 (결과에 "url" 포함)
+    한 번이라도 추출한 상품이면 로컬 캐시에서 바로 돌려주고, 모르는 ISBN만 네트워크를 쓴다
+    """
+    log = log or default_log
+    isbn13 = normalize_isbn(isbn)
+    if not isbn13:
+        return None
+    cached = get_cache().get_by_isbn(isbn13)
+    if cached:
+        if debug:
+            log("debug", f"[DEBUG] ISBN {isbn13} 캐시에서 찾음: {cached['url']}")
+        return cached
+    
+    product_url = find_product_url_by_isbn(isbn13, search_url=search_url, log=log, deadline=deadline, session=session)
+    if not product_url:
+        return None
+    info = get_book_info(product_url, debug=debug, log=log, profile=profile, api_url=api_url, deadline=deadline,
+                         session=session)
+    if not info:
+        return None
+    info = dict(info, url=product_url)
+    if not info.get("isbn"):
+        # 페이지에 ISBN이 없더라도 검색한 ISBN으로 인덱스에 남김
+        info["isbn"] = isbn13
+        get_cache().put(product_id_from_url(product_url), product_url, info)
+    return info
+
+# ==================== 가격 재확인 (조건부 요청) ====================
+class RateLimiter:
+    """여러 스레드가 함께 쓰는 초당 요청 수 제한"""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        """다음 요청을 보내도 될 때까지 대기"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def revalidate_book_info(kyobo_url, session=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), log=None, profile=None):
+    """
+    캐시에 저장된 ETag/Last-Modified로 상품 페이지를 조건부 요청해서 도서 정보 재확인
+    304면 다시 파싱하지 않고 캐시 값을 쓴다 (재시도 없음, 한 번만 요청)
+    반환: (도서 정보 또는 None, "not_modified" / "fetched" / "failed")
+    """
+    import requests
+    from bs4 import BeautifulSoup
+    
+    log = log or default_log
+    profile = get_profile(profile)
+    cache = get_cache()
+    product_id = product_id_from_url(kyobo_url) or kyobo_url
+    cached = cache.get(product_id)
+    etag, last_modified = cache.validators(product_id) if cached else ("", "")
+    
+    headers = get_realistic_headers(profile["sec_fetch_headers"])
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    
+    try:
+        response = (session or requests).get(kyobo_url, headers=headers, timeout=timeout,
+                                             verify=profile["verify_ssl"], stream=True)
+        text = read_page(response)
+    except Exception as e:
+        log("warning", f"가격 재확인 실패 ({kyobo_url}): {e}")
+        return None, "failed"
+    
+    if response.status_code == 304 and cached:
+        return cached, "not_modified"
+    if response.status_code != 200 or len(text) <= 1000 or is_maintenance_page(text):
+        return None, "failed"
+    
+    soup = BeautifulSoup(text, "html.parser")
+    del text
+    book_info = PARSERS[profile["parser"]](soup, log=log)
+    soup.decompose()
+    if not book_info or not any(book_info.values()):
+        return None, "failed"
+    cache.put(product_id, kyobo_url, book_info)
+    if book_info.get("price"):
+        # 가격을 찾지 못한 응답의 ETag를 저장하면 다음 재확인이 304로 예전 가격을 그대로 쓴다
+        cache.set_validators(product_id, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return book_info, "fetched"
+
+# ==================== 캐시 예열 ====================
+def rank_product_urls(urls):
+    """구매사이트 값들 → 상품별 대표 URL을 신청 횟수가 많은 순서로 (교보문고 상품만)"""
+    counts = Counter()
+    first_url = {}
+    for url in urls:
+        product_id = product_id_from_url(url or "")
+        if product_id:
+            counts[product_id] += 1
+            first_url.setdefault(product_id, url.strip())
+    return [first_url[product_id] for product_id, _ in counts.most_common()]
+
+def warm_cache(urls, limit=None, workers=2, rate=1.0, profile=None, api_url=None, log=None, progress=None):
+    """
+    자주 신청된 상품을 미리 조회해서 로컬 캐시에 채움 (CACHE_MAX_AGE 안에 갱신된 상품은 건너뜀)
+    실제 사용자 조회를 방해하지 않도록 동시 요청 수(workers)와 초당 요청 수(rate)를 낮게 둔다
+    progress(완료 수, 전체 수) 콜백으로 진행 상황을 알린다
+    반환: {"total", "skipped", "warmed", "failed"}
+    """
+    log = log or default_log
+    cache = get_cache()
+    ranked = rank_product_urls(urls)[:limit]
+    todo = [url for url in ranked if not cache.is_fresh(product_id_from_url(url), CACHE_MAX_AGE)]
+    summary = {"total": len(ranked), "skipped": len(ranked) - len(todo), "warmed": 0, "failed": 0}
+    if progress:
+        progress(summary["skipped"], summary["total"])
+    
+    limiter = RateLimiter(rate)
+    lock = threading.Lock()
+    
+    def warm(url):
+        limiter.wait()
+        try:
+            info = get_books_info([url], log=log, profile=profile, api_url=api_url, workers=1, use_cache=False)[url]
+        except Exception as e:
+            log("warning", f"캐시 예열 실패 ({url}): {e}")
+            info = None
+        with lock:
+            summary["warmed" if info else "failed"] += 1
+            if progress:
+                progress(summary["skipped"] + summary["warmed"] + summary["failed"], summary["total"])
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="warmup") as pool:
+        list(pool.map(warm, todo))
+    log("info", f"캐시 예열: {summary}")
+    return summary
+
+# ==================== 명령줄 일괄 조회 ====================
+def read_urls(path):
+    """파일에서 URL 목록 읽기 (빈 줄, # 주석 무시, '-'는 표준 입력)"""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [line.strip().lstrip("@") for line in stream
+                if line.strip() and not line.strip().startswith("#")]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def lookup_record(url, max_retries=None, debug=False, profile=None):
+    """URL 하나를 조회해서 JSONL 한 줄로 쓸 결과 레코드 반환"""
+    started = time.perf_counter()
+    try:
+        book_info = get_book_info_advanced(url, max_retries=max_retries, debug=debug, profile=profile)
+        error = None if book_info else "extraction failed"
+    except Exception as e:
+        book_info, error = None, str(e)
+    record = {"url": url, "ok": bool(book_info), "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+    record.update(book_info or {})
+    if error:
+        record["error"] = error
+    return record
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="교보문고 URL 목록을 조회해서 JSONL로 출력")
+    parser.add_argument("input", help="URL 목록 파일 (한 줄에 하나, '-'는 표준 입력)")
+    parser.add_argument("-o", "--output", default="-", help="결과 JSONL 파일 (기본: 표준 출력)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="동시에 조회할 작업자 수")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=None,
+                        help="추출 프로필 (기본: 환경에 맞게 자동 선택)")
+    parser.add_argument("--max-retries", type=int, default=None, help="URL당 최대 시도 횟수 (기본: 프로필 설정)")
+    parser.add_argument("--api-url", default=None,
+                        help="상품 JSON API 주소 (기본: KYOBO_PRODUCT_API_URL, 없으면 HTML만 사용)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="추출 과정 로그 출력")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+    
+    urls = read_urls(args.input)
+    
+    # JSON API로 먼저 묶어서 조회 (설정된 경우)
+    started = time.perf_counter()
+    ids = {url: product_id_from_url(url) for url in urls}
+    from_api = fetch_products_json([pid for pid in ids.values() if pid], api_url=args.api_url)
+    api_ms = round((time.perf_counter() - started) * 1000, 1)
+    
+    def resolve(url):
+        info = from_api.get(ids[url])
+        if _is_complete(info):
+            return dict({"url": url, "ok": True, "elapsed_ms": api_ms}, **info)
+        return lookup_record(url, args.max_retries, args.verbose, args.profile)
+    
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    succeeded = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            # 입력 순서대로 출력
+            for record in pool.map(resolve, urls):
+                succeeded += record["ok"]
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    logger.warning("%d/%d건 추출 성공", succeeded, len(urls))
+    return 0 if succeeded == len(urls) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+교보문고 대역 서버 (벤치마크용)
+
+실제 교보문고에 요청하지 않고 추출 엔진을 측정할 수 있도록, 상품 상세 페이지와
+비슷한 HTML, 상품 JSON API(/api/products?ids=...), ISBN 검색(/search?keyword=...)
+응답을 로컬에서 내려준다.
+상품마다 가격이 어디에 들어 있는지(JSON-LD / 마크업 / 없음)와 응답 방식
+(정상 / 가끔 실패 / 점검 / 404)을 다르게 둔다.
+
+    python kyobo_standin.py --port 8765
+"""
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 상품번호 → 페이지 설정
+#   price_in: "jsonld"(JSON-LD offers.price) / "markup"(span.sell_price) / "none"
+#   behavior: "ok" / "flaky"(홀수 번째 요청은 503) / "maintenance" / "missing"(404)
+#   filler: 추천 목록 항목 수 (없으면 400개, 약 45KB)
+PRODUCTS = {
+    "S000000000001": {"title": "데이터 중심 애플리케이션 설계", "author": "마틴 클레프만", "publisher": "위키북스",
+                      "price": 36000, "isbn": "9791158390983", "price_in": "jsonld", "behavior": "ok"},
+    "S000000000002": {"title": "클린 코드", "author": "로버트 C. 마틴", "publisher": "인사이트",
+                      "price": 29700, "isbn": "9788966260959", "price_in": "markup", "behavior": "ok"},
+    "S000000000003": {"title": "리팩터링 2판", "author": "마틴 파울러", "publisher": "한빛미디어",
+                      "price": 31500, "isbn": "9791162242742", "price_in": "none", "behavior": "ok"},
+    "S000000000004": {"title": "파이썬 코딩의 기술", "author": "브렛 슬라킨", "publisher": "길벗",
+                      "price": 32400, "isbn": "9791165213190", "price_in": "jsonld", "behavior": "flaky"},
+    "S000000000005": {"title": "점검 중인 상품", "author": "", "publisher": "",
+                      "price": 0, "isbn": "", "price_in": "none", "behavior": "maintenance"},
+    "S000000000006": {"title": "없는 상품", "author": "", "publisher": "",
+                      "price": 0, "isbn": "", "price_in": "none", "behavior": "missing"},
+    "S000000000007": {"title": "추천 목록이 아주 긴 상품", "author": "홍길동", "publisher": "길벗",
+                      "price": 27000, "isbn": "9791140700000", "price_in": "jsonld", "behavior": "ok",
+                      "filler": 50000},
+}
+
+# 페이지 크기를 실제 상세 페이지에 가깝게 만들기 위한 채움 내용
+def _filler(count):
+    return "".join(
+        f'<li class="recommend_item"><a href="/detail/S0000{i:08d}">추천 도서 {i}</a>'
+        f'<span class="review">리뷰 {i * 7 % 97}건</span></li>'
+        for i in range(count)
+    )
+
+# 상품번호 → (페이지, ETag) (큰 페이지를 요청마다 다시 만들지 않도록)
+_pages = {}
+
+MAINTENANCE_PAGE = (
+    "<html><head><title>교보문고 점검 안내</title></head><body>"
+    "<h1>시스템 임시 점검 안내</h1><p>보다 나은 서비스를 위해 점검을 실시합니다.</p>"
+    + "<p>" + "&nbsp;" * 300 + "</p></body></html>"
+)
+
+
+def make_product_page(product_id, product):
+    """상품 설정으로 교보문고 상세 페이지와 비슷한 HTML 생성"""
+    json_ld = {
+        "@context": "https://schema.org",
+        "@type": "Product",
+        "name": product["title"],
+        "author": {"@type": "Person", "name": product["author"]},
+        "publisher": {"@type": "Organization", "name": product["publisher"]},
+        "isbn": product["isbn"],
+        "sku": product_id,
+    }
+    if product["price_in"] == "jsonld":
+        json_ld["offers"] = {"@type": "Offer", "price": product["price"], "priceCurrency": "KRW"}
+
+    price_markup = ""
+    if product["price_in"] == "markup":
+        price_markup = f'<div class="prod_price"><span class="sell_price">{product["price"]:,}원</span></div>'
+    elif product["price_in"] == "none":
+        # 가격은 클라이언트에서 그려지는 경우 (자리만 있음)
+        price_markup = '<div class="prod_price"><span class="sell_price" data-render="client"></span></div>'
+
+    return (
+        "<!DOCTYPE html><html lang=\"ko\"><head>"
+        f"<meta charset=\"utf-8\"><title>{product['title']} | 교보문고</title>"
+        f"<meta property=\"og:title\" content=\"{product['title']} | 교보문고\">"
+        f"<script type=\"application/ld+json\">{json.dumps(json_ld, ensure_ascii=False)}</script>"
+        "</head><body>"
+        f"<div class=\"prod_detail_header\"><h1 class=\"prod_title\">{product['title']}</h1>"
+        f"<div class=\"author\">{product['author']}</div><div class=\"prod_info_text publish_date\">"
+        f"{product['publisher']} · 2024년 01월 01일</div>{price_markup}</div>"
+        f"<ul class=\"recommend_list\">{_filler(product.get('filler', 400))}</ul>"
+        "</body></html>"
+    )
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """/detail/<상품번호> 요청에 상품 페이지 응답"""
+
+    hits = {}
+    hits_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        # 벤치마크 출력이 섞이지 않도록 접근 로그는 끔
+        pass
+
+    def _count_hit(self, key):
+        with self.hits_lock:
+            self.hits[key] = self.hits.get(key, 0) + 1
+            return self.hits[key]
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 본문 상한까지만 읽고 연결을 끊은 경우
+            pass
+
+    def _send_products_json(self, query):
+        """/api/products?ids=S1,S2 — 상세 페이지가 호출하는 상품 JSON API 흉내"""
+        from urllib.parse import parse_qs
+
+        ids = parse_qs(query).get("ids", [""])[0].split(",")
+        data = []
+        for product_id in ids:
+            product = PRODUCTS.get(product_id)
+            if product is None or product["behavior"] in ("missing", "maintenance"):
+                continue
+            data.append({
+                "saleCmdtid": product_id,
+                "cmdtName": product["title"],
+                "chrcName": product["author"],
+                "pbcmName": product["publisher"],
+                "sellPrice": product["price"],
+                "isbn": product["isbn"],
+            })
+        self._send(200, json.dumps({"data": data}, ensure_ascii=False), "application/json; charset=utf-8")
+
+    def _send_search(self, query):
+        """/search?keyword=<ISBN> — ISBN이 같은 상품 링크가 있는 검색 결과"""
+        from urllib.parse import parse_qs
+
+        keyword = parse_qs(query).get("keyword", [""])[0].replace("-", "")
+        links = "".join(
+            f'<li><a href="/detail/{product_id}">{product["title"]}</a></li>'
+            for product_id, product in PRODUCTS.items()
+            if product["isbn"] and product["isbn"] == keyword
+        )
+        self._send(200, f"<html><body><ul class=\"search_result\">{links}</ul></body></html>")
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path == "/api/products":
+            self._send_products_json(query)
+            return
+        if path == "/search":
+            self._send_search(query)
+            return
+        if path.startswith("/detail/"):
+            product_id = path.rsplit("/", 1)[-1]
+            product = PRODUCTS.get(product_id)
+            if product is None or product["behavior"] == "missing":
+                self._send(404, "<html><body>상품을 찾을 수 없습니다.</body></html>")
+                return
+            if product["behavior"] == "maintenance":
+                self._send(200, MAINTENANCE_PAGE)
+                return
+            if product["behavior"] == "flaky" and self._count_hit(product_id) % 2 == 1:
+                self._send(503, "<html><body>Service Unavailable</body></html>")
+                return
+            if product_id not in _pages:
+                page = make_product_page(product_id, product)
+                # 페이지 내용 기준 ETag (가격 재확인 시 조건부 요청 → 304)
+                _pages[product_id] = page, f'"{hashlib.md5(page.encode("utf-8")).hexdigest()}"'
+            page, etag = _pages[product_id]
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self._send(200, page, headers={"ETag": etag})
+            return
+        self._send(404, "<html><body>Not Found</body></html>")
+
+
+def start_standin(port=0):
+    """대역 서버를 백그라운드 스레드로 시작하고 (서버, 기본 URL) 반환"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandinHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def product_url(base_url, product_id):
+    return f"{base_url}/detail/{product_id}"
+
+
+def products_api_url(base_url):
+    return f"{base_url}/api/products"
+
+
+def search_url(base_url):
+    return f"{base_url}/search?keyword={{isbn}}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="교보문고 대역 서버 실행")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StandinHandler)
+    print(f"교보문고 대역 서버: http://127.0.0.1:{args.port}/detail/S000000000001")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
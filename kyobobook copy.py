@@ -6,128 +6,11 @@ import gspread
 from google.oauth2.service_account import Credentials
 from bs4 import BeautifulSoup
 import pandas as pd
-import json
-import re
-import random
-import time    
 
 st.title("Kyobo Book 신청 시스템")
 
-def get_book_info_advanced(kyobo_url, max_retries=3, debug=False):
-    """개선된 도서 정보 추출 함수"""
-    user_agents = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15"
-    ]
-    
-    def get_realistic_headers():
-        return {
-            "User-Agent": random.choice(user_agents),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-            "Referer": "https://www.google.com/",
-            "Cache-Control": "max-age=0"
-        }
-    
-    session = requests.Session()
-    
-    for attempt in range(max_retries):
-        try:
-            if attempt > 0:
-                time.sleep(random.uniform(2, 5))
-            
-            headers = get_realistic_headers()
-            
-            # 쿠키 설정 (교보문고 특화)
-            session.cookies.set('PCID', str(random.randint(1000000000, 9999999999)))
-            
-            response = session.get(kyobo_url, headers=headers, timeout=30, verify=False)
-            
-            if debug:
-                st.write(f"[DEBUG] 시도 {attempt+1}: 상태코드={response.status_code}, 크기={len(response.text)}")
-            
-            if response.status_code == 200 and len(response.text) > 1000:
-                soup = BeautifulSoup(response.text, "html.parser")
-                
-                # 강화된 추출 함수 사용
-                book_info = extract_book_info(soup, debug=debug)
-                
-                if book_info and any(book_info.values()):
-                    # 가격이 없으면 추가 시도
-                    if not book_info.get("price"):
-                        if debug:
-                            st.warning("⚠️ 첫 시도에서 가격을 찾지 못함. 추가 방법 시도 중...")
-                        
-                        # 페이지 새로고침 후 재시도
-                        time.sleep(1)
-                        response = session.get(kyobo_url, headers=get_realistic_headers(), timeout=30, verify=False)
-                        if response.status_code == 200:
-                            soup = BeautifulSoup(response.text, "html.parser")
-                            price_info = extract_price_advanced(soup, debug=debug)
-                            if price_info["price"]:
-                                book_info["price"] = price_info["price"]
-                                book_info["extraction_method"] = price_info["extraction_method"]
-                    
-                    return book_info
-                    
-        except Exception as e:
-            if debug:
-                st.error(f"[DEBUG] 시도 {attempt+1} 실패: {e}")
-            continue
-    
-    return None
-
-def extract_book_info(soup, debug=False):
-    """HTML에서 도서 정보 추출"""
-    title = author = publisher = price = ""
-    
-    # 도서명 추출
-    title_tag = soup.find("meta", property="og:title")
-    if title_tag:
-        title = title_tag.get("content", "").replace(" | 교보문고", "").strip()
-    
-    if not title:
-        title_tag = soup.find("title")
-        if title_tag:
-            title = title_tag.get_text().replace(" | 교보문고", "").strip()
-    
-    # JSON-LD에서 정보 추출
-    json_scripts = soup.find_all("script", type="application/ld+json")
-    for script in json_scripts:
-        try:
-            data = json.loads(script.string)
-            
-            if not title and "name" in data:
-                title = data["name"]
-            
-            if "author" in data and not author:
-                if isinstance(data["author"], list):
-                    author = ", ".join([a.get("name", "") for a in data["author"] if isinstance(a, dict)])
-                elif isinstance(data["author"], dict):
-                    author = data["author"].get("name", "")
-            
-            if "publisher" in data and not publisher:
-                if isinstance(data["publisher"], dict):
-                    publisher = data["publisher"].get("name", "")
-                else:
-                    publisher = str(data["publisher"])
-            
-            if not price:
-                for field in ["price", "lowPrice", "highPrice"]:
-                    if field in data:
-                        price = str(data[field]).replace(",", "")
-                        break
-                        
-        except:
-            continue
-    
-    return {"title": title, "author": author, "publisher": publisher, "price": price}
+# 추출 로직은 kyobo_extractor.py 하나로 관리 (JSON-LD만 보는 basic 프로필 사용)
+from kyobo_extractor import extract_book_info_basic as extract_book_info, get_book_info_advanced
 
 # 로그인 후 사용자 정보 저장
 if not hasattr(st, "user") or not getattr(st.user, "is_logged_in", False):
@@ -215,7 +98,7 @@ with tab1:
             progress_bar.progress(25)
             status_text.text("1단계: 고급 스크래핑 시도 중...")
             
-            book_info = get_book_info_advanced(kyobo_url)
+            book_info = get_book_info_advanced(kyobo_url, profile="basic")
             
             if book_info and any(book_info.values()):
                 title = book_info.get("title", "")
@@ -4,101 +4,12 @@ from datetime import datetime
 import pytz
 import gspread
 from google.oauth2.service_account import Credentials
-from bs4 import BeautifulSoup
 import pandas as pd
-import json
-import re
 
 st.title("Kyobo Book 신청 시스템")
 
-def get_book_info_advanced(kyobo_url, max_retries=3):
-    """개선된 도서 정보 추출 함수"""
-    user_agents = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15"
-    ]
-    
-    def get_realistic_headers():
-        return {
-            "User-Agent": random.choice(user_agents),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-            "Referer": "https://www.google.com/",
-        }
-    
-    session = requests.Session()
-    
-    for attempt in range(max_retries):
-        try:
-            if attempt > 0:
-                time.sleep(random.uniform(2, 5))
-            
-            headers = get_realistic_headers()
-            response = session.get(kyobo_url, headers=headers, timeout=30, verify=False)
-            
-            if response.status_code == 200 and len(response.text) > 1000:
-                soup = BeautifulSoup(response.text, "html.parser")
-                book_info = extract_book_info(soup)
-                
-                if book_info and any(book_info.values()):
-                    return book_info
-                    
-        except Exception as e:
-            continue
-    
-    return None
-
-def extract_book_info(soup):
-    """HTML에서 도서 정보 추출"""
-    title = author = publisher = price = ""
-    
-    # 도서명 추출
-    title_tag = soup.find("meta", property="og:title")
-    if title_tag:
-        title = title_tag.get("content", "").replace(" | 교보문고", "").strip()
-    
-    if not title:
-        title_tag = soup.find("title")
-        if title_tag:
-            title = title_tag.get_text().replace(" | 교보문고", "").strip()
-    
-    # JSON-LD에서 정보 추출
-    json_scripts = soup.find_all("script", type="application/ld+json")
-    for script in json_scripts:
-        try:
-            data = json.loads(script.string)
-            
-            if not title and "name" in data:
-                title = data["name"]
-            
-            if "author" in data and not author:
-                if isinstance(data["author"], list):
-                    author = ", ".join([a.get("name", "") for a in data["author"] if isinstance(a, dict)])
-                elif isinstance(data["author"], dict):
-                    author = data["author"].get("name", "")
-            
-            if "publisher" in data and not publisher:
-                if isinstance(data["publisher"], dict):
-                    publisher = data["publisher"].get("name", "")
-                else:
-                    publisher = str(data["publisher"])
-            
-            if not price:
-                for field in ["price", "lowPrice", "highPrice"]:
-                    if field in data:
-                        price = str(data[field]).replace(",", "")
-                        break
-                        
-        except:
-            continue
-    
-    return {"title": title, "author": author, "publisher": publisher, "price": price}
+# 추출 로직은 kyobo_extractor.py 하나로 관리 (JSON-LD만 보는 basic 프로필 사용)
+from kyobo_extractor import get_book_info_advanced
 
 # 로그인 후 사용자 정보 저장
 if not hasattr(st, "user") or not getattr(st.user, "is_logged_in", False):
@@ -176,196 +87,16 @@ with tab1:
         try:
             kyobo_url = kyobo_url.lstrip('@').strip()
             
-            # 다양한 User-Agent 시도
-            user_agents = [
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0"
-            ]
-            
-            # 헤더 설정
-            headers = {
-                "User-Agent": user_agents[0],
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "ko-KR,ko;q=0.8,en-US;q=0.5,en;q=0.3",
-                "Accept-Encoding": "gzip, deflate, br",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            }
+            # 공용 추출 엔진으로 조회 (예전 인라인 파싱과 같은 JSON-LD 위주의 basic 프로필, 한 번만 요청)
+            book_info = get_book_info_advanced(kyobo_url, max_retries=1, profile="basic")
             
-            # 디버깅 정보 수집 (화면 표시 주석처리, 데이터는 유지)
-            # with debug_container:
-            #     st.write("**요청 정보:**")
-            #     st.write(f"- URL: {kyobo_url}")
-            #     st.write(f"- User-Agent: {headers['User-Agent'][:50]}...")
-            
-            # 웹페이지 요청
-            res = requests.get(kyobo_url, headers=headers, timeout=10)
-            
-            # 응답 정보 수집 (화면 표시 주석처리, 데이터는 유지)
-            # with debug_container:
-            #     st.write(f"**응답 정보:**")
-            #     st.write(f"- 상태 코드: {res.status_code}")
-            #     st.write(f"- Content-Type: {res.headers.get('content-type', 'N/A')}")
-            #     st.write(f"- 응답 길이: {len(res.text):,} 문자")
-            #     
-            #     # 응답 내용 미리보기
-            #     preview = res.text[:500].replace('<', '&lt;').replace('>', '&gt;')
-            #     st.text_area("응답 HTML 미리보기 (처음 500자):", preview, height=100)
-            
-            soup = BeautifulSoup(res.text, "html.parser")
-            
-            # 사이트 점검 여부 확인
-            site_under_maintenance = False
-            if "임시 점검" in res.text or "점검을 실시합니다" in res.text:
-                site_under_maintenance = True
-                st.error("🚫 교보문고가 현재 점검 중입니다. 잠시 후 다시 시도해주세요.")
-                # 디버깅 정보 수집 (화면 표시 주석처리)
-                # with debug_container:
-                #     st.write("**문제:** 사이트 점검 중")
-
-            # 사이트 점검 중이 아닐 때만 파싱 진행
-            if not site_under_maintenance:
-                # 1. 도서명 추출 (여러 방법 시도)
-                title = ""
-                title_sources = []
-                
-                # 방법 1: og:title
-                title_tag = soup.find("meta", property="og:title")
-                if title_tag and "content" in title_tag.attrs:
-                    title = title_tag["content"].replace(" | 교보문고", "").strip()
-                    # re.split로 '|' 앞부분만 추출
-                    title = re.split(r'\s*\|\s*', title)[0].strip()
-                    title_sources.append("og:title")
-                
-                # 방법 2: title 태그
-                if not title:
-                    title_tag = soup.find("title")
-                    if title_tag:
-                        title = title_tag.get_text().replace(" | 교보문고", "").strip()
-                        title = re.split(r'\s*\|\s*', title)[0].strip()
-                        title_sources.append("title")
-                
-                # 방법 3: h1 태그 (상품명)
-                if not title:
-                    h1_tag = soup.find("h1")
-                    if h1_tag:
-                        title = h1_tag.get_text(strip=True)
-                        title = re.split(r'\s*\|\s*', title)[0].strip()
-                        title_sources.append("h1")
-
-                # 2. JSON-LD에서 정보 추출
-                author = publisher = price = ""
-                json_sources = []
-                
-                json_ld_scripts = soup.find_all("script", type="application/ld+json")
-                # 디버깅 정보 수집 (화면 표시 주석처리)
-                # with debug_container:
-                #     st.write(f"**발견된 JSON-LD 스크립트:** {len(json_ld_scripts)}개")
-                
-                for script in json_ld_scripts:
-                    try:
-                        data = json.loads(script.string)
-                        # 디버깅 정보 수집 (화면 표시 주석처리)
-                        # with debug_container:
-                        #     st.json(data)
-                        
-                        # 도서명
-                        if not title and "name" in data:
-                            title = data["name"]
-                            title_sources.append("JSON-LD")
-                        
-                        # 저자
-                        if "author" in data and not author:
-                            if isinstance(data["author"], list):
-                                author = ", ".join([a.get("name", "") for a in data["author"]])
-                            elif isinstance(data["author"], dict):
-                                author = data["author"].get("name", "")
-                            else:
-                                author = str(data["author"])
-                            json_sources.append("저자")
-                        
-                        # 출판사
-                        if "publisher" in data and not publisher:
-                            if isinstance(data["publisher"], dict):
-                                publisher = data["publisher"].get("name", "")
-                            else:
-                                publisher = str(data["publisher"])
-                            json_sources.append("출판사")
-                        
-                        # 가격
-                        if not price:
-                            # 다양한 가격 필드 시도
-                            price_fields = ["price", "lowPrice", "highPrice"]
-                            for field in price_fields:
-                                if field in data:
-                                    price = str(data[field]).replace(",", "")
-                                    json_sources.append(f"가격({field})")
-                                    break
-                            
-                            # workExample 구조에서 가격 추출
-                            if not price and "workExample" in data:
-                                work_examples = data["workExample"]
-                                if isinstance(work_examples, list) and len(work_examples) > 0:
-                                    work = work_examples[0]
-                                    try:
-                                        price = str(int(float(
-                                            work["potentialAction"]["expectsAcceptanceOf"]["Price"]
-                                        )))
-                                        json_sources.append("가격(workExample)")
-                                    except Exception:
-                                        pass
-                            
-                    except Exception as e:
-                        # 디버깅 정보 수집 (화면 표시 주석처리)
-                        # with debug_container:
-                        #     st.write(f"JSON-LD 파싱 오류: {e}")
-                        pass
-
-                # 3. CSS 선택자로 대체 추출 방법들 시도
-                css_sources = []
-                
-                # 다양한 CSS 클래스/선택자 패턴 시도
-                if not author:
-                    author_selectors = [
-                        ".author", ".writer", ".prod_author", ".book-author",
-                        "[data-author]", ".author-name", ".creator"
-                    ]
-                    for selector in author_selectors:
-                        element = soup.select_one(selector)
-                        if element:
-                            author = element.get_text(strip=True)
-                            css_sources.append(f"저자({selector})")
-                            break
-                
-                if not publisher:
-                    publisher_selectors = [
-                        ".company", ".publisher", ".prod_company", ".book-publisher",
-                        "[data-publisher]", ".publisher-name"
-                    ]
-                    for selector in publisher_selectors:
-                        element = soup.select_one(selector)
-                        if element:
-                            publisher = element.get_text(strip=True)
-                            css_sources.append(f"출판사({selector})")
-                            break
-                
-                if not price:
-                    price_selectors = [
-                        ".val", ".price", ".prod_price", ".book-price",
-                        "[data-price]", ".price-value", ".current-price"
-                    ]
-                    for selector in price_selectors:
-                        element = soup.select_one(selector)
-                        if element:
-                            price_text = element.get_text(strip=True).replace(",", "").replace("원", "")
-                            # 숫자만 추출
-                            price_match = re.search(r'\d+', price_text)
-                            if price_match:
-                                price = price_match.group()
-                                css_sources.append(f"가격({selector})")
-                                break
-
+            if not book_info:
+                st.error("❌ 도서 정보를 추출할 수 없습니다. URL을 확인하거나 잠시 후 다시 시도해주세요.")
+            else:
+                title = book_info.get("title", "")
+                author = book_info.get("author", "")
+                publisher = book_info.get("publisher", "")
+                price = book_info.get("price", "")
 
                 # 수량은 초기값 1로 고정
                 qty = 1
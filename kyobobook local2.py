@@ -6,316 +6,16 @@ import gspread
 from google.oauth2.service_account import Credentials
 from bs4 import BeautifulSoup
 import pandas as pd
-import json
-import re
-import random
-import time
 
 st.title("📚 Kyobo Book 신청 시스템")
 
-# ==================== 강화된 가격 추출 함수 ====================
-def extract_price_advanced(soup, debug=False):
-    """
-    강화된 가격 추출 함수
-    여러 방법을 순차적으로 시도하여 가격 정보를 추출
-    """
-    price_info = {
-        "price": "",
-        "original_price": "",
-        "discount_rate": "",
-        "extraction_method": ""
-    }
-    
-    # 가격 추출을 위한 정규표현식
-    price_pattern = re.compile(r'[\d,]+')
-    
-    # 방법 1: JSON-LD 스크립트에서 추출
-    json_scripts = soup.find_all("script", type="application/ld+json")
-    for script in json_scripts:
-        try:
-            data = json.loads(script.string)
-            
-            # Product 타입 찾기
-            if isinstance(data, dict):
-                if data.get("@type") == "Product":
-                    # offers 정보 확인
-                    offers = data.get("offers", {})
-                    if isinstance(offers, dict):
-                        price = offers.get("price", "")
-                        if price:
-                            price_info["price"] = str(price).replace(",", "")
-                            price_info["extraction_method"] = "JSON-LD offers.price"
-                            if debug:
-                                st.write(f"[DEBUG] JSON-LD에서 가격 찾음: {price}")
-                            return price_info
-                    
-                    # 다른 가격 필드들 확인
-                    for price_field in ["price", "lowPrice", "highPrice"]:
-                        if price_field in data:
-                            price = str(data[price_field]).replace(",", "")
-                            if price and price.isdigit():
-                                price_info["price"] = price
-                                price_info["extraction_method"] = f"JSON-LD {price_field}"
-                                if debug:
-                                    st.write(f"[DEBUG] JSON-LD {price_field}에서 가격 찾음: {price}")
-                                return price_info
-                
-                # workExample 구조 확인
-                if "workExample" in data:
-                    work_examples = data["workExample"]
-                    if isinstance(work_examples, list) and work_examples:
-                        for work in work_examples:
-                            if "potentialAction" in work:
-                                action = work["potentialAction"]
-                                if "expectsAcceptanceOf" in action:
-                                    acceptance = action["expectsAcceptanceOf"]
-                                    if isinstance(acceptance, dict) and "Price" in acceptance:
-                                        price = str(acceptance["Price"]).replace(",", "")
-                                        if price.isdigit():
-                                            price_info["price"] = price
-                                            price_info["extraction_method"] = "JSON-LD workExample"
-                                            if debug:
-                                                st.write(f"[DEBUG] workExample에서 가격 찾음: {price}")
-                                            return price_info
-            
-            # 리스트 형태의 JSON-LD
-            elif isinstance(data, list):
-                for item in data:
-                    if isinstance(item, dict) and item.get("@type") == "Product":
-                        # 재귀적으로 처리
-                        temp_soup = BeautifulSoup(f'<script type="application/ld+json">{json.dumps(item)}</script>', "html.parser")
-                        result = extract_price_advanced(temp_soup, debug)
-                        if result["price"]:
-                            return result
-                            
-        except Exception as e:
-            if debug:
-                st.write(f"[DEBUG] JSON-LD 파싱 오류: {e}")
-            continue
-    
-    # 방법 2: Meta 태그에서 추출
-    meta_price = soup.find("meta", {"property": "product:price:amount"})
-    if meta_price and meta_price.get("content"):
-        price = meta_price["content"].replace(",", "")
-        if price.isdigit():
-            price_info["price"] = price
-            price_info["extraction_method"] = "Meta tag product:price:amount"
-            if debug:
-                st.write(f"[DEBUG] Meta 태그에서 가격 찾음: {price}")
-            return price_info
-    
-    # 방법 3: 특정 클래스명으로 추출 (교보문고 특화)
-    price_selectors = [
-        # 교보문고 특화 선택자들
-        ("span.price_normal", "price_normal class"),
-        ("span.sell_price", "sell_price class"),
-        ("strong.sell_price", "strong.sell_price"),
-        ("div.prod_price span.price", "prod_price span.price"),
-        ("div.prod_price strong", "prod_price strong"),
-        ("span.val", "val class"),
-        ("em.val", "em.val"),
-        ("strong.val", "strong.val"),
-        
-        # 일반적인 가격 선택자들
-        ("span[class*='price']", "class contains price"),
-        ("div[class*='price']", "div class contains price"),
-        ("strong[class*='price']", "strong class contains price"),
-        ("*[class*='sell']", "class contains sell"),
-        ("*[class*='cost']", "class contains cost"),
-        
-        # data 속성 활용
-        ("*[data-price]", "data-price attribute"),
-        ("*[data-value]", "data-value attribute"),
-        ("*[data-amount]", "data-amount attribute"),
-    ]
-    
-    for selector, method_name in price_selectors:
-        try:
-            elements = soup.select(selector)
-            for element in elements:
-                # data 속성 확인
-                if element.get("data-price"):
-                    price = element["data-price"].replace(",", "")
-                    if price.isdigit():
-                        price_info["price"] = price
-                        price_info["extraction_method"] = f"{method_name} (data-price)"
-                        if debug:
-                            st.write(f"[DEBUG] {method_name}에서 가격 찾음: {price}")
-                        return price_info
-                
-                # 텍스트에서 가격 추출
-                text = element.get_text(strip=True)
-                if text:
-                    # 숫자만 추출 (쉼표 포함)
-                    numbers = price_pattern.findall(text)
-                    for num in numbers:
-                        num_clean = num.replace(",", "")
-                        # 가격으로 적절한 범위인지 확인 (1000원 이상, 1000만원 이하)
-                        if num_clean.isdigit() and 1000 <= int(num_clean) <= 10000000:
-                            price_info["price"] = num_clean
-                            price_info["extraction_method"] = method_name
-                            if debug:
-                                st.write(f"[DEBUG] {method_name}에서 가격 찾음: {num_clean}")
-                            return price_info
-                            
-        except Exception as e:
-            if debug:
-                st.write(f"[DEBUG] 선택자 {selector} 처리 중 오류: {e}")
-            continue
-    
-    # 방법 4: 텍스트 패턴으로 추출
-    text_patterns = [
-        (r'판매가[:\s]*([0-9,]+)\s*원', "판매가 패턴"),
-        (r'정가[:\s]*([0-9,]+)\s*원', "정가 패턴"),
-        (r'가격[:\s]*([0-9,]+)\s*원', "가격 패턴"),
-        (r'(\d{1,3}(?:,\d{3})*)\s*원', "숫자+원 패턴"),
-        (r'₩\s*([0-9,]+)', "원화 기호 패턴"),
-        (r'KRW\s*([0-9,]+)', "KRW 패턴"),
-    ]
-    
-    page_text = soup.get_text()
-    for pattern, method_name in text_patterns:
-        matches = re.finditer(pattern, page_text)
-        for match in matches:
-            price = match.group(1).replace(",", "")
-            if price.isdigit() and 1000 <= int(price) <= 10000000:
-                price_info["price"] = price
-                price_info["extraction_method"] = method_name
-                if debug:
-                    st.write(f"[DEBUG] {method_name}에서 가격 찾음: {price}")
-                return price_info
-    
-    if debug:
-        st.write("[DEBUG] 가격 정보를 찾을 수 없음")
-    
-    return price_info
+# ==================== 도서 정보 추출 (공용 엔진) ====================
+# 추출 로직은 kyobo_extractor.py 하나로 관리 (이 스크립트는 항상 로컬 프로필 사용)
+from kyobo_extractor import extract_book_info_enhanced, get_book_info_advanced
 
-# ==================== 강화된 도서 정보 추출 함수 ====================
-def extract_book_info_enhanced(soup, debug=False):
-    """
-    강화된 도서 정보 추출 함수
-    """
-    # 기본 정보 추출
-    title = author = publisher = ""
-    
-    # 도서명 추출
-    title_tag = soup.find("meta", property="og:title")
-    if title_tag:
-        title = title_tag.get("content", "").replace(" | 교보문고", "").strip()
-    
-    if not title:
-        title_tag = soup.find("title")
-        if title_tag:
-            title = title_tag.get_text().replace(" | 교보문고", "").strip()
-    
-    # JSON-LD에서 저자, 출판사 정보 추출
-    json_scripts = soup.find_all("script", type="application/ld+json")
-    for script in json_scripts:
-        try:
-            data = json.loads(script.string)
-            
-            if not title and "name" in data:
-                title = data["name"]
-            
-            if "author" in data and not author:
-                if isinstance(data["author"], list):
-                    author = ", ".join([a.get("name", "") for a in data["author"] if isinstance(a, dict)])
-                elif isinstance(data["author"], dict):
-                    author = data["author"].get("name", "")
-                else:
-                    author = str(data["author"])
-            
-            if "publisher" in data and not publisher:
-                if isinstance(data["publisher"], dict):
-                    publisher = data["publisher"].get("name", "")
-                else:
-                    publisher = str(data["publisher"])
-                    
-        except:
-            continue
-    
-    # 강화된 가격 추출 사용
-    price_info = extract_price_advanced(soup, debug=debug)
-    
-    return {
-        "title": title,
-        "author": author,
-        "publisher": publisher,
-        "price": price_info["price"],
-        "original_price": price_info.get("original_price", ""),
-        "extraction_method": price_info.get("extraction_method", "")
-    }
-
-# ==================== 개선된 고급 스크래핑 함수 ====================
-def get_book_info_advanced(kyobo_url, max_retries=3, debug=False):
-    """개선된 도서 정보 추출 함수"""
-    user_agents = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15"
-    ]
-    
-    def get_realistic_headers():
-        return {
-            "User-Agent": random.choice(user_agents),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-            "Referer": "https://www.google.com/",
-            "Cache-Control": "max-age=0"
-        }
-    
-    session = requests.Session()
-    
-    for attempt in range(max_retries):
-        try:
-            if attempt > 0:
-                time.sleep(random.uniform(2, 5))
-            
-            headers = get_realistic_headers()
-            
-            # 쿠키 설정 (교보문고 특화)
-            session.cookies.set('PCID', str(random.randint(1000000000, 9999999999)))
-            
-            response = session.get(kyobo_url, headers=headers, timeout=30, verify=False)
-            
-            if debug:
-                st.write(f"[DEBUG] 시도 {attempt+1}: 상태코드={response.status_code}, 크기={len(response.text)}")
-            
-            if response.status_code == 200 and len(response.text) > 1000:
-                soup = BeautifulSoup(response.text, "html.parser")
-                
-                # 강화된 추출 함수 사용
-                book_info = extract_book_info_enhanced(soup, debug=debug)
-                
-                if book_info and any(book_info.values()):
-                    # 가격이 없으면 추가 시도
-                    if not book_info.get("price"):
-                        if debug:
-                            st.warning("⚠️ 첫 시도에서 가격을 찾지 못함. 추가 방법 시도 중...")
-                        
-                        # 페이지 새로고침 후 재시도
-                        time.sleep(1)
-                        response = session.get(kyobo_url, headers=get_realistic_headers(), timeout=30, verify=False)
-                        if response.status_code == 200:
-                            soup = BeautifulSoup(response.text, "html.parser")
-                            price_info = extract_price_advanced(soup, debug=debug)
-                            if price_info["price"]:
-                                book_info["price"] = price_info["price"]
-                                book_info["extraction_method"] = price_info["extraction_method"]
-                    
-                    return book_info
-                    
-        except Exception as e:
-            if debug:
-                st.error(f"[DEBUG] 시도 {attempt+1} 실패: {e}")
-            continue
-    
-    return None
+def st_log(level, message):
+    """추출 엔진의 log 콜백을 Streamlit 화면 출력으로 연결"""
+    {"debug": st.write, "info": st.info, "warning": st.warning, "error": st.error}.get(level, st.write)(message)
 
 # ==================== 신청 내역 불러오기 함수 ====================
 def get_applications():
@@ -421,7 +121,7 @@ with tab1:
             progress_bar.progress(25)
             status_text.text("1단계: 고급 스크래핑 시도 중...")
             
-            book_info = get_book_info_advanced(kyobo_url, debug=debug_mode)
+            book_info = get_book_info_advanced(kyobo_url, debug=debug_mode, log=st_log, profile="local")
             
             if book_info and any(book_info.values()):
                 title = book_info.get("title", "")
@@ -476,7 +176,7 @@ with tab1:
                         st.error("🚫 교보문고가 현재 점검 중입니다. 잠시 후 다시 시도해주세요.")
                     else:
                         # 기본 방법으로 정보 추출
-                        extracted_info = extract_book_info_enhanced(soup, debug=debug_mode)
+                        extracted_info = extract_book_info_enhanced(soup, debug=debug_mode, log=st_log)
                         if extracted_info and any(extracted_info.values()):
                             title = extracted_info.get("title", "")
                             author = extracted_info.get("author", "")
@@ -1,363 +1,515 @@
 import streamlit as st
-import requests
 from datetime import datetime
-import pytz
-import gspread
-from google.oauth2.service_account import Credentials
-from bs4 import BeautifulSoup
-import pandas as pd
-import json
 import re
-import random
-import time
+import uuid
+import threading
+
+from book_cache import get_cache
+from extractor_service import SERVICE_URL, ServiceUnavailable, service_lookup
+from kyobo_extractor import (
+    Deadline, fetch_stats, get_book_info, get_book_info_by_isbn, get_rule_set, normalize_isbn,
+    to_int, warm_cache,
+)
+from record_schema import apply_record_schema
+from row_index import RowIndex, ensure_id_header
+from sheet_scheduler import SheetScheduler
+from submission_queue import get_queue, is_sheet_unavailable, replay
+
+# requests / bs4 / pandas / gspread / google-auth / pytz는 무거우므로
+# 로그인 화면이 먼저 그려지도록 실제로 사용하는 함수 안에서 import 한다
 
 st.title("📚 Kyobo Book 신청 시스템")
 
-# ==================== 강화된 가격 추출 함수 ====================
-def extract_price_advanced(soup, debug=False):
+# ==================== 추출 엔진 로그 → Streamlit 출력 ====================
+def st_log(level, message):
+    """추출 엔진의 log 콜백을 Streamlit 화면 출력으로 연결"""
+    {"debug": st.write, "info": st.info, "warning": st.warning, "error": st.error}.get(level, st.write)(message)
+
+def current_time():
+    """지금 서울 시각 문자열 (fragment만 다시 실행될 때도 그 시점 기준)"""
+    import pytz
+    
+    return datetime.now(pytz.timezone("Asia/Seoul")).strftime('%Y-%m-%d %H:%M:%S')
+
+# ==================== 신청 ID / 행 번호 인덱스 ====================
+# 시트 컬럼 순서 (신청ID는 기존 컬럼 번호가 바뀌지 않도록 마지막에 둔다)
+APPLICATION_COLUMNS = ["신청시간", "신청자 성명", "도서명", "저자명", "출판사", "단가", "수량", "구매사이트", "가격", "신청ID"]
+QTY_COL_NUM = 7      # 수량 컬럼 (7번째)
+URL_COL_NUM = 8      # 구매사이트 컬럼 (8번째)
+PRICE_COL_NUM = 9    # 가격 컬럼 (9번째)
+ID_COL_NUM = 10      # 신청ID 컬럼 (10번째)
+
+def new_application_id():
+    """신청 건마다 고유한 ID 생성"""
+    return uuid.uuid4().hex[:12]
+
+@st.cache_resource
+def get_row_index():
     """
-    강화된 가격 추출 함수
-    여러 방법을 순차적으로 시도하여 가격 정보를 추출
+    신청ID → 시트 행 번호 캐시 (모든 세션 공유)
+    정렬 순서와 무관하게 한 번의 조회로 수정할 행을 찾기 위해 사용
     """
-    price_info = {
-        "price": "",
-        "original_price": "",
-        "discount_rate": "",
-        "extraction_method": ""
-    }
+    return RowIndex(ID_COL_NUM)
+
+def append_application(values):
+    """
+    신청ID를 붙여서 한 행 추가하고 인덱스에 등록
+    시트에 쓸 수 없으면 보관함에 넣고 None 반환
+    (다시 보낼 신청이 남아 있으면 순서를 지키려고 뒤에 넣음, 실패로 옮겨진 신청은 기다리지 않음)
+    """
+    app_id = new_application_id()
+    row = list(values) + [app_id]
+    queue = get_queue()
+    if len(queue):
+        queue.put(app_id, row, "먼저 보관된 신청을 기다리는 중")
+        connect_submission_replay(get_submission_replay_job())["trigger"].set()
+        return None
+    try:
+        response = get_worksheet().append_row(row)
+    except Exception as e:
+        if not is_sheet_unavailable(e):
+            raise
+        queue.put(app_id, row, e)
+        return None
+    get_row_index().register(app_id, response)
+    record_append(values)
+    record_duplicate(dict(zip(APPLICATION_COLUMNS, list(values) + [app_id])))
+    invalidate_applications()
+    return app_id
+
+# ==================== 신청 내역 불러오기 함수 ====================
+APPLICATIONS_TTL = 60  # 신청 내역 캐시 유지 시간 (초)
+
+@st.cache_resource(ttl=APPLICATIONS_TTL)
+def get_column_store():
+    """
+    컬럼 이름 → 시트에서 읽은 그 컬럼 값 목록 (헤더 제외, 모든 세션 공유)
+    화면마다 필요한 컬럼만 읽고, 이미 읽은 컬럼은 다시 읽지 않는다
+    rows는 캐시된 컬럼을 읽을 때의 행 수, generation은 무효화할 때마다 늘어나는 번호
+    """
+    return {"lock": threading.Lock(), "columns": {}, "rows": None, "generation": 0}
+
+ROW_PROBE_COLUMN = "신청시간"  # 모든 행에 값이 있는 컬럼 (행 수 확인용)
+
+# 화면/인덱스별로 읽는 컬럼
+LIST_COLUMNS = tuple(col for col in APPLICATION_COLUMNS if col != "구매사이트")  # 목록 화면 (긴 URL 제외)
+DUPLICATE_INDEX_COLUMNS = tuple(col for col in APPLICATION_COLUMNS if col != "저자명")
+TITLE_INDEX_COLUMNS = ("도서명", "저자명", "출판사", "단가", "구매사이트")
+
+def column_range(name):
+    """신청 내역 컬럼 이름 → 헤더를 뺀 컬럼 전체 범위 (예: 도서명 → 'C2:C')"""
+    from gspread.utils import rowcol_to_a1
     
-    # 가격 추출을 위한 정규표현식
-    price_pattern = re.compile(r'[\d,]+')
+    letter = rowcol_to_a1(1, APPLICATION_COLUMNS.index(name) + 1)[:-1]
+    return f"{letter}2:{letter}"
+
+def _fetch_columns(columns):
+    """columns를 batch_get 한 번으로 읽기 → {컬럼: [값, ...]}"""
+    value_ranges = get_worksheet().batch_get([column_range(col) for col in columns], major_dimension="COLUMNS")
+    return {col: list(values[0]) if values else [] for col, values in zip(columns, value_ranges)}
+
+def load_columns(columns):
+    """
+    columns의 값 목록 {컬럼: [값, ...]}
+    캐시에 없는 컬럼만 batch_get 한 번으로 읽는다 (시트 요청은 lock 밖에서 보냄).
+    행 수 확인용 컬럼을 같이 읽어서 캐시된 컬럼을 읽은 뒤 행 수가 바뀌었으면
+    서로 다른 시점의 컬럼을 섞지 않도록 요청한 컬럼을 모두 새로 읽는다
+    """
+    store = get_column_store()
+    with store["lock"]:
+        cached = {col: store["columns"][col] for col in columns if col in store["columns"]}
+        rows, generation = store["rows"], store["generation"]
+    missing = [col for col in columns if col not in cached]
+    if not missing:
+        return cached
     
-    # 방법 1: JSON-LD 스크립트에서 추출
-    json_scripts = soup.find_all("script", type="application/ld+json")
-    for script in json_scripts:
-        try:
-            data = json.loads(script.string)
-            
-            # Product 타입 찾기
-            if isinstance(data, dict):
-                if data.get("@type") == "Product":
-                    # offers 정보 확인
-                    offers = data.get("offers", {})
-                    if isinstance(offers, dict):
-                        price = offers.get("price", "")
-                        if price:
-                            price_info["price"] = str(price).replace(",", "")
-                            price_info["extraction_method"] = "JSON-LD offers.price"
-                            if debug:
-                                st.write(f"[DEBUG] JSON-LD에서 가격 찾음: {price}")
-                            return price_info
-                    
-                    # 다른 가격 필드들 확인
-                    for price_field in ["price", "lowPrice", "highPrice"]:
-                        if price_field in data:
-                            price = str(data[price_field]).replace(",", "")
-                            if price and price.isdigit():
-                                price_info["price"] = price
-                                price_info["extraction_method"] = f"JSON-LD {price_field}"
-                                if debug:
-                                    st.write(f"[DEBUG] JSON-LD {price_field}에서 가격 찾음: {price}")
-                                return price_info
-                
-                # workExample 구조 확인
-                if "workExample" in data:
-                    work_examples = data["workExample"]
-                    if isinstance(work_examples, list) and work_examples:
-                        for work in work_examples:
-                            if "potentialAction" in work:
-                                action = work["potentialAction"]
-                                if "expectsAcceptanceOf" in action:
-                                    acceptance = action["expectsAcceptanceOf"]
-                                    if isinstance(acceptance, dict) and "Price" in acceptance:
-                                        price = str(acceptance["Price"]).replace(",", "")
-                                        if price.isdigit():
-                                            price_info["price"] = price
-                                            price_info["extraction_method"] = "JSON-LD workExample"
-                                            if debug:
-                                                st.write(f"[DEBUG] workExample에서 가격 찾음: {price}")
-                                            return price_info
-            
-            # 리스트 형태의 JSON-LD
-            elif isinstance(data, list):
-                for item in data:
-                    if isinstance(item, dict) and item.get("@type") == "Product":
-                        # 재귀적으로 처리
-                        temp_soup = BeautifulSoup(f'<script type="application/ld+json">{json.dumps(item)}</script>', "html.parser")
-                        result = extract_price_advanced(temp_soup, debug)
-                        if result["price"]:
-                            return result
-                            
-        except Exception as e:
-            if debug:
-                st.write(f"[DEBUG] JSON-LD 파싱 오류: {e}")
-            continue
-    
-    # 방법 2: Meta 태그에서 추출
-    meta_price = soup.find("meta", {"property": "product:price:amount"})
-    if meta_price and meta_price.get("content"):
-        price = meta_price["content"].replace(",", "")
-        if price.isdigit():
-            price_info["price"] = price
-            price_info["extraction_method"] = "Meta tag product:price:amount"
-            if debug:
-                st.write(f"[DEBUG] Meta 태그에서 가격 찾음: {price}")
-            return price_info
-    
-    # 방법 3: 특정 클래스명으로 추출 (교보문고 특화)
-    price_selectors = [
-        # 교보문고 특화 선택자들
-        ("span.price_normal", "price_normal class"),
-        ("span.sell_price", "sell_price class"),
-        ("strong.sell_price", "strong.sell_price"),
-        ("div.prod_price span.price", "prod_price span.price"),
-        ("div.prod_price strong", "prod_price strong"),
-        ("span.val", "val class"),
-        ("em.val", "em.val"),
-        ("strong.val", "strong.val"),
-        
-        # 일반적인 가격 선택자들
-        ("span[class*='price']", "class contains price"),
-        ("div[class*='price']", "div class contains price"),
-        ("strong[class*='price']", "strong class contains price"),
-        ("*[class*='sell']", "class contains sell"),
-        ("*[class*='cost']", "class contains cost"),
-        
-        # data 속성 활용
-        ("*[data-price]", "data-price attribute"),
-        ("*[data-value]", "data-value attribute"),
-        ("*[data-amount]", "data-amount attribute"),
-    ]
+    fetched = _fetch_columns(list(dict.fromkeys(missing + [ROW_PROBE_COLUMN])))
+    row_count = len(fetched[ROW_PROBE_COLUMN])
+    if cached and row_count != rows:
+        cached = {}
+        fetched = _fetch_columns(list(dict.fromkeys(list(columns) + [ROW_PROBE_COLUMN])))
+        row_count = len(fetched[ROW_PROBE_COLUMN])
     
-    for selector, method_name in price_selectors:
-        try:
-            elements = soup.select(selector)
-            for element in elements:
-                # data 속성 확인
-                if element.get("data-price"):
-                    price = element["data-price"].replace(",", "")
-                    if price.isdigit():
-                        price_info["price"] = price
-                        price_info["extraction_method"] = f"{method_name} (data-price)"
-                        if debug:
-                            st.write(f"[DEBUG] {method_name}에서 가격 찾음: {price}")
-                        return price_info
-                
-                # 텍스트에서 가격 추출
-                text = element.get_text(strip=True)
-                if text:
-                    # 숫자만 추출 (쉼표 포함)
-                    numbers = price_pattern.findall(text)
-                    for num in numbers:
-                        num_clean = num.replace(",", "")
-                        # 가격으로 적절한 범위인지 확인 (1000원 이상, 1000만원 이하)
-                        if num_clean.isdigit() and 1000 <= int(num_clean) <= 10000000:
-                            price_info["price"] = num_clean
-                            price_info["extraction_method"] = method_name
-                            if debug:
-                                st.write(f"[DEBUG] {method_name}에서 가격 찾음: {num_clean}")
-                            return price_info
-                            
-        except Exception as e:
-            if debug:
-                st.write(f"[DEBUG] 선택자 {selector} 처리 중 오류: {e}")
-            continue
-    
-    # 방법 4: 텍스트 패턴으로 추출
-    text_patterns = [
-        (r'판매가[:\s]*([0-9,]+)\s*원', "판매가 패턴"),
-        (r'정가[:\s]*([0-9,]+)\s*원', "정가 패턴"),
-        (r'가격[:\s]*([0-9,]+)\s*원', "가격 패턴"),
-        (r'(\d{1,3}(?:,\d{3})*)\s*원', "숫자+원 패턴"),
-        (r'₩\s*([0-9,]+)', "원화 기호 패턴"),
-        (r'KRW\s*([0-9,]+)', "KRW 패턴"),
-    ]
-    
-    page_text = soup.get_text()
-    for pattern, method_name in text_patterns:
-        matches = re.finditer(pattern, page_text)
-        for match in matches:
-            price = match.group(1).replace(",", "")
-            if price.isdigit() and 1000 <= int(price) <= 10000000:
-                price_info["price"] = price
-                price_info["extraction_method"] = method_name
-                if debug:
-                    st.write(f"[DEBUG] {method_name}에서 가격 찾음: {price}")
-                return price_info
-    
-    if debug:
-        st.write("[DEBUG] 가격 정보를 찾을 수 없음")
-    
-    return price_info
-
-# ==================== 강화된 도서 정보 추출 함수 ====================
-def extract_book_info_enhanced(soup, debug=False):
-    """
-    강화된 도서 정보 추출 함수
-    """
-    # 기본 정보 추출
-    title = author = publisher = ""
-    
-    # 도서명 추출
-    title_tag = soup.find("meta", property="og:title")
-    if title_tag:
-        title = title_tag.get("content", "").replace(" | 교보문고", "").strip()
-    
-    if not title:
-        title_tag = soup.find("title")
-        if title_tag:
-            title = title_tag.get_text().replace(" | 교보문고", "").strip()
-    
-    # JSON-LD에서 저자, 출판사 정보 추출
-    json_scripts = soup.find_all("script", type="application/ld+json")
-    for script in json_scripts:
-        try:
-            data = json.loads(script.string)
-            
-            if not title and "name" in data:
-                title = data["name"]
-            
-            if "author" in data and not author:
-                if isinstance(data["author"], list):
-                    author = ", ".join([a.get("name", "") for a in data["author"] if isinstance(a, dict)])
-                elif isinstance(data["author"], dict):
-                    author = data["author"].get("name", "")
-                else:
-                    author = str(data["author"])
-            
-            if "publisher" in data and not publisher:
-                if isinstance(data["publisher"], dict):
-                    publisher = data["publisher"].get("name", "")
-                else:
-                    publisher = str(data["publisher"])
-                    
-        except:
-            continue
+    with store["lock"]:
+        # 읽는 동안 쓰기로 무효화됐으면 캐시에 넣지 않음 (이번 결과만 사용)
+        if store["generation"] == generation:
+            if store["rows"] != row_count:
+                store["columns"].clear()
+            store["columns"].update(fetched)
+            store["rows"] = row_count
+    cached.update(fetched)
+    return {col: cached[col] for col in columns}
+
+@st.cache_data(ttl=APPLICATIONS_TTL, show_spinner=False)
+def _application_columns(columns, generation):
+    """
+    신청 내역 중 columns(튜플)만 모아서 타입이 지정된 DataFrame으로 반환 (rerun 간 캐시, 쓰기 시 무효화)
+    컬럼 캐시에서 조립하므로 화면에 필요 없는 컬럼(긴 구매사이트 URL 등)은 내려받지 않는다
+    타입 변환에 실패한 값은 df.attrs["schema_errors"]에 기록
+    generation은 캐시 키로만 쓴다 (get_application_columns 참고)
+    """
+    import pandas as pd
     
-    # 강화된 가격 추출 사용
-    price_info = extract_price_advanced(soup, debug=debug)
+    values = load_columns(columns)
+    # 컬럼마다 끝의 빈 칸은 잘려서 오므로 가장 긴 컬럼에 맞춰 채운다
+    length = max((len(column) for column in values.values()), default=0)
+    if not length:
+        df = pd.DataFrame(columns=list(columns) + ["_row"])
+        df.attrs["schema_errors"] = []
+        return df
+    df = pd.DataFrame({col: column + [""] * (length - len(column)) for col, column in values.items()})
+    # 정렬 전에 시트 행 번호 기록 (신청ID가 없는 예전 행 수정용)
+    df['_row'] = range(2, length + 2)
+    df, errors = apply_record_schema(df)
+    # 신청시간 기준 내림차순 정렬 (최신순)
+    if '신청시간' in df.columns:
+        df = df.sort_values('신청시간', ascending=False)
+    df.attrs["schema_errors"] = errors
+    return df
+
+def get_application_columns(columns):
+    """
+    columns(튜플)만 모은 신청 내역 DataFrame
+    컬럼 저장소의 generation을 캐시 키에 넣어서, 쓰기 전에 계산을 시작한 화면이 무효화 뒤에
+    저장한 예전 DataFrame은 새 generation에서 쓰이지 않게 한다
+    """
+    apply_background_writes()
+    store = get_column_store()
+    with store["lock"]:
+        generation = store["generation"]
+    return _application_columns(columns, generation)
+
+def get_applications():
+    """시트 전체 신청 내역 (모든 컬럼)"""
+    return get_application_columns(tuple(APPLICATION_COLUMNS))
+
+def show_schema_errors(df):
+    """타입 변환에 실패한 행 안내"""
+    import pandas as pd
     
+    errors = df.attrs.get("schema_errors", [])
+    if errors:
+        with st.expander(f"⚠️ 형식이 잘못된 값 {len(errors)}건 (0 또는 빈 값으로 처리됨)"):
+            st.dataframe(pd.DataFrame(errors), use_container_width=True)
+
+def invalidate_applications(columns=None):
+    """
+    시트에 쓰기를 한 뒤 캐시된 신청 내역 비우기
+    columns를 주면 그 컬럼만 다시 읽는다 (행 수는 그대로이고 수량/가격만 바꾼 경우 등)
+    행을 추가하는 쓰기(신청 추가, 보관함 반영)는 columns 없이 불러서 모든 컬럼을 버린다
+    """
+    store = get_column_store()
+    with store["lock"]:
+        store["generation"] += 1
+        if columns is None:
+            store["columns"].clear()
+            store["rows"] = None
+        else:
+            for col in columns:
+                store["columns"].pop(col, None)
+    _application_columns.clear()
+
+# ==================== 누적 집계 저장소 ====================
+AGGREGATES_TTL = 3600  # 시트를 직접 수정한 경우를 위해 주기적으로 다시 계산 (초)
+
+def _empty_totals():
+    return {"count": 0, "qty": 0, "amount": 0}
+
+@st.cache_resource(ttl=AGGREGATES_TTL)
+def get_aggregate_store():
+    """
+    신청 건수/수량/금액 누적 집계 (모든 세션 공유)
+    전체 합계와 신청자별/출판사별/일자별 합계를 정수로 유지한다
+    """
     return {
-        "title": title,
-        "author": author,
-        "publisher": publisher,
-        "price": price_info["price"],
-        "original_price": price_info.get("original_price", ""),
-        "extraction_method": price_info.get("extraction_method", "")
+        "loaded": False,
+        "lock": threading.Lock(),
+        "total": _empty_totals(),
+        "by_applicant": {},
+        "by_publisher": {},
+        "by_day": {},
     }
 
-# ==================== 개선된 고급 스크래핑 함수 ====================
-def get_book_info_advanced(kyobo_url, max_retries=3, debug=False):
-    """개선된 도서 정보 추출 함수"""
-    import os
+def _apply_delta(store, applicant, publisher, day, count, qty, amount):
+    """집계 저장소의 각 버킷에 변화량 반영 (lock을 잡은 상태에서 호출)"""
+    buckets = [store["total"]]
+    for group, key in (("by_applicant", applicant), ("by_publisher", publisher), ("by_day", day)):
+        buckets.append(store[group].setdefault(key or "(없음)", _empty_totals()))
+    for bucket in buckets:
+        bucket["count"] += count
+        bucket["qty"] += qty
+        bucket["amount"] += amount
+
+def load_aggregates(df):
+    """캐시된 신청 내역으로 집계를 한 번만 계산 (이후에는 증분 갱신)"""
+    store = get_aggregate_store()
+    if store["loaded"]:
+        return store
+    with store["lock"]:
+        if store["loaded"]:
+            return store
+        for row in df.to_dict("records"):
+            _apply_delta(store,
+                         row.get("신청자 성명", ""), row.get("출판사", ""), str(row.get("신청시간", ""))[:10],
+                         1, to_int(row.get("수량", 0)), to_int(row.get("가격", 0)))
+        store["loaded"] = True
+    return store
+
+def record_append(values):
+    """새 신청 행(APPLICATION_COLUMNS 순서) 추가를 집계에 반영"""
+    store = get_aggregate_store()
+    if not store["loaded"]:
+        return
+    row = dict(zip(APPLICATION_COLUMNS, values))
+    with store["lock"]:
+        _apply_delta(store, row["신청자 성명"], row["출판사"], str(row["신청시간"])[:10],
+                     1, to_int(row["수량"]), to_int(row["가격"]))
+
+def record_quantity_change(row, new_qty, new_amount):
+    """수량 변경을 집계에 반영 (row는 변경 전 신청 내역 행)"""
+    store = get_aggregate_store()
+    if not store["loaded"]:
+        return
+    with store["lock"]:
+        _apply_delta(store, row["신청자 성명"], row["출판사"], str(row["신청시간"])[:10],
+                     0, to_int(new_qty) - to_int(row["수량"]), to_int(new_amount) - to_int(row["가격"]))
+
+# ==================== 중복 신청 인덱스 ====================
+def product_key(url, title, publisher):
+    """같은 도서 판별 키: 구매사이트의 교보문고 상품번호, 없으면 정규화한 도서명+출판사"""
+    match = re.search(r"/detail/(S\d+)", str(url or ""))
+    if match:
+        return match.group(1)
+    from title_index import normalize_text
+    return f"{normalize_text(title)}|{normalize_text(publisher)}"
+
+def _duplicate_key(row):
+    return (product_key(row.get("구매사이트"), row.get("도서명"), row.get("출판사")),
+            str(row.get("신청자 성명", "")).strip())
+
+@st.cache_resource(ttl=AGGREGATES_TTL)
+def get_duplicate_index():
+    """
+    (도서 키, 신청자) → 가장 최근 신청 행 (모든 세션 공유)
+    신청 버튼을 누를 때 시트를 다시 읽지 않고 한 번의 dict 조회로 중복을 찾는다
+    """
+    return {"loaded": False, "lock": threading.Lock(), "entries": {}}
+
+def load_duplicate_index(df):
+    """캐시된 신청 내역으로 중복 인덱스를 한 번만 구성 (이후에는 증분 갱신)"""
+    index = get_duplicate_index()
+    if index["loaded"]:
+        return index
+    with index["lock"]:
+        if index["loaded"]:
+            return index
+        # 신청 내역은 최신순이므로 먼저 나온 행이 가장 최근 신청
+        for row in df.to_dict("records"):
+            index["entries"].setdefault(_duplicate_key(row), row)
+        index["loaded"] = True
+    return index
+
+def find_duplicate(values):
+    """새 신청 행(APPLICATION_COLUMNS 순서)과 같은 신청자의 같은 도서 신청 행 (없으면 None)"""
+    try:
+        index = load_duplicate_index(get_application_columns(DUPLICATE_INDEX_COLUMNS))
+    except Exception as e:
+        if not is_sheet_unavailable(e):
+            raise
+        # 시트를 읽을 수 없으면 중복 확인 없이 진행 (신청은 보관함으로 들어감)
+        return None
+    return index["entries"].get(_duplicate_key(dict(zip(APPLICATION_COLUMNS, values))))
+
+def record_duplicate(row):
+    """새로 추가한 신청 행을 중복 인덱스에 등록"""
+    index = get_duplicate_index()
+    if not index["loaded"]:
+        return
+    with index["lock"]:
+        index["entries"][_duplicate_key(row)] = row
+
+def _same_application(a, b):
+    if a.get("신청ID") or b.get("신청ID"):
+        return a.get("신청ID") == b.get("신청ID")
+    return a.get("_row") == b.get("_row")
+
+def change_quantity(row, new_qty):
+    """
+    신청 행 하나의 수량(단가가 있으면 가격도) 변경 후 집계/중복 인덱스 반영
+    row는 변경 전 신청 내역 행, 시트에서 행을 찾지 못하면 False
+    """
+    app_id = row.get("신청ID", "")
+    if app_id:
+        # 신청ID로 현재 행 번호 조회 (정렬 순서와 무관)
+        sheet_row_num = get_row_index().resolve(get_worksheet(), app_id)
+    else:
+        # 신청ID가 없는 예전 행은 불러올 때의 행 번호 사용
+        sheet_row_num = int(row["_row"])
+    if sheet_row_num is None:
+        return False
     
-    # 웹 환경 체크
-    is_web = os.getenv('STREAMLIT_SHARING_MODE') is not None
-    
-    if is_web and debug:
-        st.warning("⚠️ 웹 환경에서는 스크래핑이 제한될 수 있습니다.")
-    
-    user_agents = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15"
-    ]
-    
-    def get_realistic_headers():
-        return {
-            "User-Agent": random.choice(user_agents),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-            "Referer": "https://www.google.com/",
-            "Cache-Control": "max-age=0",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "none",
-            "Sec-Fetch-User": "?1"
-        }
-    
-    session = requests.Session()
-    
-    # 웹 환경에서는 시도 횟수 줄이기
-    actual_retries = 1 if is_web else max_retries
-    
-    for attempt in range(actual_retries):
-        try:
-            if attempt > 0:
-                time.sleep(random.uniform(2, 5))
-            
-            headers = get_realistic_headers()
-            
-            # 쿠키 설정 (교보문고 특화)
-            session.cookies.set('PCID', str(random.randint(1000000000, 9999999999)))
-            
-            # verify 파라미터 조정 (웹 환경에서는 True)
-            verify_ssl = True if is_web else False
-            
-            response = session.get(kyobo_url, headers=headers, timeout=30, verify=verify_ssl)
-            
-            if debug:
-                st.write(f"[DEBUG] 시도 {attempt+1}: 상태코드={response.status_code}, 크기={len(response.text)}")
-                if len(response.text) < 100:
-                    st.write(f"[DEBUG] 응답 내용: {response.text[:100]}")
-            
-            if response.status_code == 200 and len(response.text) > 1000:
-                soup = BeautifulSoup(response.text, "html.parser")
-                
-                # 강화된 추출 함수 사용
-                book_info = extract_book_info_enhanced(soup, debug=debug)
-                
-                if book_info and any(book_info.values()):
-                    # 가격이 없으면 추가 시도
-                    if not book_info.get("price") and not is_web:
-                        if debug:
-                            st.warning("⚠️ 첫 시도에서 가격을 찾지 못함. 추가 방법 시도 중...")
-                        
-                        # 페이지 새로고침 후 재시도
-                        time.sleep(1)
-                        response = session.get(kyobo_url, headers=get_realistic_headers(), timeout=30, verify=verify_ssl)
-                        if response.status_code == 200:
-                            soup = BeautifulSoup(response.text, "html.parser")
-                            price_info = extract_price_advanced(soup, debug=debug)
-                            if price_info["price"]:
-                                book_info["price"] = price_info["price"]
-                                book_info["extraction_method"] = price_info["extraction_method"]
-                    
-                    return book_info
-                    
-        except Exception as e:
-            if debug:
-                st.error(f"[DEBUG] 시도 {attempt+1} 실패: {e}")
-            continue
+    from gspread.utils import rowcol_to_a1
+    
+    unit_price = to_int(row["단가"])
+    # 단가를 알 수 없으면 가격 셀은 건드리지 않음
+    new_total_price = unit_price * new_qty if unit_price > 0 else None
+    # 수량/가격 셀은 요청 한 번으로 수정
+    cells = [{"range": rowcol_to_a1(sheet_row_num, QTY_COL_NUM), "values": [[new_qty]]}]
+    if new_total_price is not None:
+        cells.append({"range": rowcol_to_a1(sheet_row_num, PRICE_COL_NUM), "values": [[new_total_price]]})
+    get_worksheet().batch_update(cells, value_input_option="USER_ENTERED")
+    new_amount = row["가격"] if new_total_price is None else new_total_price
+    record_quantity_change(row, new_qty, new_amount)
     
-    # 웹 환경에서 실패 시 안내
-    if is_web and debug:
-        st.info("💡 자동 추출이 실패했습니다. 위의 '대체 입력 방법'을 사용해주세요.")
+    index = get_duplicate_index()
+    with index["lock"]:
+        if "구매사이트" in row:
+            key = _duplicate_key(row)
+        else:
+            # 구매사이트 컬럼 없이 읽은 행은 인덱스에서 같은 신청을 찾음
+            key = next((k for k, entry in index["entries"].items() if _same_application(entry, row)), None)
+        entry = index["entries"].get(key)
+        if entry is not None and _same_application(entry, row):
+            index["entries"][key] = dict(entry, 수량=new_qty, 가격=new_amount)
+    # 바뀐 수량/가격 컬럼만 다시 읽음
+    invalidate_applications(["수량", "가격"])
+    return True
+
+def submit_application(values, pending_key, submitted):
+    """
+    신청 버튼 처리
+    같은 신청자가 같은 도서를 이미 신청했으면 바로 추가하지 않고
+    기존 신청 수량 늘리기 / 별도로 새로 신청 / 취소 중에서 고르게 한다
+    반환: "appended", "merged", "queued"(시트에 쓰지 못해 보관함), 또는 아직 처리되지 않았으면 None
+    """
+    if submitted:
+        if find_duplicate(values) is None:
+            return "appended" if append_application(values) else "queued"
+        st.session_state[pending_key] = list(values)
+    
+    pending = st.session_state.get(pending_key)
+    if pending is None:
+        return None
+    entry = find_duplicate(pending)
+    if entry is None:
+        # 그 사이에 기존 신청을 찾을 수 없게 된 경우 그대로 추가
+        del st.session_state[pending_key]
+        return "appended" if append_application(pending) else "queued"
+    
+    add_qty = to_int(pending[QTY_COL_NUM - 1])
+    st.warning(f"⚠️ 이미 신청한 도서입니다: **{entry['도서명']}** "
+               f"({str(entry['신청시간'])[:16]} 신청, 현재 {to_int(entry['수량'])}권)")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        merge = st.button(f"➕ 기존 신청에 {add_qty}권 추가", key=f"{pending_key}_merge", type="primary")
+    with col2:
+        append = st.button("📝 별도로 새로 신청", key=f"{pending_key}_append")
+    with col3:
+        cancel = st.button("취소", key=f"{pending_key}_cancel")
     
+    if merge:
+        del st.session_state[pending_key]
+        if not change_quantity(entry, to_int(entry["수량"]) + add_qty):
+            st.error("❌ 기존 신청 건을 시트에서 찾을 수 없습니다. 새로고침 후 다시 시도해주세요.")
+            return None
+        return "merged"
+    if append:
+        del st.session_state[pending_key]
+        return "appended" if append_application(pending) else "queued"
+    if cancel:
+        del st.session_state[pending_key]
+        st.rerun(scope="fragment")
     return None
 
-# ==================== 신청 내역 불러오기 함수 ====================
-def get_applications():
-    records = worksheet.get_all_records()
-    if records:
-        df = pd.DataFrame(records)
-        # 신청시간 기준 내림차순 정렬 (최신순)
-        if '신청시간' in df.columns:
-            try:
-                df['신청시간'] = pd.to_datetime(df['신청시간'])
-                df = df.sort_values('신청시간', ascending=False)
-            except Exception:
-                # 날짜 변환 실패 시 문자열 기준 정렬
-                df = df.sort_values('신청시간', ascending=False)
-        return df
-    else:
-        # 요구사항에 맞는 컬럼 순서
-        return pd.DataFrame(columns=["신청시간", "신청자 성명", "도서명", "저자명", "출판사", "단가", "수량", "구매사이트", "가격"])
+SUBMIT_NOTICE_KEY = "submit_notice"
+
+def finish_submission(level, message):
+    """
+    신청 결과 안내를 남기고 페이지 전체를 다시 실행
+    신청 화면은 fragment라서 그 화면만 다시 실행하면 아래 전체 신청 내역(건수/합계)이 예전 값으로 남는다
+    """
+    st.session_state[SUBMIT_NOTICE_KEY] = (level, message)
+    st.rerun()
+
+def show_submit_notice():
+    """finish_submission이 남긴 안내를 한 번만 표시"""
+    notice = st.session_state.pop(SUBMIT_NOTICE_KEY, None)
+    if notice:
+        level, message = notice
+        getattr(st, level)(message)
+        if level == "success":
+            st.balloons()
+
+# ==================== 도서명 자동완성 인덱스 ====================
+@st.cache_resource(max_entries=1, show_spinner=False)
+def get_title_index(fingerprint):
+    """
+    로컬 캐시 + 신청 시트의 도서로 도서명/저자명 검색 인덱스 생성
+    fingerprint(시트 행 수, 캐시 건수)가 바뀔 때만 다시 색인한다
+    """
+    from title_index import TitleIndex
+    
+    books = list(get_cache().all())
+    df = get_application_columns(TITLE_INDEX_COLUMNS)
+    for _, row in df.iterrows():
+        books.append({
+            "title": row.get("도서명", ""),
+            "author": row.get("저자명", ""),
+            "publisher": row.get("출판사", ""),
+            "price": to_int(row.get("단가", 0)) or "",
+            "url": row.get("구매사이트", ""),
+        })
+    return TitleIndex(books)
+
+def current_title_index():
+    return get_title_index((len(get_application_columns(TITLE_INDEX_COLUMNS)), len(get_cache())))
+
+# ==================== 신청 내역 페이지 표시 함수 ====================
+def render_paginated_table(df, key, default_columns=None, page_size=20):
+    """
+    캐시된 DataFrame에서 검색/정렬/컬럼 선택/페이지 나누기를 서버에서 처리하고
+    현재 페이지의 행만 브라우저로 보낸다
+    """
+    import pandas as pd
+    
+    visible_columns = [c for c in df.columns if not c.startswith("_")]
+    
+    ctrl1, ctrl2, ctrl3 = st.columns([2, 1, 1])
+    with ctrl1:
+        query = st.text_input("🔎 검색 (도서명/저자명/출판사/신청자)", key=f"{key}_query")
+    with ctrl2:
+        sort_col = st.selectbox("정렬 기준", visible_columns, key=f"{key}_sort",
+                                index=visible_columns.index("신청시간") if "신청시간" in visible_columns else 0)
+    with ctrl3:
+        ascending = st.selectbox("정렬 순서", ["내림차순", "오름차순"], key=f"{key}_order") == "오름차순"
+    
+    columns = st.multiselect("표시할 컬럼", visible_columns,
+                             default=[c for c in (default_columns or visible_columns) if c in visible_columns],
+                             key=f"{key}_columns")
+    
+    view = df
+    if query:
+        mask = pd.Series(False, index=view.index)
+        for col in ["도서명", "저자명", "출판사", "신청자 성명"]:
+            if col in view.columns:
+                mask |= view[col].astype(str).str.contains(query, case=False, regex=False, na=False)
+        view = view[mask]
+    
+    if sort_col in view.columns:
+        try:
+            view = view.sort_values(sort_col, ascending=ascending)
+        except TypeError:
+            # 문자열/숫자가 섞인 컬럼은 문자열 기준 정렬
+            view = view.sort_values(sort_col, ascending=ascending, key=lambda c: c.astype(str))
+    
+    total_rows = len(view)
+    total_pages = max(1, -(-total_rows // page_size))
+    page = st.number_input(f"페이지 (총 {total_pages}페이지, {total_rows:,}건)",
+                           min_value=1, max_value=total_pages, value=1, step=1, key=f"{key}_page")
+    start = (page - 1) * page_size
+    
+    # 현재 페이지 + 선택한 컬럼만 직렬화
+    st.dataframe(view.iloc[start:start + page_size][columns or visible_columns], use_container_width=True)
 
 # ==================== 세션 상태 초기화 ====================
 if "extraction_stats" not in st.session_state:
@@ -371,6 +523,10 @@ if "extraction_stats" not in st.session_state:
 if "extracted_info" not in st.session_state:
     st.session_state.extracted_info = {}
 
+# 정규화된 URL → 조회 결과 (세션당 URL 하나에 한 번만 추출)
+if "lookup_results" not in st.session_state:
+    st.session_state.lookup_results = {}
+
 # ==================== 로그인 처리 ====================
 if not hasattr(st, "user") or not getattr(st.user, "is_logged_in", False):
     if st.button("Contact with Google"):
@@ -382,8 +538,11 @@ if "user" not in st.session_state:
     st.session_state["user"] = st.user.to_dict()
 
 # ==================== 상단 정보 표시 ====================
+import pytz
+
 seoul = pytz.timezone("Asia/Seoul")
 now = datetime.now(seoul)
+
 col1, col2, col3, col4 = st.columns(4)
 
 col1.write(f"**신청시간:** {now.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -403,20 +562,505 @@ SCOPE = [
     "https://www.googleapis.com/auth/drive"
 ]
 SPREADSHEET_ID = "1Jf3KoUk8pUGhY_kRnVK-yIpdQe8DQYjCc0eH4GmNC50"
-SERVICE_ACCOUNT_INFO = dict(st.secrets["google_service_account"])
-creds = Credentials.from_service_account_info(
-    SERVICE_ACCOUNT_INFO, scopes=SCOPE
-)
-gc = gspread.authorize(creds)
-sh = gc.open_by_key(SPREADSHEET_ID)
-worksheet = sh.sheet1
 
-# ==================== 탭 생성 ====================
-tab1, tab2, tab3 = st.tabs(["📚 신규 도서 신청", "🔄 수량 변경", "✍️ 직접입력"])
+@st.cache_resource
+def open_worksheet():
+    """
+    Sheets 클라이언트를 처음 필요할 때 한 번만 만들고 모든 세션에서 재사용
+    (rerun마다 인증/시트 열기를 반복하지 않음)
+    """
+    import gspread
+    from google.oauth2.service_account import Credentials
+    
+    SERVICE_ACCOUNT_INFO = dict(st.secrets["google_service_account"])
+    creds = Credentials.from_service_account_info(
+        SERVICE_ACCOUNT_INFO, scopes=SCOPE
+    )
+    gc = gspread.authorize(creds)
+    sh = gc.open_by_key(SPREADSHEET_ID)
+    worksheet = sh.sheet1
+    # 신청ID를 처음 쓰기 전에 헤더부터 둔다 (신청ID 컬럼이 없던 시트 호환)
+    ensure_id_header(worksheet, ID_COL_NUM)
+    return worksheet
+
+@st.cache_resource
+def get_sheet_scheduler():
+    """
+    서버 프로세스당 하나: 모든 세션/백그라운드 작업의 시트 요청을 분당 할당량 안에서
+    쓰기 우선으로 보내고, 같은 읽기와 셀 수정/행 추가는 합쳐서 보낸다
+    """
+    return SheetScheduler(open_worksheet())
+
+def get_worksheet():
+    """화면에서 쓰는 시트 (요청은 스케줄러를 거침)"""
+    return get_sheet_scheduler().worksheet()
+
+# ==================== 백그라운드 작업의 쓰기 반영 ====================
+# 백그라운드 스레드에는 ScriptRunContext가 없어서 st 캐시 API(cache_resource 함수, .clear())를 부를 수 없다.
+# 스레드는 시트에 쓴 내용만 여기에 적어 두고, 캐시 비우기는 다음 화면 실행(스크립트 스레드)에서 한다.
+
+@st.cache_resource
+def get_background_writes():
+    """
+    백그라운드 작업이 시트에 쓴 뒤 아직 반영하지 않은 캐시 무효화 (모든 세션 공유)
+    columns: 다시 읽을 컬럼, all_rows: 행이 추가되어 모든 컬럼과 행 번호 인덱스를 버려야 하는지
+    """
+    return {"lock": threading.Lock(), "pending": False, "columns": set(), "all_rows": False}
+
+def note_background_write(writes, columns=None):
+    """
+    백그라운드 스레드에서 호출: 시트에 쓴 내용 기록 (st 호출 없음)
+    columns 없이 부르면 행이 추가된 것으로 본다 (invalidate_applications와 같은 규칙)
+    """
+    with writes["lock"]:
+        if columns is None:
+            writes["all_rows"] = True
+        else:
+            writes["columns"].update(columns)
+        writes["pending"] = True
+
+def apply_background_writes():
+    """스크립트 스레드에서 호출: 기록된 백그라운드 쓰기만큼 신청 내역/집계/인덱스 캐시 비우기"""
+    writes = get_background_writes()
+    with writes["lock"]:
+        if not writes["pending"]:
+            return
+        columns = None if writes["all_rows"] else sorted(writes["columns"])
+        writes.update(pending=False, columns=set(), all_rows=False)
+    invalidate_applications(columns)
+    get_aggregate_store.clear()
+    get_duplicate_index.clear()
+    if columns is None:
+        get_row_index.clear()
+
+# ==================== 단가 재확인 작업 ====================
+PRICE_REFRESH_HOURS = 24  # 단가 재확인 주기 (시간)
+
+@st.cache_resource
+def get_price_refresh_job():
+    """
+    서버 프로세스당 하나: 주기적으로 시트 단가를 재확인하는 백그라운드 스레드
+    "지금 재확인"은 trigger 이벤트로 바로 깨운다
+    시트와 쓰기 기록은 스크립트 스레드에서 미리 잡아 두고, 스레드 안에서는 st를 부르지 않는다
+    """
+    job = {"lock": threading.Lock(), "trigger": threading.Event(), "running": False,
+           "last_report": None, "error": None}
+    worksheet = get_sheet_scheduler().worksheet(background=True)
+    writes = get_background_writes()
+    
+    def run():
+        from price_refresh import refresh_prices
+        
+        while True:
+            job["trigger"].wait(PRICE_REFRESH_HOURS * 3600)
+            job["trigger"].clear()
+            with job["lock"]:
+                job["running"] = True
+            try:
+                report = refresh_prices(worksheet)
+                job["last_report"], job["error"] = report, None
+                if report["applied"]:
+                    # 단가/가격이 바뀌었으므로 다음 화면 실행에서 캐시된 내역과 집계를 다시 만든다
+                    note_background_write(writes, ["단가", "가격"])
+            except Exception as e:
+                job["error"] = str(e)
+            finally:
+                with job["lock"]:
+                    job["running"] = False
+    
+    threading.Thread(target=run, name="price-refresh", daemon=True).start()
+    return job
+
+# ==================== 캐시 예열 ====================
+WARMUP_LIMIT = 200  # 미리 조회할 상품 수 (신청 횟수가 많은 순)
+
+@st.cache_resource
+def get_cache_warmup_job():
+    """
+    서버 시작 후 한 번: 시트 구매사이트 컬럼에서 자주 신청된 상품을 백그라운드로 캐시에 채움
+    (재시작 직후 첫 사용자들이 매번 페이지를 새로 받아서 파싱하지 않도록)
+    """
+    job = {"running": True, "done": 0, "total": 0, "summary": None, "error": None}
+    worksheet = get_sheet_scheduler().worksheet(background=True)
+    
+    def run():
+        try:
+            urls = worksheet.col_values(URL_COL_NUM)[1:]
+            job["summary"] = warm_cache(urls, limit=WARMUP_LIMIT,
+                                        progress=lambda done, total: job.update(done=done, total=total))
+        except Exception as e:
+            job["error"] = str(e)
+        finally:
+            job["running"] = False
+    
+    threading.Thread(target=run, name="cache-warmup", daemon=True).start()
+    return job
+
+# ==================== 보관된 신청 다시 보내기 ====================
+QUEUE_REPLAY_SECONDS = 60  # 보관된 신청을 다시 보내 보는 주기 (초)
+QUEUED_MESSAGE = "📮 지금은 시트에 연결할 수 없어 신청을 보관했습니다. 시트가 복구되면 신청한 순서대로 자동으로 반영됩니다."
+
+@st.cache_resource
+def get_submission_replay_job():
+    """
+    서버 프로세스당 하나: 보관함의 신청을 주기적으로 시트에 다시 추가하는 백그라운드 스레드
+    새 신청이 보관함 뒤에 들어오거나 "지금 다시 보내기"를 누르면 trigger 이벤트로 바로 깨운다
+    시트는 connect_submission_replay가 스크립트 스레드에서 연결해 job["worksheet"]에 넣어 준다
+    """
+    job = {"trigger": threading.Event(), "running": False, "last_result": None, "worksheet": None}
+    queue = get_queue()
+    writes = get_background_writes()
+    
+    def run():
+        while True:
+            job["trigger"].wait(QUEUE_REPLAY_SECONDS)
+            job["trigger"].clear()
+            worksheet = job["worksheet"]
+            if not len(queue) or worksheet is None:
+                continue
+            job["running"] = True
+            try:
+                result = replay(queue, worksheet, ID_COL_NUM)
+            except Exception as e:
+                queue.last_error = str(e)
+                result = {"applied": 0, "skipped": 0, "rejected": 0, "remaining": len(queue), "error": str(e)}
+            job["last_result"] = result
+            if result["applied"]:
+                # 세션들이 모르는 행이 추가됐으므로 다음 화면 실행에서 캐시된 내역과 인덱스를 다시 만든다
+                note_background_write(writes)
+            job["running"] = False
+    
+    threading.Thread(target=run, name="submission-replay", daemon=True).start()
+    return job
+
+def connect_submission_replay(job):
+    """
+    다시 보내기 스레드가 쓸 시트를 스크립트 스레드에서 연결해 넘김
+    시트 연결(인증) 자체가 실패하면 보관함에 오류만 남기고 다음 화면 실행에서 다시 연결한다
+    """
+    if job["worksheet"] is None:
+        try:
+            job["worksheet"] = get_worksheet()
+        except Exception as e:
+            get_queue().last_error = str(e)
+    return job
+
+# ==================== 화면(뷰) 선택 ====================
+# st.tabs는 모든 탭 본문을 매번 실행하므로, 선택된 화면 하나만 그린다
+VIEWS = ["📚 신규 도서 신청", "🔄 수량 변경", "✍️ 직접입력"]
+active_view = st.radio("메뉴", VIEWS, horizontal=True, key="active_view", label_visibility="collapsed")
+
+# ==================== URL 조회 및 결과 패널 ====================
+def normalize_kyobo_url(url):
+    """
+    입력한 URL을 정규화 (같은 상품이면 같은 키가 되도록 상품번호 기준으로 정리)
+    ISBN을 입력한 경우 "isbn:<ISBN-13>" 키를 반환
+    """
+    url = url.lstrip('@').strip()
+    isbn = normalize_isbn(url)
+    if isbn:
+        return f"isbn:{isbn}"
+    match = re.search(r"/detail/(S\d+)", url)
+    if match:
+        return f"https://product.kyobobook.co.kr/detail/{match.group(1)}"
+    return url.split("#")[0]
+
+LOOKUP_DEADLINE = 30  # URL 조회 한 번에 쓸 수 있는 전체 시간 (초)
+
+def fetch_book(kyobo_url, debug_mode=False, deadline=None, diagnostics=None):
+    """
+    정규화된 URL("isbn:" 키 포함)로 도서 정보 조회
+    KYOBO_SERVICE_URL이 있으면 추출 서비스(공유 캐시 / 연결 풀)에 묻고,
+    서비스에 연결할 수 없으면 이 프로세스에서 직접 추출한다
+    """
+    isbn = kyobo_url[len("isbn:"):] if kyobo_url.startswith("isbn:") else None
+    if SERVICE_URL:
+        try:
+            book_info, summary = service_lookup(kyobo_url=kyobo_url, isbn=isbn, deadline=deadline)
+            if summary and diagnostics is not None:
+                diagnostics[kyobo_url] = summary
+            return book_info
+        except ServiceUnavailable as e:
+            if debug_mode:
+                st_log("warning", f"⚠️ 추출 서비스에 연결할 수 없어 직접 조회합니다: {e}")
+    if isbn:
+        return get_book_info_by_isbn(isbn, debug=debug_mode, log=st_log, deadline=deadline)
+    return get_book_info(kyobo_url, debug=debug_mode, log=st_log, deadline=deadline, diagnostics=diagnostics)
+
+def lookup_book(kyobo_url, debug_mode, progress_bar, status_text, debug_container=None):
+    """
+    1단계(상품 API / 고급 스크래핑) → 2단계(실패 시 받은 응답 분석) 순서로 도서 정보 조회
+    "isbn:" 키는 로컬 ISBN 인덱스 → 교보문고 검색 순서로 조회
+    모든 단계가 LOOKUP_DEADLINE초 예산 하나를 나눠 쓴다 (남은 시간은 진행 표시줄에 표시)
+    세션 메모에 저장할 수 있도록 결과를 dict로 반환 (url: 신청서에 넣을 상품 URL)
+    """
+    result = {
+        "title": "", "author": "", "publisher": "", "price": "", "url": kyobo_url,
+        "extraction_method": "", "success": False, "maintenance": False, "timed_out": False, "response": None
+    }
+    deadline = Deadline(LOOKUP_DEADLINE)
+    diagnostics = {}
+    
+    def show_progress(percent, message):
+        progress_bar.progress(percent, text=f"⏱️ 남은 시간 {deadline.remaining():.0f}초 / {LOOKUP_DEADLINE}초")
+        status_text.text(message)
+    
+    if kyobo_url.startswith("isbn:"):
+        show_progress(25, "ISBN으로 도서 검색 중...")
+        book_info = fetch_book(kyobo_url, debug_mode, deadline)
+        if not book_info:
+            result["timed_out"] = deadline.expired()
+            show_progress(100, "❌ ISBN에 해당하는 도서를 찾지 못했습니다")
+            return result
+        result["url"] = book_info["url"]
+    else:
+        # 1단계: 상품 API(설정된 경우) → 고급 스크래핑 시도
+        show_progress(25, "1단계: 고급 스크래핑 시도 중...")
+        
+        book_info = fetch_book(kyobo_url, debug_mode, deadline, diagnostics)
+    
+    if book_info and any(book_info.values()):
+        for field in ("title", "author", "publisher", "price", "extraction_method"):
+            result[field] = book_info.get(field, "")
+        result["success"] = True
+        
+        show_progress(100, "✅ 도서 정보 추출 완료!")
+        
+        if debug_mode and result["extraction_method"] and debug_container is not None:
+            with debug_container:
+                st.success(f"가격 추출 방법: {result['extraction_method']}")
+        
+        # 통계 업데이트 (URL당 한 번만 집계됨)
+        st.session_state.extraction_stats["total_attempts"] += 1
+        if result["price"]:
+            st.session_state.extraction_stats["price_success"] += 1
+            if result["extraction_method"]:
+                methods = st.session_state.extraction_stats["methods_used"]
+                methods[result["extraction_method"]] = methods.get(result["extraction_method"], 0) + 1
+        else:
+            st.session_state.extraction_stats["price_failures"].append({
+                "url": kyobo_url,
+                "timestamp": current_time()
+            })
+        return result
+    
+    # 2단계: 엔진이 이미 받은 응답을 분석 (같은 페이지를 다시 요청하지 않음)
+    show_progress(75, "2단계: 응답 분석 중...")
+    summary = diagnostics.get(kyobo_url)
+    if summary:
+        # 실패 시 디버깅 정보로 보여줄 응답 요약
+        result["response"] = summary if summary["status_code"] is not None else None
+        failure = summary["failure"]
+        if failure == "maintenance":
+            result["maintenance"] = True
+        elif failure == "timeout" and deadline.expired():
+            result["timed_out"] = True
+        elif failure in ("timeout", "connection", "ssl"):
+            result["error"] = "network"
+            result["exception"] = f"교보문고에 연결할 수 없습니다 ({failure})"
+    
+    if not result["success"]:
+        show_progress(100, "❌ 도서 정보 추출 실패")
+    
+    return result
+
+def show_url_issues(kyobo_url):
+    """URL 형식 문제 안내"""
+    if kyobo_url.startswith("isbn:"):
+        return
+    url_issues = []
+    if not kyobo_url.startswith("http"):
+        url_issues.append("⚠️ http:// 또는 https://가 없음")
+    if "kyobobook.co.kr" not in kyobo_url:
+        url_issues.append("⚠️ 교보문고 도메인이 아님")
+    if "/detail/" not in kyobo_url:
+        url_issues.append("⚠️ 상품 상세 페이지 URL이 아님")
+    
+    if url_issues:
+        st.write("**입력한 URL의 문제점:**")
+        for issue in url_issues:
+            st.write(issue)
+
+@st.fragment
+def render_lookup_panel(raw_url, debug_mode):
+    """
+    URL 조회 + 결과 표시 + 신청 처리
+    정규화된 URL 기준으로 세션 메모를 사용하므로 다른 입력이 바뀌어도 다시 추출하지 않는다
+    """
+    import requests
+    
+    kyobo_url = normalize_kyobo_url(raw_url)
+    lookup_results = st.session_state.lookup_results
+    
+    if kyobo_url not in lookup_results:
+        status_container = st.container()
+        
+        debug_container = st.expander("🔧 디버그 정보", expanded=True) if debug_mode else None
+        
+        with status_container:
+            st.info("🔍 도서 정보 추출 중...")
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+        
+        try:
+            lookup_results[kyobo_url] = lookup_book(kyobo_url, debug_mode, progress_bar, status_text, debug_container)
+        except requests.exceptions.RequestException as e:
+            progress_bar.progress(100)
+            status_text.text("❌ 네트워크 오류")
+            lookup_results[kyobo_url] = {"error": "network", "exception": e}
+        except Exception as e:
+            progress_bar.progress(100)
+            status_text.text("❌ 예기치 않은 오류")
+            lookup_results[kyobo_url] = {"error": "unexpected", "exception": e}
+    
+    result = lookup_results[kyobo_url]
+    
+    # 조회 실패 결과도 메모되므로 다시 시도할 수 있는 버튼 제공
+    if result.get("error") or not result.get("success"):
+        if st.button("🔄 다시 조회", key="retry_lookup"):
+            del lookup_results[kyobo_url]
+            st.rerun(scope="fragment")
+    
+    if result.get("error") == "network":
+        st.error(f"❌ 네트워크 연결 오류: {result['exception']}")
+        st.info("💡 해결방법:")
+        st.write("1. 인터넷 연결을 확인해주세요")
+        st.write("2. VPN을 사용 중이라면 해제 후 시도해주세요")
+        st.write("3. 잠시 후 다시 시도해주세요")
+        return
+    
+    if result.get("error") == "unexpected":
+        st.error(f"❌ 도서 정보 추출 오류: {result['exception']}")
+        if debug_mode:
+            st.exception(result["exception"])
+        show_url_issues(kyobo_url)
+        return
+    
+    title = result["title"]
+    author = result["author"]
+    publisher = result["publisher"]
+    price = result["price"]
+    extraction_success = result["success"]
+    
+    if result["maintenance"]:
+        st.error("🚫 교보문고가 현재 점검 중입니다. 잠시 후 다시 시도해주세요.")
+    if result.get("timed_out"):
+        st.error(f"⏱️ {LOOKUP_DEADLINE}초 안에 도서 정보를 가져오지 못했습니다. 잠시 후 다시 조회하거나 대체 입력 방법을 사용해주세요.")
+    
+    if not extraction_success and result["response"]:
+        # 디버깅 정보 표시
+        with st.expander("🔧 디버깅 정보"):
+            response = result["response"]
+            st.write(f"**상태 코드:** {response['status_code']}")
+            st.write(f"**응답 크기:** {response['size']:,} 문자")
+            st.write(f"**Content-Type:** {response['content_type']}")
+            st.text_area("응답 미리보기:", response["preview"], height=100)
+    
+    # 세션 상태에 저장된 정보가 있으면 우선 사용
+    if 'extracted_info' in st.session_state and st.session_state['extracted_info'].get('url') == kyobo_url:
+        info = st.session_state['extracted_info']
+        title = info.get('title', '')
+        author = info.get('author', '')
+        publisher = info.get('publisher', '')
+        price = info.get('price', '')
+        extraction_success = True
+    
+    # 추출 성공 시 정보 표시 및 신청 처리
+    if extraction_success and any([title, author, publisher]):
+        # 수량 및 가격 계산
+        qty = 1
+        total_price = 0
+        price_str = "정보 없음"
+        
+        if to_int(price) > 0:
+            total_price = to_int(price) * qty
+            price_str = f"{to_int(price):,}원"
+        else:
+            # 가격 정보가 없는 경우 경고
+            st.warning("⚠️ 가격 정보를 찾을 수 없습니다. 직접 입력이 필요할 수 있습니다.")
+        
+        # 추출된 정보 표시
+        st.write("### 📖 추출된 도서 정보")
+        info_col1, info_col2 = st.columns(2)
+        with info_col1:
+            st.write(f"**도서명:** {title or '정보 없음'}")
+            st.write(f"**저자명:** {author or '정보 없음'}")
+            st.write(f"**출판사:** {publisher or '정보 없음'}")
+        with info_col2:
+            st.write(f"**단가:** {price_str}")
+            st.write(f"**수량:** {qty}권")
+            st.write(f"**총 가격:** {total_price:,}원" if total_price > 0 else "가격 정보 없음")
+        
+        # 가격이 없는 경우 수동 입력 옵션 제공
+        manual_price = ""
+        if to_int(price) <= 0:
+            st.write("---")
+            st.write("### 💰 가격 수동 입력")
+            manual_price = st.text_input("가격을 직접 입력해주세요 (숫자만):", key="manual_price")
+            if manual_price and to_int(manual_price) > 0:
+                price = str(to_int(manual_price))
+                total_price = int(price) * qty
+                st.success(f"✅ 수동 입력 가격: {int(price):,}원")
+            elif manual_price:
+                st.warning("⚠️ 가격은 숫자로 입력해 주세요 (예: 15000).")
+        
+        # 신청 버튼
+        final_price = to_int(price)
+        can_submit = all([title, author, publisher]) and final_price > 0
+        
+        if can_submit:
+            submitted = st.button("📝 도서 신청하기", type="primary")
+            pending_key = "pending_duplicate_tab1"
+            try:
+                outcome = None
+                # 신청 행은 버튼을 눌렀거나 중복 확인 중일 때만 만든다
+                if submitted or pending_key in st.session_state:
+                    outcome = submit_application([
+                        current_time(),
+                        st.session_state['user']['name'],
+                        title,
+                        author,
+                        publisher,
+                        final_price,
+                        qty,
+                        result.get("url", kyobo_url),
+                        final_price * qty
+                    ], pending_key, submitted)
+                if outcome:
+                    # 세션 상태 정리
+                    if 'extracted_info' in st.session_state:
+                        del st.session_state['extracted_info']
+                    
+                    if outcome == "merged":
+                        finish_submission("success", "✅ 기존 신청 건의 수량을 늘렸습니다!")
+                    elif outcome == "queued":
+                        finish_submission("info", QUEUED_MESSAGE)
+                    else:
+                        finish_submission("success", "✅ 도서 신청이 완료되었습니다!")
+                    
+            except Exception as e:
+                st.error(f"❌ 신청 중 오류가 발생했습니다: {e}")
+        else:
+            st.warning("⚠️ 필수 정보가 부족하여 신청할 수 없습니다.")
+            missing_info = []
+            if not title: missing_info.append("도서명")
+            if not author: missing_info.append("저자명")
+            if not publisher: missing_info.append("출판사")
+            if final_price <= 0: missing_info.append("가격")
+            st.write(f"**부족한 정보:** {', '.join(missing_info)}")
+    
+    elif not extraction_success:
+        st.error("❌ 도서 정보를 추출할 수 없습니다.")
+        st.info("💡 다음 사항을 확인해주세요:")
+        st.write("1. 올바른 교보문고 상품 페이지 URL인지 확인")
+        st.write("2. 네트워크 연결 상태 확인")
+        st.write("3. 잠시 후 다시 시도")
 
 # ==================== 탭1: 신규 도서 신청 ====================
-with tab1:
+@st.fragment
+def render_new_application_view():
     st.subheader("새로운 도서 신청")
+    show_submit_notice()
     
     # 웹 환경 확인 및 안내
     import os
@@ -429,7 +1073,7 @@ with tab1:
     # 디버그 모드 체크박스 추가
     col1, col2 = st.columns([3, 1])
     with col1:
-        kyobo_url = st.text_input("교보문고 URL을 입력하세요:")
+        kyobo_url = st.text_input("교보문고 URL 또는 ISBN을 입력하세요:")
     with col2:
         debug_mode = st.checkbox("🔍 디버그 모드", help="상세한 추출 과정을 확인합니다")
     
@@ -457,7 +1101,7 @@ with tab1:
                     'author': parts[1].strip(),
                     'publisher': parts[2].strip(),
                     'price': parts[3].strip(),
-                    'url': kyobo_url
+                    'url': normalize_kyobo_url(kyobo_url)
                 }
                 st.success("✅ 정보 추출 완료!")
         
@@ -478,246 +1122,27 @@ with tab1:
                     'author': manual_author,
                     'publisher': manual_publisher,
                     'price': manual_price,
-                    'url': kyobo_url
+                    'url': normalize_kyobo_url(kyobo_url)
                 }
                 st.success("✅ 수동 입력 완료!")
             else:
                 st.error("모든 필드를 입력해주세요.")
     
     if kyobo_url:
-        status_container = st.container()
-        
-        if debug_mode:
-            debug_container = st.expander("🔧 디버그 정보", expanded=True)
-        
-        with status_container:
-            st.info("🔍 도서 정보 추출 중...")
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-        
-        try:
-            kyobo_url = kyobo_url.lstrip('@').strip()
-            
-            # 도서 정보를 저장할 변수 초기화
-            title = author = publisher = price = ""
-            extraction_success = False
-            extraction_method = ""
-            
-            # 1단계: 고급 스크래핑 시도
-            progress_bar.progress(25)
-            status_text.text("1단계: 고급 스크래핑 시도 중...")
-            
-            book_info = get_book_info_advanced(kyobo_url, debug=debug_mode)
-            
-            if book_info and any(book_info.values()):
-                title = book_info.get("title", "")
-                author = book_info.get("author", "")
-                publisher = book_info.get("publisher", "")
-                price = book_info.get("price", "")
-                extraction_method = book_info.get("extraction_method", "")
-                
-                progress_bar.progress(100)
-                status_text.text("✅ 도서 정보 추출 완료!")
-                extraction_success = True
-                
-                if debug_mode and extraction_method:
-                    with debug_container:
-                        st.success(f"가격 추출 방법: {extraction_method}")
-                
-                # 통계 업데이트
-                st.session_state.extraction_stats["total_attempts"] += 1
-                if price:
-                    st.session_state.extraction_stats["price_success"] += 1
-                    if extraction_method:
-                        methods = st.session_state.extraction_stats["methods_used"]
-                        methods[extraction_method] = methods.get(extraction_method, 0) + 1
-                else:
-                    st.session_state.extraction_stats["price_failures"].append({
-                        "url": kyobo_url,
-                        "timestamp": now.strftime("%Y-%m-%d %H:%M:%S")
-                    })
-            
-            else:
-                # 2단계: 기본 방법으로 재시도
-                progress_bar.progress(50)
-                status_text.text("2단계: 기본 방법으로 재시도 중...")
-                
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                    "Accept-Language": "ko-KR,ko;q=0.9,en-US;q=0.8",
-                    "Referer": "https://www.google.com/"
-                }
-                
-                res = requests.get(kyobo_url, headers=headers, timeout=30)
-                
-                progress_bar.progress(75)
-                status_text.text("3단계: 응답 분석 중...")
-                
-                if res.status_code == 200 and len(res.text) > 1000:
-                    soup = BeautifulSoup(res.text, "html.parser")
-                    
-                    # 사이트 점검 확인
-                    if "임시 점검" in res.text or "점검을 실시합니다" in res.text:
-                        st.error("🚫 교보문고가 현재 점검 중입니다. 잠시 후 다시 시도해주세요.")
-                    else:
-                        # 기본 방법으로 정보 추출
-                        extracted_info = extract_book_info_enhanced(soup, debug=debug_mode)
-                        if extracted_info and any(extracted_info.values()):
-                            title = extracted_info.get("title", "")
-                            author = extracted_info.get("author", "")
-                            publisher = extracted_info.get("publisher", "")
-                            price = extracted_info.get("price", "")
-                            extraction_method = extracted_info.get("extraction_method", "")
-                            
-                            progress_bar.progress(100)
-                            status_text.text("✅ 도서 정보 추출 완료! (기본 방법)")
-                            extraction_success = True
-                
-                if not extraction_success:
-                    progress_bar.progress(100)
-                    status_text.text("❌ 도서 정보 추출 실패")
-                    
-                    # 디버깅 정보 표시
-                    with st.expander("🔧 디버깅 정보"):
-                        st.write(f"**상태 코드:** {res.status_code}")
-                        st.write(f"**응답 크기:** {len(res.text):,} 문자")
-                        st.write(f"**Content-Type:** {res.headers.get('content-type', 'N/A')}")
-                        
-                        preview = res.text[:500].replace('<', '&lt;').replace('>', '&gt;')
-                        st.text_area("응답 미리보기:", preview, height=100)
-            
-            # 세션 상태에 저장된 정보가 있으면 우선 사용
-            if 'extracted_info' in st.session_state and st.session_state['extracted_info'].get('url') == kyobo_url:
-                info = st.session_state['extracted_info']
-                title = info.get('title', '')
-                author = info.get('author', '')
-                publisher = info.get('publisher', '')
-                price = info.get('price', '')
-                extraction_success = True
-                extraction_method = "대체 입력 방법"
-            
-            # 추출 성공 시 정보 표시 및 신청 처리
-            if extraction_success and any([title, author, publisher]):
-                # 수량 및 가격 계산
-                qty = 1
-                total_price = 0
-                price_str = "정보 없음"
-                
-                if price and price.isdigit():
-                    total_price = int(price) * qty
-                    price_str = f"{int(price):,}원"
-                elif not price:
-                    # 가격 정보가 없는 경우 경고
-                    st.warning("⚠️ 가격 정보를 찾을 수 없습니다. 직접 입력이 필요할 수 있습니다.")
-                
-                # 추출된 정보 표시
-                st.write("### 📖 추출된 도서 정보")
-                info_col1, info_col2 = st.columns(2)
-                with info_col1:
-                    st.write(f"**도서명:** {title or '정보 없음'}")
-                    st.write(f"**저자명:** {author or '정보 없음'}")
-                    st.write(f"**출판사:** {publisher or '정보 없음'}")
-                with info_col2:
-                    st.write(f"**단가:** {price_str}")
-                    st.write(f"**수량:** {qty}권")
-                    st.write(f"**총 가격:** {total_price:,}원" if total_price > 0 else "가격 정보 없음")
-                
-                # 가격이 없는 경우 수동 입력 옵션 제공
-                manual_price = ""
-                if not price:
-                    st.write("---")
-                    st.write("### 💰 가격 수동 입력")
-                    manual_price = st.text_input("가격을 직접 입력해주세요 (숫자만):", key="manual_price")
-                    if manual_price and manual_price.isdigit():
-                        price = manual_price
-                        total_price = int(price) * qty
-                        st.success(f"✅ 수동 입력 가격: {int(price):,}원")
-                
-                # 신청 버튼
-                can_submit = all([title, author, publisher]) and (price or manual_price)
-                
-                if can_submit:
-                    if st.button("📝 도서 신청하기", type="primary"):
-                        try:
-                            final_price = price if price else manual_price
-                            worksheet.append_row([
-                                now.strftime('%Y-%m-%d %H:%M:%S'),
-                                st.session_state['user']['name'],
-                                title,
-                                author,
-                                publisher,
-                                final_price,
-                                qty,
-                                kyobo_url,
-                                int(final_price) * qty
-                            ])
-                            st.success("✅ 도서 신청이 완료되었습니다!")
-                            st.balloons()
-                            
-                            # 세션 상태 정리
-                            if 'extracted_info' in st.session_state:
-                                del st.session_state['extracted_info']
-                                
-                        except Exception as e:
-                            st.error(f"❌ 신청 중 오류가 발생했습니다: {e}")
-                else:
-                    st.warning("⚠️ 필수 정보가 부족하여 신청할 수 없습니다.")
-                    missing_info = []
-                    if not title: missing_info.append("도서명")
-                    if not author: missing_info.append("저자명")
-                    if not publisher: missing_info.append("출판사")
-                    if not price and not manual_price: missing_info.append("가격")
-                    st.write(f"**부족한 정보:** {', '.join(missing_info)}")
-            
-            elif not extraction_success:
-                st.error("❌ 도서 정보를 추출할 수 없습니다.")
-                st.info("💡 다음 사항을 확인해주세요:")
-                st.write("1. 올바른 교보문고 상품 페이지 URL인지 확인")
-                st.write("2. 네트워크 연결 상태 확인")
-                st.write("3. 잠시 후 다시 시도")
-                
-        except requests.exceptions.RequestException as e:
-            progress_bar.progress(100)
-            status_text.text("❌ 네트워크 오류")
-            st.error(f"❌ 네트워크 연결 오류: {e}")
-            st.info("💡 해결방법:")
-            st.write("1. 인터넷 연결을 확인해주세요")
-            st.write("2. VPN을 사용 중이라면 해제 후 시도해주세요")
-            st.write("3. 잠시 후 다시 시도해주세요")
-            
-        except Exception as e:
-            progress_bar.progress(100)
-            status_text.text("❌ 예기치 않은 오류")
-            st.error(f"❌ 도서 정보 추출 오류: {e}")
-            if debug_mode:
-                st.exception(e)
-            
-            # URL 검증
-            if kyobo_url:
-                url_issues = []
-                if not kyobo_url.startswith("http"):
-                    url_issues.append("⚠️ http:// 또는 https://가 없음")
-                if "kyobobook.co.kr" not in kyobo_url:
-                    url_issues.append("⚠️ 교보문고 도메인이 아님")
-                if "/detail/" not in kyobo_url:
-                    url_issues.append("⚠️ 상품 상세 페이지 URL이 아님")
-                
-                if url_issues:
-                    st.write("**입력한 URL의 문제점:**")
-                    for issue in url_issues:
-                        st.write(issue)
+        render_lookup_panel(kyobo_url, debug_mode)
 
 # ==================== 탭2: 수량 변경 ====================
-with tab2:
+@st.fragment
+def render_quantity_view():
     st.subheader("수량 변경")
     
-    # 기존 신청 내역 불러오기
-    applications_df = get_applications()
+    # 기존 신청 내역 중 이 화면에 필요한 컬럼만 불러오기
+    applications_df = get_application_columns(LIST_COLUMNS)
     
     if not applications_df.empty:
         st.write("### 📋 현재 신청 내역")
-        st.dataframe(applications_df, use_container_width=True)
+        render_paginated_table(applications_df, key="tab2_table",
+                               default_columns=["신청시간", "신청자 성명", "도서명", "수량", "가격"])
         
         # 사용자가 신청한 항목만 필터링
         user_applications = applications_df[applications_df['신청자 성명'] == st.session_state['user']['name']]
@@ -753,8 +1178,8 @@ with tab2:
                         st.write(f"**저자명:** {selected_row['저자명']}")
                         st.write(f"**출판사:** {selected_row['출판사']}")
                         st.write(f"**현재 수량:** {selected_row['수량']}권")
-                        st.write(f"**단가:** {selected_row['단가']:,}원" if isinstance(selected_row['단가'], (int, float)) else f"**단가:** {selected_row['단가']}")
-                        st.write(f"**현재 총 가격:** {selected_row['가격']:,}원" if isinstance(selected_row['가격'], (int, float)) else f"**현재 총 가격:** {selected_row['가격']}")
+                        st.write(f"**단가:** {selected_row['단가']:,}원")
+                        st.write(f"**현재 총 가격:** {selected_row['가격']:,}원")
                     
                     with col2:
                         new_qty = st.number_input(
@@ -766,28 +1191,23 @@ with tab2:
                         )
                         
                         # 새로운 총 가격 계산
-                        unit_price = selected_row['단가']
-                        if isinstance(unit_price, str) and unit_price.isdigit():
-                            new_total_price = int(unit_price) * new_qty
-                            st.write(f"**새로운 총 가격:** {new_total_price:,}원")
-                        elif isinstance(unit_price, (int, float)):
-                            new_total_price = int(unit_price) * new_qty
+                        unit_price = int(selected_row['단가'])
+                        if unit_price > 0:
+                            new_total_price = unit_price * new_qty
                             st.write(f"**새로운 총 가격:** {new_total_price:,}원")
                         else:
-                            new_total_price = f"={unit_price} * {new_qty}"
-                            st.write(f"**새로운 총 가격:** {new_total_price}")
+                            # 단가를 알 수 없으면 가격 셀은 건드리지 않음
+                            new_total_price = None
+                            st.write("**새로운 총 가격:** 단가 정보가 없어 계산할 수 없습니다")
                     
                     if st.button("🔄 수량 변경하기", type="primary"):
                         try:
-                            # Google Sheets에서 해당 행 찾기 (행 번호는 1-based, 헤더 고려)
-                            sheet_row_num = selected_idx + 2  # +2 는 헤더(1행)와 0-based 인덱스 보정
-                            
-                            # 수량과 가격 업데이트
-                            worksheet.update_cell(sheet_row_num, 7, new_qty)        # 수량 컬럼 (7번째)
-                            worksheet.update_cell(sheet_row_num, 9, new_total_price) # 가격 컬럼 (9번째)
-                            
-                            st.success(f"✅ 수량이 {selected_row['수량']}권에서 {new_qty}권으로 변경되었습니다!")
-                            st.rerun()  # 페이지 새로고침으로 업데이트된 내용 반영
+                            # 수량과 가격 업데이트 (신청ID로 현재 행을 찾아서 수정)
+                            if not change_quantity(selected_row, new_qty):
+                                st.error("❌ 해당 신청 건을 시트에서 찾을 수 없습니다. 새로고침 후 다시 시도해주세요.")
+                            else:
+                                st.success(f"✅ 수량이 {selected_row['수량']}권에서 {new_qty}권으로 변경되었습니다!")
+                                st.rerun()  # 페이지 새로고침으로 업데이트된 내용 반영
                             
                         except Exception as e:
                             st.error(f"❌ 수량 변경 중 오류가 발생했습니다: {e}")
@@ -799,48 +1219,122 @@ with tab2:
         st.info("📋 신청 내역이 없습니다. 첫 번째 도서를 신청해보세요!")
 
 # ==================== 탭3: 직접입력 ====================
-with tab3:
+def fill_direct_input(book_info):
+    """직접입력 입력칸을 도서 정보로 채우기 (위젯 콜백에서 호출)"""
+    st.session_state["direct_title"] = book_info.get("title", "")
+    st.session_state["direct_author"] = book_info.get("author", "")
+    st.session_state["direct_publisher"] = book_info.get("publisher", "")
+    st.session_state["direct_unit_price"] = str(book_info.get("price", "") or "")
+    st.session_state["direct_buy_url"] = book_info.get("url", "")
+
+def fill_direct_input_from_search(choice_key, results):
+    """자동완성 결과에서 고른 도서로 입력칸 채우기"""
+    choice = st.session_state.get(choice_key)
+    if choice is not None:
+        fill_direct_input(results[choice])
+
+def fill_direct_input_from_isbn():
+    """ISBN 입력 시 로컬 ISBN 인덱스(없으면 교보문고 검색)로 입력칸 채우기"""
+    isbn = normalize_isbn(st.session_state.get("direct_isbn", ""))
+    if not isbn:
+        st.session_state["direct_isbn_status"] = ("warning", "ISBN 형식이 아닙니다 (10자리 또는 13자리).")
+        return
+    try:
+        book_info = fetch_book(f"isbn:{isbn}", deadline=Deadline(LOOKUP_DEADLINE))
+    except Exception as e:
+        st.session_state["direct_isbn_status"] = ("error", f"ISBN 조회 중 오류가 발생했습니다: {e}")
+        return
+    if not book_info:
+        st.session_state["direct_isbn_status"] = ("warning", f"ISBN {isbn}에 해당하는 도서를 찾지 못했습니다.")
+        return
+    fill_direct_input(book_info)
+    st.session_state["direct_isbn_status"] = ("success", f"✅ ISBN {isbn} 도서 정보를 채웠습니다.")
+
+@st.fragment
+def render_direct_input_view():
     st.subheader("직접 도서 정보 입력")
+    show_submit_notice()
     # 자동입력 및 수정불가 필드
-    st.write(f"**신청시간:** {now.strftime('%Y-%m-%d %H:%M:%S')}")
+    st.write(f"**신청시간:** {current_time()}")
     st.write(f"**신청자 성명:** {st.session_state['user']['name']}")
+    # ISBN을 입력하면 아래 입력칸을 자동으로 채움 (한 번 조회한 도서는 네트워크 없이 바로)
+    st.text_input("ISBN (선택)", key="direct_isbn", placeholder="ISBN-10 또는 ISBN-13",
+                  on_change=fill_direct_input_from_isbn)
+    if "direct_isbn_status" in st.session_state:
+        level, message = st.session_state["direct_isbn_status"]
+        getattr(st, level)(message)
+    # 이미 신청했거나 조회한 도서는 도서명/저자명 일부로 찾아서 채움 (오타 허용)
+    search_query = st.text_input("🔎 도서 검색 (도서명 또는 저자명)", key="direct_search")
+    if search_query:
+        results = current_title_index().search(search_query, limit=10)
+        if results:
+            st.selectbox(
+                "검색 결과",
+                range(len(results)),
+                index=None,
+                format_func=lambda i: " / ".join(filter(None, [results[i]["title"], results[i]["author"], results[i]["publisher"]])),
+                placeholder="선택하면 아래 입력칸을 채웁니다",
+                # 검색어가 바뀌면 선택도 새로 하도록 검색어별 key 사용
+                key=f"direct_search_choice:{search_query}",
+                on_change=fill_direct_input_from_search,
+                args=(f"direct_search_choice:{search_query}", results),
+            )
+        else:
+            st.caption("일치하는 도서가 없습니다.")
     # 입력필드
-    book_title = st.text_input("도서명")
-    author = st.text_input("저자명")
-    publisher = st.text_input("출판사")
-    unit_price = st.text_input("단가", value="", placeholder="숫자만 입력")
+    book_title = st.text_input("도서명", key="direct_title")
+    author = st.text_input("저자명", key="direct_author")
+    publisher = st.text_input("출판사", key="direct_publisher")
+    unit_price = st.text_input("단가", placeholder="숫자만 입력", key="direct_unit_price")
     qty = st.number_input("수량", min_value=1, max_value=100, value=1, step=1)
-    buy_url = st.text_input("구매사이트")
+    buy_url = st.text_input("구매사이트", key="direct_buy_url")
     # 가격 자동계산
-    try:
-        price_val = int(float(unit_price)) if unit_price else 0
-    except Exception:
-        price_val = 0
+    price_val = to_int(unit_price)
+    if unit_price and price_val <= 0:
+        st.warning("⚠️ 단가는 숫자로 입력해 주세요 (예: 15000).")
     total_price = price_val * qty
     st.write(f"**가격:** {total_price:,}원" if total_price else "**가격:** 0원")
     # 신청 버튼
-    if st.button("📝 직접 도서 신청하기", key="direct_input"):
-        if not all([book_title, author, publisher, unit_price, buy_url]):
-            st.warning("모든 필드를 입력해 주세요.")
-        elif not str(unit_price).isdigit():
-            st.warning("단가는 숫자만 입력해 주세요.")
-        else:
-            try:
-                worksheet.append_row([
-                    now.strftime('%Y-%m-%d %H:%M:%S'),  # 신청시간
-                    st.session_state['user']['name'],   # 신청자 성명
-                    book_title,                         # 도서명
-                    author,                             # 저자명
-                    publisher,                          # 출판사
-                    unit_price,                         # 단가
-                    qty,                                # 수량
-                    buy_url,                            # 구매사이트
-                    total_price                         # 가격
-                ])
-                st.success("✅ 직접 입력 도서 신청이 완료되었습니다!")
-                st.balloons()
-            except Exception as e:
-                st.error(f"❌ 직접 입력 신청 중 오류가 발생했습니다: {e}")
+    submitted = st.button("📝 직접 도서 신청하기", key="direct_input")
+    if submitted and not all([book_title, author, publisher, unit_price, buy_url]):
+        st.warning("모든 필드를 입력해 주세요.")
+        submitted = False
+    elif submitted and price_val <= 0:
+        # 단가 입력칸 아래에 이미 안내함
+        submitted = False
+    pending_key = "pending_duplicate_tab3"
+    try:
+        outcome = None
+        # 신청 행은 버튼을 눌렀거나 중복 확인 중일 때만 만든다
+        if submitted or pending_key in st.session_state:
+            outcome = submit_application([
+                current_time(),                     # 신청시간
+                st.session_state['user']['name'],   # 신청자 성명
+                book_title,                         # 도서명
+                author,                             # 저자명
+                publisher,                          # 출판사
+                price_val,                          # 단가
+                qty,                                # 수량
+                buy_url,                            # 구매사이트
+                total_price                         # 가격
+            ], pending_key, submitted)
+        if outcome == "merged":
+            finish_submission("success", "✅ 기존 신청 건의 수량을 늘렸습니다!")
+        elif outcome == "appended":
+            finish_submission("success", "✅ 직접 입력 도서 신청이 완료되었습니다!")
+        elif outcome == "queued":
+            finish_submission("info", QUEUED_MESSAGE)
+    except Exception as e:
+        st.error(f"❌ 직접 입력 신청 중 오류가 발생했습니다: {e}")
+
+# ==================== 선택된 화면만 실행 ====================
+# 각 화면은 fragment라서 화면 안의 입력은 해당 화면만 다시 실행한다
+VIEW_RENDERERS = {
+    VIEWS[0]: render_new_application_view,
+    VIEWS[1]: render_quantity_view,
+    VIEWS[2]: render_direct_input_view,
+}
+VIEW_RENDERERS[active_view]()
 
 # ==================== 사이드바: 추출 통계 ====================
 with st.sidebar:
@@ -864,24 +1358,147 @@ with st.sidebar:
                 for failure in stats["price_failures"][-5:]:  # 최근 5개만 표시
                     st.write(f"- {failure['timestamp']}")
                     st.write(f"  {failure['url']}")
+    
+    # 추출 규칙별 적중 횟수 / 평균 시간 (서버 전체 누적)
+    rule_stats = [r for r in get_rule_set().stats() if r["evaluations"]]
+    if rule_stats:
+        with st.expander("🧩 추출 규칙 통계"):
+            for r in rule_stats:
+                st.write(f"- [{r['field']}] {r['rule']}: {r['hits']}/{r['evaluations']}회, 평균 {r['avg_ms']:.2f}ms")
+
+    # 상품 페이지 요청 통계 (서버 전체 누적): 가격 누락 시 재요청이 얼마나 필요했는지
+    page_stats = fetch_stats()
+    if page_stats["lookups"]:
+        with st.expander("📡 페이지 요청 통계"):
+            st.write(f"- 조회 {page_stats['lookups']}회, 페이지 요청 {page_stats['fetches']}회")
+            st.write(f"- 첫 응답에 가격 없음: {page_stats['price_missing']}회")
+            st.write(f"- 가격 자리 신호로 재요청: {page_stats['refetches']}회 "
+                     f"(가격 찾음 {page_stats['refetch_recovered']}회)")
+    
+    # 캐시 예열 진행 상황과 캐시 적중률 (서버 전체 공유)
+    warmup_job = get_cache_warmup_job()
+    cache_stats = get_cache().stats()
+    with st.expander("🔥 캐시 예열"):
+        if warmup_job["total"]:
+            st.progress(warmup_job["done"] / warmup_job["total"],
+                        text=f"예열 {warmup_job['done']}/{warmup_job['total']}" + (" (진행 중)" if warmup_job["running"] else ""))
+        elif warmup_job["running"]:
+            st.write("예열 준비 중...")
+        if warmup_job["summary"]:
+            summary = warmup_job["summary"]
+            st.write(f"새로 조회 {summary['warmed']}건, 이미 캐시됨 {summary['skipped']}건, 실패 {summary['failed']}건")
+        if warmup_job["error"]:
+            st.error(f"예열 오류: {warmup_job['error']}")
+        lookups = cache_stats["hits"] + cache_stats["misses"]
+        st.write(f"캐시 {cache_stats['size']}건, 적중률 {cache_stats['hit_rate']:.0%} ({cache_stats['hits']}/{lookups})")
+    
+    # 단가 재확인 작업 (백그라운드, 서버 전체 공유)
+    price_job = get_price_refresh_job()
+    with st.expander("💱 단가 재확인"):
+        report = price_job["last_report"]
+        if price_job["running"]:
+            st.info("단가를 재확인하는 중입니다...")
+        if report:
+            # 사람이 보지 않는 주기 실행이 시트를 고치므로 마지막 변경 내역을 행 단위로 남겨 둔다
+            from price_refresh import REPORT_FIELDS
+            
+            st.write(f"마지막 실행: {report['started_at']} ({report['seconds']:.0f}초)")
+            st.write(f"상품 {report['products']}개 중 변경 {len(report['changes'])}행, 확인 실패 {len(report['failed'])}개"
+                     + (f", 행을 찾지 못해 건너뜀 {len(report['skipped'])}행" if report["skipped"] else ""))
+            if report["changes"]:
+                st.dataframe([{field: change[field] for field in REPORT_FIELDS} for change in report["changes"]],
+                             use_container_width=True, hide_index=True)
+            if report["skipped"]:
+                st.caption("건너뛴 행: " + ", ".join(change["도서명"] for change in report["skipped"]))
+        elif not price_job["running"]:
+            st.write(f"{PRICE_REFRESH_HOURS}시간마다 시트의 단가를 교보문고 현재 가격과 비교합니다.")
+        if price_job["error"]:
+            st.error(f"마지막 실행 오류: {price_job['error']}")
+        if st.button("지금 재확인", disabled=price_job["running"]):
+            price_job["trigger"].set()
+            st.toast("단가 재확인을 시작했습니다. 잠시 후 새로고침하세요.")
+
+    # 시트에 쓰지 못해 보관 중인 신청 (서버 전체 공유)
+    submission_queue = get_queue()
+    replay_job = connect_submission_replay(get_submission_replay_job())
+    queued_count = len(submission_queue)
+    failed_count = submission_queue.failed_count()
+    if queued_count or failed_count or replay_job["last_result"]:
+        title = f"📮 보관된 신청 {queued_count}건" + (f" / 실패 {failed_count}건" if failed_count else "")
+        with st.expander(title, expanded=bool(queued_count or failed_count)):
+            if queued_count:
+                st.write(f"시트가 복구되면 {QUEUE_REPLAY_SECONDS}초 안에 신청한 순서대로 자동으로 반영됩니다.")
+                for entry in submission_queue.pending(limit=5):
+                    st.write(f"- {entry['row'][0]} {entry['row'][1]}: {entry['row'][2]} ({entry['attempts']}회 재시도)")
+            if failed_count:
+                st.write("시트가 거부해서 반영하지 못한 신청 (시트 문제를 해결한 뒤 다시 보낼 수 있습니다):")
+                for entry in submission_queue.failed_entries(limit=5):
+                    st.write(f"- {entry['row'][0]} {entry['row'][1]}: {entry['row'][2]} — {entry['last_error']}")
+            last_result = replay_job["last_result"]
+            if last_result and (last_result["applied"] or last_result["skipped"] or last_result["rejected"]):
+                st.write(f"마지막 반영: {last_result['applied']}건 추가, 이미 있던 {last_result['skipped']}건 정리, "
+                         f"실패 {last_result['rejected']}건")
+            if submission_queue.last_error:
+                st.error(f"마지막 오류: {submission_queue.last_error}")
+            if queued_count and st.button("지금 다시 보내기", disabled=replay_job["running"]):
+                replay_job["trigger"].set()
+                st.toast("보관된 신청을 다시 보내는 중입니다. 잠시 후 새로고침하세요.")
+            if failed_count and st.button("실패한 신청 다시 보내기", disabled=replay_job["running"]):
+                submission_queue.retry_failed()
+                replay_job["trigger"].set()
+                st.toast("실패한 신청을 다시 보내는 중입니다. 잠시 후 새로고침하세요.")
+
+    # 시트 요청 스케줄러 (서버 전체 공유): 할당량 사용량, 대기 중인 요청, 대기 시간
+    sheet_stats = get_sheet_scheduler().stats()
+    with st.expander("🚦 시트 요청 현황"):
+        for kind, label in (("read", "읽기"), ("write", "쓰기")):
+            used, quota = sheet_stats["used"][kind]
+            cooldown = sheet_stats["cooldown"][kind]
+            st.progress(min(used / quota, 1.0), text=f"{label} {used}/{quota}회 (최근 1분)"
+                        + (f" · 429로 {cooldown:.0f}초 대기" if cooldown else ""))
+        depth = ", ".join(f"{name} {count}건" for name, count in sheet_stats["depth"].items())
+        st.write(f"- 대기 중: {depth}")
+        for name, wait in sheet_stats["waits"].items():
+            st.write(f"- {name} 대기 시간: 평균 {wait['avg'] * 1000:.0f}ms, 최대 {wait['max'] * 1000:.0f}ms ({wait['count']}건)")
+        st.write(f"- 보낸 요청 {sheet_stats['sent']}회, 합쳐진 요청 {sheet_stats['merged'] + sheet_stats['coalesced']}건, "
+                 f"429 {sheet_stats['throttled']}회, 실패 {sheet_stats['failed']}건")
 
 # ==================== 전체 신청 내역 표시 ====================
-st.write("---")
-st.subheader("📊 전체 신청 내역")
-applications_df = get_applications()
-if not applications_df.empty:
-    st.dataframe(applications_df, use_container_width=True)
+@st.fragment
+def render_application_history():
+    import pandas as pd
     
-    # 간단한 통계
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("총 신청 건수", len(applications_df))
-    with col2:
-        total_books = applications_df['수량'].sum() if '수량' in applications_df.columns else 0
-        st.metric("총 도서 수량", f"{total_books}권")
-    with col3:
-        if '가격' in applications_df.columns:
-            total_price = applications_df['가격'].sum()
-            st.metric("총 금액", f"{total_price:,}원" if isinstance(total_price, (int, float)) else "계산 불가")
-else:
-    st.info("아직 신청된 도서가 없습니다.")
\ No newline at end of file
+    st.write("---")
+    st.subheader("📊 전체 신청 내역")
+    # 긴 구매사이트 URL 컬럼은 볼 때만 읽음
+    if st.checkbox("구매사이트 컬럼도 불러오기", key="footer_with_urls"):
+        applications_df = get_applications()
+    else:
+        applications_df = get_application_columns(LIST_COLUMNS)
+    if not applications_df.empty:
+        render_paginated_table(applications_df, key="footer_table")
+        show_schema_errors(applications_df)
+    
+        # 간단한 통계 (누적 집계에서 바로 읽기)
+        aggregates = load_aggregates(applications_df)
+        totals = aggregates["total"]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("총 신청 건수", totals["count"])
+        with col2:
+            st.metric("총 도서 수량", f"{totals['qty']:,}권")
+        with col3:
+            st.metric("총 금액", f"{totals['amount']:,}원")
+    
+        with st.expander("📈 신청자별 / 출판사별 / 일자별 합계"):
+            for label, group in (("신청자별", "by_applicant"), ("출판사별", "by_publisher"), ("일자별", "by_day")):
+                st.write(f"**{label}**")
+                st.dataframe(
+                    pd.DataFrame.from_dict(aggregates[group], orient="index")
+                      .rename(columns={"count": "건수", "qty": "수량", "amount": "금액"}),
+                    use_container_width=True
+                )
+    else:
+        st.info("아직 신청된 도서가 없습니다.")
+
+render_application_history()
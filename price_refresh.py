@@ -0,0 +1,273 @@
+"""
+신청 시트 단가 일괄 재확인
+
+시트에서 재확인에 필요한 컬럼(SHEET_COLUMNS)만 읽어 구매사이트 컬럼의 서로 다른 교보문고 상품을 모아
+  1. 상품 JSON API(설정된 경우)로 묶어서 조회하고
+  2. 나머지는 초당 요청 수 제한 안에서 동시에 조건부 요청 (304면 캐시 값 사용)
+한 뒤, 단가가 바뀐 행의 단가/가격을 batch_update 한 번으로 고치고 변경 내역을 보고한다.
+조회하는 동안 행이 추가/삭제/정렬될 수 있으므로, 쓰기 직전에 신청ID 컬럼을 다시 읽어서
+변경할 행의 현재 위치를 찾는다 (찾지 못한 행은 건너뛰고 보고에 남긴다).
+고치는 행은 batch_update 전에 행마다 로그로 남긴다.
+앱에서는 백그라운드 스레드가 주기적으로 실행하고, 명령줄로도 실행할 수 있다.
+
+    python price_refresh.py --credentials service_account.json --dry-run
+    python price_refresh.py --credentials service_account.json --rate 2 --report price_diff.csv
+"""
+import argparse
+import csv
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from kyobo_extractor import (
+    PRODUCT_API_BATCH, PRODUCT_API_URL, RateLimiter, default_log, fetch_products_json,
+    product_id_from_url, revalidate_book_info, to_int,
+)
+
+SPREADSHEET_ID = os.getenv("KYOBO_SPREADSHEET_ID", "1Jf3KoUk8pUGhY_kRnVK-yIpdQe8DQYjCc0eH4GmNC50")
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+REPORT_FIELDS = ["row", "신청ID", "도서명", "구매사이트", "수량", "old_unit", "new_unit", "old_total", "new_total"]
+
+
+SHEET_COLUMNS = ("도서명", "단가", "수량", "구매사이트", "가격", "신청ID")  # 재확인에 필요한 컬럼만 읽는다
+
+
+def read_columns(worksheet, columns, names):
+    """columns(컬럼 번호 dict) 중 names 컬럼만 batch_get 한 번으로 읽기 → {컬럼: [2행부터 값, ...]}"""
+    from gspread.utils import rowcol_to_a1
+
+    names = [name for name in names if name in columns]
+    letters = [rowcol_to_a1(1, columns[name])[:-1] for name in names]
+    value_ranges = worksheet.batch_get([f"{letter}2:{letter}" for letter in letters], major_dimension="COLUMNS")
+    return {name: list(values[0]) if values else [] for name, values in zip(names, value_ranges)}
+
+
+def read_sheet(worksheet):
+    """
+    헤더 행으로 컬럼 위치를 찾은 뒤 SHEET_COLUMNS만 읽기 (신청시간/신청자 등 다른 컬럼은 받지 않음)
+    반환: (컬럼 번호 dict, {컬럼: [2행부터 값, ...]})
+    """
+    value_ranges = worksheet.batch_get(["1:1"])
+    header = value_ranges[0][0] if value_ranges and value_ranges[0] else []
+    columns = {name: header.index(name) + 1 for name in SHEET_COLUMNS if name in header}
+    if "구매사이트" not in columns or "단가" not in columns:
+        return columns, {}
+    return columns, read_columns(worksheet, columns, SHEET_COLUMNS)
+
+
+def collect_products(values):
+    """
+    read_sheet가 읽은 컬럼 값 → 상품번호 → [행 dict]
+    교보문고 상품 URL이 아닌 행은 건너뛴다
+    """
+    products = {}
+    if "구매사이트" not in values or "단가" not in values:
+        return products
+    length = max(len(column) for column in values.values())
+    for row_num in range(2, length + 2):
+        row = {name: column[row_num - 2] if row_num - 2 < len(column) else "" for name, column in values.items()}
+        product_id = product_id_from_url(row["구매사이트"])
+        if product_id:
+            row["_row"] = row_num
+            products.setdefault(product_id, []).append(row)
+    return products
+
+
+def fetch_prices(urls, rate=2.0, workers=4, api_url=None, log=None):
+    """
+    상품 URL들의 현재 가격 조회
+    반환: {url: (가격 문자열 또는 "", 상태)}  상태: "api" / "not_modified" / "fetched" / "failed"
+    """
+    log = log or default_log
+    api_url = api_url or PRODUCT_API_URL
+    limiter = RateLimiter(rate)
+    results = {}
+
+    if api_url:
+        ids = {product_id_from_url(url): url for url in urls}
+        id_list = list(ids)
+        for start in range(0, len(id_list), PRODUCT_API_BATCH):
+            limiter.wait()
+            batch = fetch_products_json(id_list[start:start + PRODUCT_API_BATCH], api_url=api_url, log=log)
+            for product_id, info in batch.items():
+                if info.get("price"):
+                    results[ids[product_id]] = (info["price"], "api")
+
+    def revalidate(url):
+        limiter.wait()
+        info, status = revalidate_book_info(url, log=log)
+        return url, ((info or {}).get("price", ""), status)
+
+    remaining = [url for url in urls if url not in results]
+    if remaining:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results.update(pool.map(revalidate, remaining))
+    return results
+
+
+def diff_prices(products, prices):
+    """가격이 확인됐고 시트 단가와 다른 행만 변경 내역으로 반환"""
+    changes = []
+    for rows in products.values():
+        url = rows[0]["구매사이트"]
+        new_unit = to_int(prices.get(url, ("", "failed"))[0])
+        if not new_unit:
+            continue
+        for row in rows:
+            old_unit = to_int(row["단가"])
+            if old_unit == new_unit:
+                continue
+            qty = to_int(row.get("수량")) or 1
+            changes.append({
+                "row": row["_row"],
+                "신청ID": row.get("신청ID", ""),
+                "도서명": row.get("도서명", ""),
+                "구매사이트": row["구매사이트"],
+                "수량": qty,
+                "old_unit": old_unit,
+                "new_unit": new_unit,
+                "old_total": to_int(row.get("가격")),
+                "new_total": new_unit * qty,
+            })
+    return changes
+
+
+def resolve_rows(worksheet, columns, changes):
+    """
+    쓰기 직전에 변경할 행의 컬럼(신청ID/도서명/단가/수량/구매사이트)을 batch_get 한 번으로 다시 읽어서
+    변경할 행의 현재 행 번호를 찾고 가격을 현재 수량으로 다시 계산한다
+    신청ID가 없는 예전 행은 같은 행에 신청ID 없이 같은 도서명/단가/구매사이트가 그대로 있을 때만 고친다
+    반환: (행 번호를 고친 변경 목록, 찾지 못해 건너뛴 변경 목록)
+    """
+    current = read_columns(worksheet, columns, ("신청ID", "도서명", "단가", "수량", "구매사이트"))
+    rows_by_id = {app_id: row_num for row_num, app_id in enumerate(current.get("신청ID", []), start=2) if app_id}
+
+    def cell(name, row_num):
+        values = current.get(name, [])
+        return values[row_num - 2] if row_num - 2 < len(values) else ""
+
+    def unchanged(change):
+        row_num = change["row"]
+        return (not cell("신청ID", row_num) and cell("구매사이트", row_num) == change["구매사이트"]
+                and cell("도서명", row_num) == change["도서명"] and to_int(cell("단가", row_num)) == change["old_unit"])
+
+    resolved, skipped = [], []
+    for change in changes:
+        if change.get("신청ID"):
+            row_num = rows_by_id.get(change["신청ID"])
+        else:
+            row_num = change["row"] if unchanged(change) else None
+        if row_num is None:
+            skipped.append(change)
+            continue
+        qty = to_int(cell("수량", row_num)) or change["수량"]
+        resolved.append(dict(change, row=row_num, 수량=qty, new_total=change["new_unit"] * qty))
+    return resolved, skipped
+
+
+def apply_changes(worksheet, columns, changes, log=None):
+    """
+    변경할 행을 다시 찾은 뒤(resolve_rows) 단가/가격 셀을 batch_update 한 번으로 반영
+    사람이 보지 않는 주기 실행도 나중에 확인할 수 있도록 고치기 전에 행마다 로그를 남긴다
+    반환: (반영한 변경 목록, 건너뛴 변경 목록)
+    """
+    from gspread.utils import rowcol_to_a1
+
+    log = log or default_log
+    changes, skipped = resolve_rows(worksheet, columns, changes)
+    data = []
+    for change in changes:
+        log("info", f"단가 변경: {change['row']}행 {change['도서명']} (신청ID {change['신청ID'] or '없음'}) "
+                    f"단가 {change['old_unit']} → {change['new_unit']}, 가격 {change['old_total']} → {change['new_total']}")
+        data.append({"range": rowcol_to_a1(change["row"], columns["단가"]), "values": [[change["new_unit"]]]})
+        if "가격" in columns:
+            data.append({"range": rowcol_to_a1(change["row"], columns["가격"]), "values": [[change["new_total"]]]})
+    if data:
+        worksheet.batch_update(data)
+    return changes, skipped
+
+
+def refresh_prices(worksheet, rate=2.0, workers=4, api_url=None, dry_run=False, log=None):
+    """
+    시트 전체 단가 재확인 (dry_run이면 시트는 고치지 않고 보고만)
+    반환: 실행 보고 dict (changes에 변경 내역)
+    """
+    log = log or default_log
+    started_at = datetime.now()
+    columns, values = read_sheet(worksheet)
+    products = collect_products(values)
+    urls = [rows[0]["구매사이트"] for rows in products.values()]
+    prices = fetch_prices(urls, rate=rate, workers=workers, api_url=api_url, log=log)
+    changes, skipped = diff_prices(products, prices), []
+    if changes and not dry_run:
+        changes, skipped = apply_changes(worksheet, columns, changes, log=log)
+    log("info", f"단가 재확인: 상품 {len(urls)}개, 변경 {len(changes)}행, 행을 찾지 못해 건너뜀 {len(skipped)}행")
+    return {
+        "started_at": started_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "seconds": (datetime.now() - started_at).total_seconds(),
+        "products": len(urls),
+        "rows": sum(len(rows) for rows in products.values()),
+        "statuses": dict(Counter(status for _, status in prices.values())),
+        "failed": [url for url, (_, status) in prices.items() if status == "failed"],
+        "changes": changes,
+        "skipped": skipped,
+        "applied": bool(changes) and not dry_run,
+    }
+
+
+def write_report_csv(report, path):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(report["changes"])
+
+
+def open_worksheet(credentials_path, spreadsheet_id=SPREADSHEET_ID):
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_file(credentials_path, scopes=SCOPE)
+    return gspread.authorize(creds).open_by_key(spreadsheet_id).sheet1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="신청 시트 단가 일괄 재확인")
+    parser.add_argument("--credentials", default=os.getenv("GOOGLE_APPLICATION_CREDENTIALS"),
+                        help="서비스 계정 JSON 경로 (기본: GOOGLE_APPLICATION_CREDENTIALS)")
+    parser.add_argument("--spreadsheet-id", default=SPREADSHEET_ID)
+    parser.add_argument("--rate", type=float, default=2.0, help="초당 최대 요청 수")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="동시 요청 수")
+    parser.add_argument("--api-url", default=None, help="상품 JSON API 주소 (기본: KYOBO_PRODUCT_API_URL)")
+    parser.add_argument("--dry-run", action="store_true", help="시트는 고치지 않고 변경 내역만 출력")
+    parser.add_argument("--report", help="변경 내역 CSV 저장 경로")
+    args = parser.parse_args(argv)
+
+    if not args.credentials:
+        parser.error("--credentials 또는 GOOGLE_APPLICATION_CREDENTIALS가 필요합니다")
+
+    worksheet = open_worksheet(args.credentials, args.spreadsheet_id)
+    report = refresh_prices(worksheet, rate=args.rate, workers=args.workers,
+                            api_url=args.api_url, dry_run=args.dry_run)
+
+    print(f"상품 {report['products']}개 / 행 {report['rows']}개, {report['seconds']:.1f}초, 상태 {report['statuses']}")
+    for change in report["changes"]:
+        print(f"  {change['row']}행 {change['도서명']}: {change['old_unit']:,}원 → {change['new_unit']:,}원 "
+              f"(가격 {change['old_total']:,}원 → {change['new_total']:,}원)")
+    for change in report["skipped"]:
+        print(f"  행을 찾지 못해 건너뜀: {change['도서명']} (신청ID {change['신청ID'] or '없음'})", file=sys.stderr)
+    for url in report["failed"]:
+        print(f"  확인 실패: {url}", file=sys.stderr)
+    if args.report:
+        write_report_csv(report, args.report)
+    if report["changes"] and args.dry_run:
+        print("(--dry-run: 시트는 수정하지 않았습니다)")
+
+
+if __name__ == "__main__":
+    main()
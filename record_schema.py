@@ -0,0 +1,59 @@
+"""
+신청 내역 스키마
+
+시트에서 읽은 신청 내역 DataFrame의 컬럼을 정해진 타입으로 한 번만 변환한다.
+('12,000원' 같은 값은 숫자로, 변환에 실패한 값은 0/NaT로 채우고 목록으로 돌려준다)
+pandas는 변환할 때 import (Streamlit 로그인 화면 속도 유지)
+"""
+
+# 컬럼별 저장 타입 (불러올 때 한 번만 변환)
+INT_COLUMNS = {"단가": "int64", "수량": "int32", "가격": "int64"}
+CATEGORY_COLUMNS = ["신청자 성명", "출판사"]
+DATETIME_COLUMNS = ["신청시간"]
+
+
+def _coerce_numeric(series):
+    """'12,000원' 같은 문자열도 숫자로 변환 (실패하면 NaN)"""
+    import pandas as pd
+    cleaned = series.astype(str).str.replace(r"[^\d.-]", "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce")
+
+
+def apply_record_schema(df):
+    """
+    신청 내역 컬럼을 정해진 타입으로 변환
+    변환에 실패한 값은 0/NaT로 채우고 (시트 행 번호, 컬럼, 원래 값) 목록으로 반환
+    """
+    import pandas as pd
+
+    errors = []
+
+    def report(mask, col, original):
+        for idx in df.index[mask]:
+            errors.append({"행": int(df.at[idx, "_row"]), "컬럼": col, "값": original.at[idx]})
+
+    for col, dtype in INT_COLUMNS.items():
+        if col in df.columns:
+            original = df[col]
+            values = _coerce_numeric(original)
+            # 빈 칸은 오류로 보지 않음
+            report(values.isna() & (original.astype(str).str.strip() != ""), col, original)
+            df[col] = values.fillna(0).astype(dtype)
+
+    for col in DATETIME_COLUMNS:
+        if col in df.columns:
+            original = df[col]
+            values = pd.to_datetime(original, errors="coerce")
+            report(values.isna() & (original.astype(str).str.strip() != ""), col, original)
+            df[col] = values
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).astype("category")
+
+    for col in ["도서명", "저자명", "구매사이트", "신청ID"]:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+
+    df["_row"] = df["_row"].astype("int32")
+    return df, errors
@@ -0,0 +1,75 @@
+"""
+신청ID → 시트 행 번호 인덱스
+
+신청 행마다 마지막 컬럼에 고유한 신청ID를 두고, 수량 변경처럼 특정 신청을 고칠 때
+정렬 순서로 행 번호를 계산하지 않고 신청ID로 현재 행을 찾는다.
+인덱스는 신청ID 컬럼 하나만 읽어서 만들고, 행을 추가할 때는 append_row 응답으로 갱신한다.
+"""
+import re
+import threading
+
+ID_HEADER = "신청ID"
+
+
+def ensure_id_header(worksheet, id_col):
+    """
+    신청ID 헤더가 없으면 추가 (신청ID 컬럼이 생기기 전의 시트 호환)
+    헤더 이름으로 컬럼을 찾는 곳(get_all_records, 단가 재확인)이 첫 신청ID부터 보도록
+    신청ID를 쓰기 전에 호출한다
+    반환: 헤더를 새로 썼으면 True
+    """
+    if worksheet.cell(1, id_col).value == ID_HEADER:
+        return False
+    worksheet.update_cell(1, id_col, ID_HEADER)
+    return True
+
+
+def row_from_response(append_response):
+    """append_row 응답의 updatedRange(예: 'Sheet1!A5:J5') → 추가된 행 번호 (알 수 없으면 None)"""
+    try:
+        updated_range = append_response["updates"]["updatedRange"]
+        return int(re.search(r"[A-Z]+(\d+)", updated_range.split("!")[-1]).group(1))
+    except Exception:
+        return None
+
+
+class RowIndex:
+    """신청ID → 시트 행 번호 (여러 세션이 함께 쓰는 인덱스)"""
+
+    def __init__(self, id_col):
+        self.id_col = id_col
+        self.rows = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def load(self, worksheet):
+        """신청ID 컬럼 하나만 읽어서 인덱스 재구성 (전체 시트 재로딩 없음)"""
+        ids = worksheet.col_values(self.id_col)
+        rows = {app_id: row_num for row_num, app_id in enumerate(ids[1:], start=2) if app_id}
+        with self.lock:
+            self.rows = rows
+            self.loaded = True
+        return rows
+
+    def register(self, app_id, append_response):
+        """추가한 행을 인덱스에 등록 (응답에서 행 번호를 알 수 없으면 다음 조회 때 다시 읽음)"""
+        row_num = row_from_response(append_response)
+        with self.lock:
+            if row_num is None:
+                self.loaded = False
+            else:
+                self.rows[app_id] = row_num
+        return row_num
+
+    def resolve(self, worksheet, app_id):
+        """
+        신청ID에 해당하는 현재 시트 행 번호 (없으면 None)
+        캐시된 행의 ID 셀 하나만 확인하고, 행이 이동했으면 인덱스를 다시 만든다
+        """
+        if not self.loaded:
+            self.load(worksheet)
+        row_num = self.rows.get(app_id)
+        if row_num and worksheet.cell(row_num, self.id_col).value == app_id:
+            return row_num
+        # 행이 이동했거나 인덱스에 없음 → ID 컬럼만 다시 읽어서 보정
+        return self.load(worksheet).get(app_id)
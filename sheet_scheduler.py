@@ -0,0 +1,272 @@
+"""
+Google Sheets 요청 스케줄러
+
+모든 세션과 백그라운드 작업의 시트 요청을 스레드 하나가 차례로 보내면서
+  - 분당 읽기/쓰기 할당량(최근 60초 요청 수)을 넘지 않도록 기다렸다 보내고
+  - 쓰기 > 화면 읽기 > 백그라운드 읽기 순으로 먼저 보내며 (읽기는 먼저 들어온 쓰기 뒤에 보냄)
+  - 아직 보내지 않은 같은 읽기는 한 번만 보내고, 셀 수정은 batch_update 한 번으로,
+    행 추가는 append_rows 한 번으로 합친다.
+429(할당량 초과)를 받으면 해당 종류를 잠시 쉬었다가 다시 보낸다.
+ScheduledWorksheet는 gspread Worksheet와 같은 메서드로 스케줄러를 거쳐 요청한다
+(batch_get으로 필요한 컬럼만 골라 읽을 수 있다).
+할당량은 KYOBO_SHEETS_READS_PER_MIN / KYOBO_SHEETS_WRITES_PER_MIN으로 바꿀 수 있다.
+"""
+import itertools
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+READS_PER_MINUTE = int(os.getenv("KYOBO_SHEETS_READS_PER_MIN", "60"))
+WRITES_PER_MINUTE = int(os.getenv("KYOBO_SHEETS_WRITES_PER_MIN", "60"))
+QUOTA_WINDOW = 60        # 할당량을 세는 구간 (초)
+THROTTLE_COOLDOWN = 10   # 429를 받은 뒤 해당 종류 요청을 쉬는 시간 (초)
+MAX_THROTTLE_RETRIES = 1 # 429를 받은 요청을 다시 보내는 횟수
+WAIT_TIMEOUT = 30        # 호출한 쪽이 결과를 기다리는 최대 시간 (초, 넘기면 TimeoutError)
+
+# 우선순위 (작을수록 먼저)
+WRITE, READ, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {WRITE: "쓰기", READ: "읽기", BACKGROUND: "백그라운드 읽기"}
+
+
+def _is_throttled(exc):
+    return getattr(getattr(exc, "response", None), "status_code", None) == 429
+
+
+class _Operation:
+    """보낼 요청 하나 (merge_key가 같은 요청은 한 번에 합쳐서 보냄)"""
+
+    def __init__(self, kind, priority, call, merge_key=None, payload=None):
+        self.kind = kind              # "read" / "write" (할당량 종류)
+        self.priority = priority
+        self.call = call              # call(payloads) → 요청별 결과 목록 (합치지 않는 요청은 payloads=[None])
+        self.merge_key = merge_key
+        self.payload = payload
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.attempts = 0
+
+
+class SheetScheduler:
+    """시트 요청을 할당량/우선순위에 맞춰 스레드 하나로 보내는 스케줄러"""
+
+    def __init__(self, worksheet, reads_per_minute=READS_PER_MINUTE, writes_per_minute=WRITES_PER_MINUTE):
+        self.raw = worksheet
+        self.quota = {"read": reads_per_minute, "write": writes_per_minute}
+        self._sent = {"read": deque(), "write": deque()}          # 최근 QUOTA_WINDOW초 요청 시각
+        self._cooldown_until = {"read": 0.0, "write": 0.0}
+        self._pending = []                                        # (우선순위, 순번, 요청)
+        self._reads = {}                                          # 읽기 키 → 아직 보내지 않은 요청
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._waits = deque(maxlen=200)                           # (우선순위, 대기 시간)
+        self.counts = {"sent": 0, "merged": 0, "coalesced": 0, "throttled": 0, "failed": 0}
+        threading.Thread(target=self._run, name="sheet-scheduler", daemon=True).start()
+
+    # ---------- 요청 넣기 ----------
+    def _submit(self, op):
+        with self._cond:
+            self._pending.append((op.priority, next(self._seq), op))
+            self._pending.sort(key=lambda item: item[:2])
+            self._cond.notify()
+        return op.future
+
+    def read(self, key, fn, priority=READ):
+        """읽기 요청 (아직 보내지 않은 같은 key 읽기가 있으면 그 결과를 같이 받음)"""
+        with self._cond:
+            op = self._reads.get(key)
+            if op is not None:
+                self.counts["coalesced"] += 1
+                if priority < op.priority:
+                    # 화면 읽기가 백그라운드 읽기에 합쳐지면 우선순위를 올림
+                    op.priority = priority
+                    self._pending = sorted(((op.priority if o is op else p, s, o) for p, s, o in self._pending),
+                                           key=lambda item: item[:2])
+                return op.future
+            op = _Operation("read", priority, lambda payloads: [fn()])
+            op.read_key = key
+            self._reads[key] = op
+        return self._submit(op)
+
+    def write(self, fn, merge_key=None, payload=None, merge=None):
+        """
+        쓰기 요청
+        merge_key가 같은 쓰기는 merge(payload 목록) 한 번으로 합쳐서 보낸다 (요청별 결과 목록 반환)
+        """
+        call = merge if merge_key else (lambda payloads: [fn()])
+        return self._submit(_Operation("write", WRITE, call, merge_key, payload))
+
+    # ---------- 보내기 ----------
+    def _room(self, kind, now):
+        """kind 요청을 지금 보낼 수 있으면 0, 아니면 기다릴 시간 (초)"""
+        sent = self._sent[kind]
+        while sent and now - sent[0] >= QUOTA_WINDOW:
+            sent.popleft()
+        wait = max(0.0, self._cooldown_until[kind] - now)
+        if len(sent) >= self.quota[kind]:
+            wait = max(wait, sent[0] + QUOTA_WINDOW - now)
+        return wait
+
+    def _next_batch(self):
+        """보낼 수 있는 가장 급한 요청과 거기에 합칠 요청들을 꺼냄 (lock을 잡은 상태에서 호출)"""
+        while True:
+            now = time.monotonic()
+            waits = []
+            for index, (_, _, op) in enumerate(self._pending):
+                wait = self._room(op.kind, now)
+                if wait:
+                    waits.append(wait)
+                    if op.kind == "write":
+                        # 쓰기가 기다리는 동안에는 읽기도 보내지 않음 (읽기가 앞선 쓰기 결과를 보도록)
+                        break
+                    continue
+                del self._pending[index]
+                batch = [op]
+                if op.merge_key is not None:
+                    batch += [o for _, _, o in self._pending if o.merge_key == op.merge_key]
+                    self._pending = [item for item in self._pending if item[2].merge_key != op.merge_key]
+                if op.kind == "read":
+                    self._reads.pop(op.read_key, None)
+                self._sent[op.kind].append(now)
+                return batch
+            self._cond.wait(min(waits) if waits else None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batch = self._next_batch()
+            batch = [op for op in batch if op.attempts or op.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.monotonic()
+            for op in batch:
+                if not op.attempts:
+                    self._waits.append((op.priority, started - op.submitted_at))
+            self.counts["sent"] += 1
+            self.counts["merged"] += len(batch) - 1
+            try:
+                results = batch[0].call([op.payload for op in batch])
+            except Exception as e:
+                self._failed(batch, e)
+                continue
+            for op, result in zip(batch, results):
+                op.future.set_result(result)
+
+    def _failed(self, batch, exc):
+        if _is_throttled(exc):
+            self.counts["throttled"] += 1
+            with self._cond:
+                kind = batch[0].kind
+                self._cooldown_until[kind] = time.monotonic() + THROTTLE_COOLDOWN
+                retry = [op for op in batch if op.attempts < MAX_THROTTLE_RETRIES]
+                for op in retry:
+                    op.attempts += 1
+                    # 순번을 앞으로 당겨서 다시 보낼 때도 원래 순서 유지
+                    self._pending.append((op.priority, -1, op))
+                self._pending.sort(key=lambda item: item[:2])
+            batch = [op for op in batch if op not in retry]
+        for op in batch:
+            self.counts["failed"] += 1
+            op.future.set_exception(exc)
+
+    # ---------- 상태 ----------
+    def stats(self):
+        """대기 중인 요청 수, 최근 60초 사용량, 우선순위별 평균/최대 대기 시간"""
+        with self._cond:
+            now = time.monotonic()
+            for kind in self._sent:
+                self._room(kind, now)
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, _ in self._pending:
+                depth[PRIORITY_NAMES[priority]] += 1
+            used = {kind: (len(sent), self.quota[kind]) for kind, sent in self._sent.items()}
+            cooldown = {kind: max(0.0, until - now) for kind, until in self._cooldown_until.items()}
+        waits = {}
+        for priority, name in PRIORITY_NAMES.items():
+            samples = [wait for p, wait in list(self._waits) if p == priority]
+            if samples:
+                waits[name] = {"avg": sum(samples) / len(samples), "max": max(samples), "count": len(samples)}
+        return {"depth": depth, "used": used, "cooldown": cooldown, "waits": waits, **self.counts}
+
+    def worksheet(self, background=False):
+        """이 스케줄러를 거치는 Worksheet (background=True면 읽기를 가장 나중에 보냄)"""
+        return ScheduledWorksheet(self, BACKGROUND if background else READ)
+
+
+def _append_rows(worksheet, rows):
+    """여러 행을 append_rows 한 번으로 추가하고 행마다 append_row와 같은 모양의 응답을 만든다"""
+    response = worksheet.append_rows(rows)
+    updated_range = response.get("updates", {}).get("updatedRange", "")
+    sheet, _, cells = updated_range.rpartition("!")
+    match = re.match(r"([A-Z]+)(\d+)", cells)
+    if not match:
+        return [response] * len(rows)
+    column, first = match.group(1), int(match.group(2))
+    return [{"updates": {"updatedRange": f"{sheet}!{column}{first + i}"}} for i in range(len(rows))]
+
+
+class ScheduledWorksheet:
+    """gspread Worksheet와 같은 메서드로 SheetScheduler를 거쳐 요청하는 대리 객체"""
+
+    def __init__(self, scheduler, priority=READ):
+        self.scheduler = scheduler
+        self.priority = priority
+
+    @staticmethod
+    def _result(future, cancel=False):
+        try:
+            return future.result(timeout=WAIT_TIMEOUT)
+        except FutureTimeout:
+            if cancel:
+                # 아직 보내지 않은 쓰기는 취소 (이미 보낸 쓰기는 그대로 반영될 수 있음)
+                # 읽기는 같은 결과를 기다리는 다른 세션이 있을 수 있어서 취소하지 않는다
+                future.cancel()
+            raise TimeoutError(f"시트 요청이 {WAIT_TIMEOUT}초 안에 처리되지 않았습니다 (할당량 대기)")
+
+    def _read(self, key, fn):
+        return self._result(self.scheduler.read(key, fn, self.priority))
+
+    def get_all_records(self, **kwargs):
+        return self._read(("get_all_records", tuple(sorted(kwargs.items()))),
+                          lambda: self.scheduler.raw.get_all_records(**kwargs))
+
+    def get_all_values(self):
+        return self._read(("get_all_values",), self.scheduler.raw.get_all_values)
+
+    def col_values(self, col):
+        return self._read(("col_values", col), lambda: self.scheduler.raw.col_values(col))
+
+    def cell(self, row, col):
+        return self._read(("cell", row, col), lambda: self.scheduler.raw.cell(row, col))
+
+    def batch_get(self, ranges, major_dimension=None):
+        """여러 범위를 요청 한 번으로 읽기 (컬럼별로 받으려면 major_dimension="COLUMNS")"""
+        ranges = list(ranges)
+        return self._read(("batch_get", tuple(ranges), major_dimension),
+                          lambda: self.scheduler.raw.batch_get(ranges, major_dimension=major_dimension))
+
+    def batch_update(self, data, value_input_option="RAW"):
+        raw = self.scheduler.raw
+
+        def merge(payloads):
+            response = raw.batch_update([item for payload in payloads for item in payload],
+                                        value_input_option=value_input_option)
+            return [response] * len(payloads)
+
+        return self._result(self.scheduler.write(None, ("batch_update", value_input_option), list(data), merge),
+                            cancel=True)
+
+    def update_cell(self, row, col, value):
+        """셀 하나 수정 (아직 보내지 않은 다른 셀 수정과 batch_update 한 번으로 합쳐짐)"""
+        from gspread.utils import rowcol_to_a1
+
+        return self.batch_update([{"range": rowcol_to_a1(row, col), "values": [[value]]}],
+                                 value_input_option="USER_ENTERED")
+
+    def append_row(self, values):
+        """행 하나 추가 (아직 보내지 않은 다른 행 추가와 append_rows 한 번으로 합쳐짐)"""
+        raw = self.scheduler.raw
+        return self._result(self.scheduler.write(None, ("append_row",), list(values),
+                                                 lambda rows: _append_rows(raw, rows)), cancel=True)
@@ -0,0 +1,183 @@
+"""
+시트에 쓰지 못한 신청 보관함
+
+Google Sheets가 할당량 초과, 인증 갱신 실패, 네트워크 오류로 append_row에 실패하면
+신청 행을 로컬 SQLite 파일에 순서대로 보관했다가, 시트가 복구되면 보관한 순서대로 다시 추가한다.
+각 신청은 신청ID를 멱등 키로 쓴다. 다시 보내기 전에 시트의 신청ID 컬럼을 읽어서
+이미 들어간 신청(추가는 됐는데 응답을 받지 못한 경우)은 건너뛴다.
+시트가 계속 거부하는 신청(400, 보호된 범위 등)은 "실패" 상태로 옮겨서 뒤의 신청을 막지 않는다.
+경로는 KYOBO_QUEUE_PATH로 바꿀 수 있다.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+QUEUE_PATH = os.getenv(
+    "KYOBO_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "kyobo_submissions.sqlite3"),
+)
+
+
+def is_sheet_unavailable(exc):
+    """
+    시트가 잠시 쓸 수 없는 상태라서 보관 후 다시 보내면 되는 오류인지
+    (할당량 초과/서버 오류, 인증 갱신 실패, 네트워크 오류)
+    """
+    import requests
+    from google.auth.exceptions import GoogleAuthError
+    from gspread.exceptions import APIError
+
+    if isinstance(exc, (requests.exceptions.RequestException, GoogleAuthError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(exc, APIError):
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+        return status in (408, 429) or (status or 0) >= 500
+    return False
+
+
+PENDING, FAILED = "pending", "failed"  # 다시 보낼 신청 / 시트가 거부해서 옮겨 둔 신청
+
+
+class SubmissionQueue:
+    """신청ID → 시트에 아직 쓰지 못한 신청 행 (보관한 순서 유지, len()은 다시 보낼 신청 수)"""
+
+    def __init__(self, path=QUEUE_PATH):
+        self.path = path
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS submissions ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT, app_id TEXT UNIQUE, row_json TEXT,"
+                " queued_at REAL, attempts INTEGER DEFAULT 0, last_error TEXT,"
+                f" status TEXT DEFAULT '{PENDING}')"
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(submissions)")}
+            if "status" not in columns:
+                # 상태 컬럼이 없던 예전 보관함
+                self._conn.execute(f"ALTER TABLE submissions ADD COLUMN status TEXT DEFAULT '{PENDING}'")
+
+    def put(self, app_id, row, error=None):
+        """신청 행(신청ID 포함) 보관 (같은 신청ID는 한 번만)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO submissions (app_id, row_json, queued_at, last_error) VALUES (?, ?, ?, ?)",
+                (app_id, json.dumps(list(row), ensure_ascii=False), time.time(), str(error or "")),
+            )
+
+    def _entries(self, status, limit=None):
+        query = "SELECT * FROM submissions WHERE status = ? ORDER BY seq"
+        with self._lock:
+            rows = self._conn.execute(query + (f" LIMIT {int(limit)}" if limit else ""), (status,)).fetchall()
+        return [
+            {"app_id": row["app_id"], "row": json.loads(row["row_json"]), "queued_at": row["queued_at"],
+             "attempts": row["attempts"], "last_error": row["last_error"]}
+            for row in rows
+        ]
+
+    def pending(self, limit=None):
+        """다시 보낼 신청을 보관한 순서대로 [{"app_id", "row", "queued_at", "attempts", "last_error"}]"""
+        return self._entries(PENDING, limit)
+
+    def failed_entries(self, limit=None):
+        """시트가 거부해서 옮겨 둔 신청 (pending과 같은 모양)"""
+        return self._entries(FAILED, limit)
+
+    def done(self, app_id):
+        """시트에 들어간 신청 삭제"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM submissions WHERE app_id = ?", (app_id,))
+
+    def failed(self, app_id, error):
+        """다시 보내기 실패 기록 (순서는 그대로, 다음 번에 다시 보냄)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE submissions SET attempts = attempts + 1, last_error = ? WHERE app_id = ?",
+                (str(error), app_id),
+            )
+
+    def reject(self, app_id, error):
+        """시트가 거부한 신청을 실패 상태로 옮김 (다시 보내지 않고 뒤의 신청도 막지 않음)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE submissions SET attempts = attempts + 1, last_error = ?, status = ? WHERE app_id = ?",
+                (str(error), FAILED, app_id),
+            )
+
+    def retry_failed(self):
+        """실패 상태의 신청을 모두 다시 보낼 신청으로 되돌림 (원래 순서 유지) → 되돌린 수"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE submissions SET status = ? WHERE status = ?", (PENDING, FAILED)
+            ).rowcount
+
+    def failed_count(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM submissions WHERE status = ?", (FAILED,)
+            ).fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM submissions WHERE status = ?", (PENDING,)
+            ).fetchone()[0]
+
+
+def replay(queue, worksheet, id_col):
+    """
+    보관한 신청을 순서대로 시트에 추가
+    시트의 신청ID 컬럼(id_col)을 한 번 읽어서 이미 있는 신청은 추가하지 않고 보관함에서만 지운다.
+    시트를 쓸 수 없는 오류(is_sheet_unavailable)면 순서를 지키기 위해 멈추고 나머지는 다음 번으로 넘긴다.
+    그 밖의 오류는 시트가 그 행을 거부한 것이므로 실패 상태로 옮기고 다음 신청을 계속 보낸다
+    반환: {"applied": 추가한 수, "skipped": 이미 있던 수, "rejected": 실패로 옮긴 수,
+           "remaining": 남은 수, "error": 오류 또는 None}
+    """
+    result = {"applied": 0, "skipped": 0, "rejected": 0, "remaining": 0, "error": None}
+    entries = queue.pending()
+    if not entries:
+        return result
+    try:
+        existing = set(worksheet.col_values(id_col))
+    except Exception as e:
+        result["error"] = str(e)
+    else:
+        for entry in entries:
+            if entry["app_id"] in existing:
+                queue.done(entry["app_id"])
+                result["skipped"] += 1
+                continue
+            try:
+                worksheet.append_row(entry["row"])
+            except Exception as e:
+                result["error"] = str(e)
+                if is_sheet_unavailable(e):
+                    queue.failed(entry["app_id"], e)
+                    break
+                queue.reject(entry["app_id"], e)
+                result["rejected"] += 1
+                continue
+            queue.done(entry["app_id"])
+            existing.add(entry["app_id"])
+            result["applied"] += 1
+    queue.last_error = result["error"]
+    result["remaining"] = len(queue)
+    return result
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue(path=None):
+    """경로별로 SubmissionQueue 하나만 만들어서 공유"""
+    path = path or QUEUE_PATH
+    with _queues_lock:
+        if path not in _queues:
+            _queues[path] = SubmissionQueue(path)
+        return _queues[path]
@@ -0,0 +1,134 @@
+import pytest
+
+import kyobo_extractor
+from book_cache import BookCache, normalize_isbn
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return BookCache(str(tmp_path / "cache.sqlite3"))
+
+
+BOOK = {"title": "파이썬 코딩의 기술", "author": "브렛 슬라킨", "publisher": "길벗", "price": "32000",
+        "isbn": "978-89-6626-095-9", "extraction_method": "json_ld"}
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("9788966260959", "9788966260959"),
+    ("978-89-6626-095-9", "9788966260959"),
+    ("0-306-40615-2", "9780306406157"),
+    ("080442957X", "9780804429573"),
+    ("12345", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_isbn(value, expected):
+    assert normalize_isbn(value) == expected
+
+
+def test_put_indexes_by_normalized_isbn(cache):
+    cache.put("S000001", "https://product.kyobobook.co.kr/detail/S000001", BOOK)
+    info = cache.get_by_isbn("9788966260959")
+    assert info["title"] == "파이썬 코딩의 기술" and info["product_id"] == "S000001"
+    assert info["isbn"] == "9788966260959"
+    assert cache.get_by_isbn("978 89 6626 095 9")["product_id"] == "S000001"
+    assert cache.get_by_isbn("잘못된 값") is None
+    assert len(cache) == 1
+
+
+def test_put_keeps_existing_values_when_new_ones_are_blank(cache):
+    cache.put("S000001", "u1", BOOK)
+    cache.put("S000001", "u1", {"title": "파이썬 코딩의 기술", "isbn": "", "publisher": ""})
+    info = cache.get("S000001")
+    assert info["isbn"] == "9788966260959" and info["publisher"] == "길벗"
+
+
+def test_isbn_lookup_reads_through_cache(cache, monkeypatch):
+    cache.put("S000001", "https://product.kyobobook.co.kr/detail/S000001", BOOK)
+    monkeypatch.setattr(kyobo_extractor, "get_cache", lambda: cache)
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("캐시에 있는 ISBN은 검색하지 않아야 함")
+
+    monkeypatch.setattr(kyobo_extractor, "find_product_url_by_isbn", no_network)
+    info = kyobo_extractor.get_book_info_by_isbn("89-6626-095-1")
+    assert info["url"] == "https://product.kyobobook.co.kr/detail/S000001"
+    assert kyobo_extractor.get_book_info_by_isbn("12345") is None
+
+
+def test_unknown_isbn_is_indexed_after_lookup(cache, monkeypatch):
+    url = "https://product.kyobobook.co.kr/detail/S000002"
+    monkeypatch.setattr(kyobo_extractor, "get_cache", lambda: cache)
+    monkeypatch.setattr(kyobo_extractor, "find_product_url_by_isbn", lambda isbn, **kwargs: url)
+    monkeypatch.setattr(kyobo_extractor, "get_book_info", lambda *args, **kwargs: dict(BOOK, isbn=""))
+    info = kyobo_extractor.get_book_info_by_isbn("9780306406157")
+    assert info["url"] == url and info["isbn"] == "9780306406157"
+    assert cache.get_by_isbn("0-306-40615-2")["product_id"] == "S000002"
+
+
+def test_updated_at_moves_only_when_price_is_extracted(cache, monkeypatch):
+    import book_cache
+
+    monkeypatch.setattr(book_cache.time, "time", lambda: 1000.0)
+    cache.put("S000001", "u1", BOOK)
+    monkeypatch.setattr(book_cache.time, "time", lambda: 5000.0)
+    cache.put("S000001", "u1", dict(BOOK, price=""))
+    info = cache.get("S000001")
+    assert info["price"] == "32000" and info["updated_at"] == 1000.0
+    assert not cache.is_fresh("S000001", max_age=3600)
+
+    cache.put("S000001", "u1", dict(BOOK, price="30000"))
+    assert cache.get("S000001")["updated_at"] == 5000.0
+
+
+def test_new_entry_without_price_is_not_fresh(cache):
+    cache.put("S000003", "u3", dict(BOOK, price=""))
+    assert not cache.is_fresh("S000003", max_age=3600)
+    assert cache.lookup("S000003", max_age=3600) is None
+
+
+def test_validators(cache):
+    assert cache.validators("S000001") == ("", "")
+    cache.put("S000001", "u1", BOOK)
+    cache.set_validators("S000001", '"abc"', None)
+    assert cache.validators("S000001") == ('"abc"', "")
+
+
+def test_lookup_reads_through_and_counts_hits(cache, monkeypatch):
+    import book_cache
+
+    monkeypatch.setattr(book_cache.time, "time", lambda: 1000.0)
+    cache.put("S000001", "u1", BOOK)
+    cache.put("S000002", "u2", dict(BOOK, title=""))
+    assert cache.lookup("S000001", max_age=3600)["price"] == "32000"
+    assert cache.lookup("S000002", max_age=3600, require=("title", "price")) is None
+    assert cache.lookup("S999999") is None
+
+    monkeypatch.setattr(book_cache.time, "time", lambda: 1000.0 + 7200)
+    assert cache.lookup("S000001", max_age=3600) is None
+    assert cache.lookup("S000001")["title"] == BOOK["title"]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 3
+
+
+def test_is_fresh_is_not_counted(cache):
+    cache.put("S000001", "u1", BOOK)
+    assert cache.is_fresh("S000001", max_age=3600)
+    assert not cache.is_fresh("S999999", max_age=3600)
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+
+def test_warm_cache_skips_fresh_products(cache, monkeypatch):
+    fresh = "https://product.kyobobook.co.kr/detail/S000001"
+    stale = "https://product.kyobobook.co.kr/detail/S000002"
+    cache.put("S000001", fresh, BOOK)
+    looked_up = []
+    monkeypatch.setattr(kyobo_extractor, "get_cache", lambda: cache)
+    monkeypatch.setattr(kyobo_extractor, "get_books_info",
+                        lambda urls, **kwargs: looked_up.extend(urls) or {url: BOOK for url in urls})
+    progress = []
+
+    summary = kyobo_extractor.warm_cache([fresh, stale, stale], rate=1000,
+                                         progress=lambda done, total: progress.append((done, total)))
+    assert looked_up == [stale]
+    assert summary == {"total": 2, "skipped": 1, "warmed": 1, "failed": 0}
+    assert progress == [(1, 2), (2, 2)]
@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+import kyobo_extractor
+from kyobo_extractor import RuleSet, _Document, extract_price_advanced, get_rule_set, load_rule_set
+
+
+def document(html):
+    return _Document(BeautifulSoup(html, "html.parser"), kyobo_extractor.default_log, False)
+
+
+def price_rules(*rules):
+    return RuleSet({"version": 1, "fields": {"price": {"value": "price", "rules": list(rules)}}})
+
+
+SELECTOR = {"name": "sell_price class", "type": "selector", "css": "span.sell_price", "range": [1000, 10000000]}
+
+
+def test_unknown_rule_type_is_rejected():
+    with pytest.raises(ValueError):
+        price_rules({"name": "bad", "type": "xpath"})
+
+
+def test_repo_rule_file_compiles():
+    rule_set = load_rule_set()
+    assert {"title", "author", "publisher", "isbn", "price"} <= set(rule_set.fields)
+
+
+def test_data_price_attribute_wins_and_is_labelled():
+    doc = document('<span class="sell_price" data-price="18,000">15,000원</span>')
+    assert price_rules(SELECTOR).extract(doc, "price") == ("18000", "sell_price class (data-price)")
+
+
+def test_data_price_attribute_is_not_range_checked_by_default():
+    doc = document('<span class="sell_price" data-price="500">15,000원</span>')
+    assert price_rules(SELECTOR).extract(doc, "price") == ("500", "sell_price class (data-price)")
+
+
+def test_data_price_range_applies_when_configured():
+    rule = dict(SELECTOR, data_price_range=[1000, 10000000])
+    doc = document('<span class="sell_price" data-price="500">15,000원</span>')
+    assert price_rules(rule).extract(doc, "price") == ("15000", "sell_price class")
+
+
+def test_text_numbers_outside_range_are_skipped():
+    doc = document('<span class="sell_price">1권 12,000원</span>')
+    assert price_rules(SELECTOR).extract(doc, "price") == ("12000", "sell_price class")
+
+
+def test_rules_are_tried_in_order_and_counted():
+    rule_set = price_rules(
+        {"name": "meta", "type": "meta", "property": "product:price:amount"},
+        SELECTOR,
+    )
+    doc = document('<span class="sell_price">9,900원</span>')
+    assert rule_set.extract(doc, "price") == ("9900", "sell_price class")
+    stats = {s["rule"]: s for s in rule_set.stats()}
+    assert stats["meta"]["evaluations"] == 1 and stats["meta"]["hits"] == 0
+    assert stats["sell_price class"]["hits"] == 1
+
+
+def test_jsonld_price_from_repo_rules():
+    html = ('<script type="application/ld+json">'
+            '{"@type": "Product", "offers": {"price": "22000.0"}}</script>')
+    result = extract_price_advanced(BeautifulSoup(html, "html.parser"))
+    assert result["price"] == "22000" and result["extraction_method"] == "JSON-LD offers.price"
+
+
+@pytest.fixture
+def rules_file(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    monkeypatch.setattr(kyobo_extractor, "RULES_PATH", str(path))
+    monkeypatch.setattr(kyobo_extractor, "_rule_set", None)
+    return path
+
+
+def write_rules(path, rule, mtime):
+    path.write_text(json.dumps({"version": 1, "fields": {"price": {"value": "price", "rules": [rule]}}}),
+                    encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_rule_set_is_recompiled_when_file_changes(rules_file):
+    write_rules(rules_file, SELECTOR, 1000)
+    first = get_rule_set()
+    assert get_rule_set() is first
+    write_rules(rules_file, dict(SELECTOR, name="renamed"), 2000)
+    assert [name for name, _, _ in get_rule_set().fields["price"]] == ["renamed"]
+
+
+def test_broken_rule_file_keeps_previous_rules(rules_file):
+    write_rules(rules_file, SELECTOR, 1000)
+    first = get_rule_set()
+    write_rules(rules_file, {"name": "bad", "type": "xpath"}, 2000)
+    assert get_rule_set() is first
+    assert first.mtime == 2000
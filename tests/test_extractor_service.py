@@ -0,0 +1,166 @@
+import threading
+
+import pytest
+import requests
+from urllib3.exceptions import ProtocolError
+
+import extractor_service
+import kyobo_extractor
+from book_cache import BookCache
+from extractor_service import ServiceUnavailable, service_lookup, service_lookup_many
+
+URL = "https://product.kyobobook.co.kr/detail/S000001"
+BOOK = {"title": "책", "author": "저자", "publisher": "출판사", "price": "15000"}
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """추출 엔진 대신 호출 인자를 기록하는 가짜 엔진"""
+    calls = []
+
+    def get_books_info(urls, **kwargs):
+        calls.append(dict(kwargs, urls=urls, thread=threading.get_ident()))
+        if "boom" in urls[0]:
+            raise RuntimeError("엔진 오류")
+        return {url: dict(BOOK) for url in urls}
+
+    def get_book_info_by_isbn(isbn, **kwargs):
+        calls.append(dict(kwargs, isbn=isbn))
+        return dict(BOOK, url=URL)
+
+    cache = BookCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(extractor_service, "get_cache", lambda: cache)
+    monkeypatch.setattr(kyobo_extractor, "get_books_info", get_books_info)
+    monkeypatch.setattr(kyobo_extractor, "get_book_info_by_isbn", get_book_info_by_isbn)
+    return calls
+
+
+@pytest.fixture
+def service(engine):
+    server = extractor_service.make_server(port=0, workers=2, pool_size=4)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_health(service):
+    _, url = service
+    data = requests.get(f"{url}/health", timeout=5).json()
+    assert data["ok"] and data["cache"]["size"] == 0 and "fetch" in data
+
+
+def test_book_lookup_passes_deadline_and_fresh(service, engine):
+    _, url = service
+    data = requests.get(f"{url}/book", params={"url": URL, "deadline": "500", "fresh": "1"}, timeout=5).json()
+    assert data["book"] == BOOK and data["url"] == URL
+    call = engine[0]
+    assert call["urls"] == [URL] and call["use_cache"] is False and call["workers"] == 1
+    assert call["deadline"].seconds == extractor_service.MAX_DEADLINE
+
+
+def test_isbn_lookup(service, engine):
+    _, url = service
+    data = requests.get(f"{url}/book", params={"isbn": "978-89-6626-095-9"}, timeout=5).json()
+    assert data["url"] == URL and engine[0]["isbn"] == "978-89-6626-095-9"
+
+
+@pytest.mark.parametrize("method, path, kwargs, status", [
+    ("GET", "/book", {"params": {"isbn": "12345"}}, 400),
+    ("GET", "/book", {}, 400),
+    ("GET", "/nothing", {}, 404),
+    ("POST", "/books", {"data": b"not json"}, 400),
+    ("POST", "/books", {"json": {"urls": []}}, 400),
+    ("POST", "/books", {"json": {"urls": ["u"] * (extractor_service.MAX_BATCH + 1)}}, 400),
+    ("POST", "/nothing", {"json": {}}, 404),
+    ("GET", "/book", {"params": {"url": "https://boom"}}, 500),
+])
+def test_bad_requests(service, method, path, kwargs, status):
+    _, url = service
+    response = requests.request(method, f"{url}{path}", timeout=5, **kwargs)
+    assert response.status_code == status and response.json()["error"]
+
+
+def test_client_lookups(service, engine):
+    _, url = service
+    assert service_lookup(URL, service_url=url) == (BOOK, None)
+    results, _ = service_lookup_many([URL, URL + "2"], service_url=url)
+    assert results == {URL: BOOK, URL + "2": BOOK}
+    assert engine[-1]["workers"] == 2
+    with pytest.raises(ServiceUnavailable, match="엔진 오류"):
+        service_lookup("https://boom", service_url=url)
+
+
+def test_request_threads_get_their_own_session_sharing_one_pool(service, engine, monkeypatch):
+    server, url = service
+    barrier = threading.Barrier(2)
+    original = kyobo_extractor.get_books_info
+
+    def wait_for_both(urls, **kwargs):
+        barrier.wait(5)  # 두 요청이 동시에 처리되는 중
+        return original(urls, **kwargs)
+
+    monkeypatch.setattr(kyobo_extractor, "get_books_info", wait_for_both)
+    threads = [threading.Thread(target=requests.get, args=(f"{url}/book",),
+                                kwargs={"params": {"url": URL}, "timeout": 5}) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    first, second = (call["session"] for call in engine)
+    assert first is not second
+    assert first.get_adapter(URL) is second.get_adapter(URL) is server.adapter
+
+
+class FakeResponse:
+    status_code = 200
+
+    def json(self):
+        return {"book": BOOK}
+
+
+def reset_error():
+    return requests.exceptions.ConnectionError(
+        ProtocolError("Connection aborted.", ConnectionResetError(104, "Connection reset by peer")))
+
+
+def test_client_retries_once_on_connection_reset(monkeypatch):
+    errors = [reset_error()]
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append(url)
+        if errors:
+            raise errors.pop(0)
+        return FakeResponse()
+
+    monkeypatch.setattr(requests, "request", request)
+    assert service_lookup(URL, service_url="http://service") == (BOOK, None)
+    assert len(calls) == 2
+
+
+def test_client_gives_up_after_second_reset(monkeypatch):
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append(url)
+        raise reset_error()
+
+    monkeypatch.setattr(requests, "request", request)
+    with pytest.raises(ServiceUnavailable):
+        service_lookup(URL, service_url="http://service")
+    assert len(calls) == 2
+
+
+def test_client_does_not_retry_refused_connection(monkeypatch):
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append(url)
+        raise requests.exceptions.ConnectionError(ConnectionRefusedError(111, "Connection refused"))
+
+    monkeypatch.setattr(requests, "request", request)
+    with pytest.raises(ServiceUnavailable):
+        service_lookup(URL, service_url="http://service")
+    assert len(calls) == 1
@@ -0,0 +1,267 @@
+import pytest
+import requests
+
+import kyobo_extractor
+from kyobo_extractor import (
+    Deadline,
+    FetchError,
+    RetryPolicy,
+    check_response,
+    classify_exception,
+    get_book_info_advanced,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text="x" * 2000, headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+class StreamResponse(FakeResponse):
+    """stream=True로 받은 응답 흉내 (본문을 chunk 단위로 내보냄, 읽은 조각 수를 셈)"""
+
+    def __init__(self, status_code=200, text="x" * 2000, headers=None):
+        super().__init__(status_code, text, headers)
+        self.body = text.encode("utf-8")
+        self.encoding = "utf-8"
+        self.chunks = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.body), chunk_size):
+            self.chunks += 1
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("exc, kind", [
+    (requests.exceptions.SSLError(), "ssl"),
+    (requests.exceptions.ConnectTimeout(), "timeout"),
+    (requests.exceptions.ReadTimeout(), "timeout"),
+    (requests.exceptions.ConnectionError(), "connection"),
+    (ValueError(), "error"),
+])
+def test_classify_exception(exc, kind):
+    assert classify_exception(exc) == kind
+
+
+@pytest.mark.parametrize("response, kind", [
+    (FakeResponse(429), "throttled"),
+    (FakeResponse(503), "server"),
+    (FakeResponse(404), "client"),
+    (FakeResponse(200, "임시 점검 중입니다" + "x" * 2000), "maintenance"),
+    (FakeResponse(200, "짧은 응답"), "incomplete"),
+])
+def test_check_response_kinds(response, kind):
+    with pytest.raises(FetchError) as info:
+        check_response(response)
+    assert info.value.kind == kind
+
+
+def test_check_response_reads_retry_after():
+    with pytest.raises(FetchError) as info:
+        check_response(FakeResponse(429, headers={"Retry-After": "3"}))
+    assert info.value.retry_after == 3.0 and info.value.status == 429
+
+
+def test_check_response_accepts_full_page():
+    assert check_response(FakeResponse()) is None
+
+
+def failing(kinds, result="ok"):
+    """kinds 순서대로 FetchError를 던지고 그다음 result를 돌려주는 attempt_fn"""
+    calls = []
+
+    def attempt(number, deadline):
+        calls.append(number)
+        if len(calls) <= len(kinds):
+            raise FetchError(kinds[len(calls) - 1], "실패")
+        return result
+
+    return attempt, calls
+
+
+def test_retry_policy_retries_retryable_failures():
+    attempt, calls = failing(["timeout", "server"])
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01, min_attempt_time=0)
+    assert policy.run(attempt) == "ok"
+    assert calls == [0, 1, 2]
+
+
+def test_retry_policy_does_not_retry_client_errors():
+    attempt, calls = failing(["client"])
+    with pytest.raises(FetchError) as info:
+        RetryPolicy(base_delay=0.01, min_attempt_time=0).run(attempt)
+    assert info.value.kind == "client" and info.value.attempts == 1
+    assert calls == [0]
+
+
+def test_retry_policy_respects_max_attempts():
+    attempt, calls = failing(["connection"] * 5)
+    with pytest.raises(FetchError) as info:
+        RetryPolicy(max_attempts=2, base_delay=0.01, min_attempt_time=0).run(attempt)
+    assert info.value.attempts == 2 and calls == [0, 1]
+
+
+def test_retry_policy_stops_when_deadline_is_too_short():
+    attempt, calls = failing(["timeout"] * 3)
+    with pytest.raises(FetchError):
+        RetryPolicy(max_attempts=3, base_delay=0.01, min_attempt_time=1.0).run(attempt, Deadline(0.5))
+    assert calls == [0]
+
+
+def test_deadline_caps_connect_and_read_timeouts():
+    connect, read = Deadline(3).timeout(connect=5, read=20)
+    assert 2.5 < connect <= 3 and 2.5 < read <= 3
+    assert Deadline(60).timeout(connect=5, read=20) == (5, 20)
+
+
+def test_deadline_timeout_raises_when_spent():
+    with pytest.raises(FetchError) as info:
+        Deadline(0).timeout()
+    assert info.value.kind == "timeout"
+
+
+def test_read_page_stops_at_the_byte_limit():
+    response = StreamResponse(text="x" * 200 * 1024)
+    assert len(kyobo_extractor.read_page(response, limit=100 * 1024)) == 100 * 1024
+    # 64KB 조각 두 개만 읽고 나머지는 받지 않는다
+    assert response.chunks == 2 and response.closed
+
+
+def test_read_page_decodes_utf8_without_charset():
+    response = StreamResponse(text="교보문고 " * 10)
+    response.encoding = "ISO-8859-1"
+    assert kyobo_extractor.read_page(response, limit=0) == "교보문고 " * 10
+
+
+class ExpiringDeadline(Deadline):
+    """조각 n개를 읽은 뒤부터 만료되는 Deadline"""
+
+    def __init__(self, after):
+        super().__init__(30)
+        self.checks = 0
+        self.after = after
+
+    def expired(self):
+        self.checks += 1
+        return self.checks > self.after
+
+
+def test_read_page_stops_when_the_deadline_expires():
+    response = StreamResponse(text="x" * 300 * 1024)
+    with pytest.raises(FetchError) as info:
+        kyobo_extractor.read_page(response, limit=0, deadline=ExpiringDeadline(after=2))
+    assert info.value.kind == "timeout"
+    assert response.chunks == 3 and response.closed
+
+
+def test_lookup_sends_pcid_per_request_without_touching_session_cookies(monkeypatch):
+    parser = kyobo_extractor.get_profile()["parser"]
+    monkeypatch.setitem(kyobo_extractor.PARSERS, parser,
+                        lambda soup, debug=False, log=None: {"title": "책", "price": "15000"})
+    session = requests.Session()
+    sent = []
+    monkeypatch.setattr(session, "get", lambda url, **kwargs: sent.append(kwargs) or StreamResponse())
+
+    assert get_book_info_advanced("https://product.kyobobook.co.kr/detail/S000001", session=session)["price"] == "15000"
+    assert sent[0]["cookies"]["PCID"].isdigit()
+    # 여러 스레드가 나눠 쓰는 Session의 쿠키는 그대로
+    assert len(session.cookies) == 0
+
+
+class InlinePool:
+    """제출한 작업을 바로 실행하는 프로세스 풀 대역 (넘긴 인자를 기록)"""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+
+        self.submitted.append(args)
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_worker_processes_get_remaining_seconds_not_the_deadline(tmp_path, monkeypatch):
+    from book_cache import BookCache
+
+    cache = BookCache(str(tmp_path / "cache.sqlite3"))
+    pool = InlinePool()
+    seen = []
+    monkeypatch.setattr(kyobo_extractor, "get_cache", lambda: cache)
+    monkeypatch.setattr(kyobo_extractor, "get_process_pool", lambda: pool)
+    monkeypatch.setattr(kyobo_extractor, "fetch_products_json", lambda ids, **kwargs: {})
+    monkeypatch.setattr(kyobo_extractor, "get_book_info_advanced",
+                        lambda url, deadline=None, **kwargs: seen.append(deadline) or {"title": "책", "price": "1"})
+
+    url = "https://product.kyobobook.co.kr/detail/S000001"
+    parent = Deadline(30)
+    assert kyobo_extractor.get_books_info([url], deadline=parent)[url]["price"] == "1"
+    remaining = pool.submitted[0][2]
+    assert isinstance(remaining, float) and 29 < remaining <= 30
+    # 워커는 자기 시계로 새 Deadline을 만든다
+    assert isinstance(seen[0], Deadline) and seen[0] is not parent
+    assert 29 < seen[0].remaining() <= 30
+
+
+@pytest.fixture
+def lookup_stubs(tmp_path, monkeypatch):
+    """get_books_info의 캐시/API/HTML 단계를 흉내 (각 단계에 넘어온 URL·상품번호를 기록)"""
+    from book_cache import BookCache
+
+    stubs = {"cache": BookCache(str(tmp_path / "cache.sqlite3")), "api": {}, "html": {},
+             "api_calls": [], "html_calls": []}
+    monkeypatch.setattr(kyobo_extractor, "get_cache", lambda: stubs["cache"])
+    monkeypatch.setattr(kyobo_extractor, "get_process_pool", lambda: None)
+    monkeypatch.setattr(kyobo_extractor, "fetch_products_json",
+                        lambda ids, **kwargs: stubs["api_calls"].append(list(ids))
+                        or {pid: stubs["api"][pid] for pid in ids if pid in stubs["api"]})
+    monkeypatch.setattr(kyobo_extractor, "get_book_info_advanced",
+                        lambda url, **kwargs: stubs["html_calls"].append(url) or stubs["html"].get(url))
+    return stubs
+
+
+FIRST = "https://product.kyobobook.co.kr/detail/S000001"
+SECOND = "https://product.kyobobook.co.kr/detail/S000002"
+
+
+def test_books_info_uses_fresh_cache_before_api(lookup_stubs):
+    lookup_stubs["cache"].put("S000001", FIRST, {"title": "캐시 책", "price": "15000"})
+    lookup_stubs["api"]["S000002"] = {"title": "API 책", "price": "20000"}
+
+    results = kyobo_extractor.get_books_info([FIRST, SECOND])
+    assert results[FIRST]["title"] == "캐시 책" and results[SECOND]["title"] == "API 책"
+    assert lookup_stubs["api_calls"] == [["S000002"]]
+    assert lookup_stubs["html_calls"] == []
+
+
+def test_books_info_falls_back_to_html_for_incomplete_api_results(lookup_stubs):
+    lookup_stubs["api"]["S000001"] = {"title": "가격 없는 책", "price": ""}
+    lookup_stubs["html"][FIRST] = {"title": "HTML 책", "price": "18000"}
+
+    assert kyobo_extractor.get_books_info([FIRST])[FIRST]["price"] == "18000"
+    assert lookup_stubs["html_calls"] == [FIRST]
+    # HTML로 얻은 결과는 다음 조회를 위해 캐시에 기록
+    assert lookup_stubs["cache"].get("S000001")["price"] == "18000"
+
+
+def test_books_info_keeps_api_result_when_html_fails(lookup_stubs):
+    lookup_stubs["api"]["S000001"] = {"title": "가격 없는 책", "price": ""}
+
+    assert kyobo_extractor.get_books_info([FIRST])[FIRST]["title"] == "가격 없는 책"
+    assert kyobo_extractor.get_books_info([SECOND])[SECOND] is None
+    assert lookup_stubs["html_calls"] == [FIRST, SECOND]
+
+
+def test_books_info_skips_cache_when_disabled(lookup_stubs):
+    lookup_stubs["cache"].put("S000001", FIRST, {"title": "캐시 책", "price": "15000"})
+    lookup_stubs["api"]["S000001"] = {"title": "API 책", "price": "16000"}
+
+    assert kyobo_extractor.get_books_info([FIRST], use_cache=False)[FIRST]["title"] == "API 책"
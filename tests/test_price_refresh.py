@@ -0,0 +1,199 @@
+import pytest
+
+import kyobo_extractor
+import price_refresh
+from book_cache import BookCache
+from kyobo_extractor import revalidate_book_info, to_int
+
+URL = "https://product.kyobobook.co.kr/detail/S000001"
+
+
+class StreamResponse:
+    """stream=True로 받은 응답 흉내"""
+
+    def __init__(self, status_code=200, text="x" * 2000, headers=None):
+        self.status_code = status_code
+        self.body = text.encode("utf-8")
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.headers = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.headers.append(headers)
+        return self.response
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = BookCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(kyobo_extractor, "get_cache", lambda: cache)
+    return cache
+
+
+def use_parser(monkeypatch, info):
+    parser = kyobo_extractor.get_profile()["parser"]
+    monkeypatch.setitem(kyobo_extractor.PARSERS, parser, lambda soup, log=None: dict(info))
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("12,000원", 12000),
+    ("15000.0", 15000),
+    (15000, 15000),
+    (float("nan"), 0),
+    (True, 0),
+    ("", 0),
+    ("가격 미정", 0),
+    (None, 0),
+])
+def test_to_int(value, expected):
+    assert to_int(value) == expected
+
+
+def test_revalidate_stores_validators_with_price(cache, monkeypatch):
+    use_parser(monkeypatch, {"title": "책", "price": "15000"})
+    session = FakeSession(StreamResponse(headers={"ETag": '"v1"'}))
+    info, status = revalidate_book_info(URL, session=session)
+    assert status == "fetched" and info["price"] == "15000"
+    assert cache.validators("S000001") == ('"v1"', "")
+
+    session = FakeSession(StreamResponse(304))
+    info, status = revalidate_book_info(URL, session=session)
+    assert status == "not_modified" and info["price"] == "15000"
+    assert session.headers[0]["If-None-Match"] == '"v1"'
+
+
+def test_revalidate_without_price_keeps_entry_stale(cache, monkeypatch):
+    cache.put("S000001", URL, {"title": "책", "price": "15000"})
+    cache._conn.execute("UPDATE products SET updated_at = 0")
+    use_parser(monkeypatch, {"title": "책", "price": ""})
+    info, status = revalidate_book_info(URL, session=FakeSession(StreamResponse(headers={"ETag": '"v2"'})))
+    assert status == "fetched" and info["price"] == ""
+    # 가격을 찾지 못한 응답은 캐시 값을 새로 확인한 것으로 만들지 않는다
+    assert cache.validators("S000001") == ("", "")
+    assert cache.get("S000001")["updated_at"] == 0
+
+
+HEADER = ["신청시간", "신청자 성명", "도서명", "저자명", "출판사", "단가", "수량", "구매사이트", "가격", "신청ID"]
+BOOK_URL = "https://product.kyobobook.co.kr/detail/S000001"
+OTHER_URL = "https://product.kyobobook.co.kr/detail/S000002"
+
+
+class FakeSheet:
+    """batch_get(헤더 행 / 컬럼 범위)과 batch_update만 흉내 내는 시트"""
+
+    def __init__(self, rows):
+        self.rows = [HEADER] + [list(row) for row in rows]
+        self.calls = []
+
+    def batch_get(self, ranges, major_dimension=None):
+        from gspread.utils import a1_to_rowcol
+
+        self.calls.append(("batch_get", tuple(ranges)))
+        out = []
+        for rng in ranges:
+            start = rng.split(":")[0]
+            if start.isdigit():
+                out.append([self.rows[int(start) - 1]])
+                continue
+            row, col = a1_to_rowcol(start)
+            column = [cells[col - 1] if len(cells) >= col else "" for cells in self.rows[row - 1:]]
+            while column and column[-1] == "":
+                column.pop()
+            out.append([column] if column else [])
+        return out
+
+    def batch_update(self, data):
+        from gspread.utils import a1_to_rowcol
+
+        self.calls.append(("batch_update", data))
+        for item in data:
+            row, col = a1_to_rowcol(item["range"])
+            self.rows[row - 1][col - 1] = item["values"][0][0]
+
+
+def application(title, unit, qty, url, app_id):
+    return ["2024-03-01 10:00:00", "김철수", title, "저자", "출판사", unit, qty, url, to_int(unit) * qty, app_id]
+
+
+def test_read_sheet_reads_only_needed_columns():
+    sheet = FakeSheet([application("책1", "15,000", 2, BOOK_URL, "a")])
+    columns, values = price_refresh.read_sheet(sheet)
+    assert columns == {"도서명": 3, "단가": 6, "수량": 7, "구매사이트": 8, "가격": 9, "신청ID": 10}
+    assert sheet.calls == [("batch_get", ("1:1",)),
+                           ("batch_get", ("C2:C", "F2:F", "G2:G", "H2:H", "I2:I", "J2:J"))]
+    assert values["단가"] == ["15,000"] and values["신청ID"] == ["a"]
+
+
+def test_collect_and_diff_prices():
+    sheet = FakeSheet([
+        application("책1", "15,000", 2, BOOK_URL, "a"),
+        application("직접 입력", "9000", 1, "https://example.com/book", "b"),
+        application("책1", "16000", 1, BOOK_URL, "c"),
+        application("책2", "20000", 1, OTHER_URL, ""),
+    ])
+    _, values = price_refresh.read_sheet(sheet)
+    products = price_refresh.collect_products(values)
+    assert sorted(products) == ["S000001", "S000002"]
+    assert [row["_row"] for row in products["S000001"]] == [2, 4]
+
+    prices = {BOOK_URL: ("16,000원", "fetched"), OTHER_URL: ("", "failed")}
+    changes = price_refresh.diff_prices(products, prices)
+    # 값이 같은 행과 가격을 확인하지 못한 상품은 바꾸지 않는다
+    assert changes == [{"row": 2, "신청ID": "a", "도서명": "책1", "구매사이트": BOOK_URL, "수량": 2,
+                        "old_unit": 15000, "new_unit": 16000, "old_total": 30000, "new_total": 32000}]
+
+
+def test_resolve_rows_follows_ids_and_skips_changed_rows():
+    sheet = FakeSheet([
+        application("책1", "15000", 1, BOOK_URL, "a"),
+        application("책1", "15000", 1, BOOK_URL, "gone"),
+        application("옛 행", "15000", 1, BOOK_URL, ""),
+        application("옛 행", "15000", 1, BOOK_URL, ""),
+    ])
+    columns, values = price_refresh.read_sheet(sheet)
+    changes = price_refresh.diff_prices(price_refresh.collect_products(values), {BOOK_URL: ("16000", "api")})
+    assert [change["row"] for change in changes] == [2, 3, 4, 5]
+
+    # 조회하는 동안 위에 행이 끼어들고, gone 행이 지워지고, a의 수량이 바뀌고, 5행이 고쳐짐
+    sheet.rows.insert(1, application("새 신청", "9000", 1, OTHER_URL, "new"))
+    sheet.rows = [row for row in sheet.rows if row[-1] != "gone"]
+    sheet.rows[2][6] = 3
+    sheet.rows[4][5] = "14000"
+    resolved, skipped = price_refresh.resolve_rows(sheet, columns, changes)
+    assert [(change["row"], change["수량"], change["new_total"]) for change in resolved] == [(3, 3, 48000), (4, 1, 16000)]
+    assert [change["row"] for change in skipped] == [3, 5]
+
+
+def test_apply_changes_logs_each_row_before_writing():
+    sheet = FakeSheet([application("책1", "15000", 2, BOOK_URL, "a")])
+    columns, values = price_refresh.read_sheet(sheet)
+    changes = price_refresh.diff_prices(price_refresh.collect_products(values), {BOOK_URL: ("16000", "api")})
+    logged = []
+    applied, skipped = price_refresh.apply_changes(
+        sheet, columns, changes, log=lambda level, message: logged.append((len(sheet.calls), message)))
+    assert len(applied) == 1 and skipped == []
+    assert sheet.rows[1][5] == 16000 and sheet.rows[1][8] == 32000
+    # 로그는 batch_update보다 먼저 남는다
+    update_at = [call[0] for call in sheet.calls].index("batch_update")
+    assert logged and logged[0][0] <= update_at
+    assert "신청ID a" in logged[0][1] and "15000 → 16000" in logged[0][1]
+
+
+def test_refresh_prices_dry_run_does_not_write(monkeypatch):
+    sheet = FakeSheet([application("책1", "15000", 2, BOOK_URL, "a")])
+    monkeypatch.setattr(price_refresh, "fetch_prices", lambda urls, **kwargs: {BOOK_URL: ("16000", "api")})
+    report = price_refresh.refresh_prices(sheet, dry_run=True, log=lambda level, message: None)
+    assert len(report["changes"]) == 1 and not report["applied"]
+    assert all(call[0] == "batch_get" for call in sheet.calls)
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from record_schema import apply_record_schema
+
+
+def make_frame():
+    return pd.DataFrame({
+        "_row": [2, 3, 4],
+        "신청시간": ["2024-03-01 10:00:00", "어제", ""],
+        "신청자 성명": ["김철수", "이영희", "김철수"],
+        "도서명": ["책1", "책2", 3],
+        "단가": ["12,000원", "가격 미정", ""],
+        "수량": [1, "2", "두 권"],
+        "가격": [12000, "24000", ""],
+    })
+
+
+def test_values_are_coerced_to_schema_types():
+    df, _ = apply_record_schema(make_frame())
+    assert df["단가"].tolist() == [12000, 0, 0]
+    assert df["수량"].tolist() == [1, 2, 0]
+    assert df["가격"].tolist() == [12000, 24000, 0]
+    assert str(df["단가"].dtype) == "int64" and str(df["수량"].dtype) == "int32"
+    assert str(df["신청자 성명"].dtype) == "category"
+    assert df["신청시간"].iloc[0] == pd.Timestamp("2024-03-01 10:00:00")
+    assert df["도서명"].tolist() == ["책1", "책2", "3"]
+
+
+def test_bad_values_are_reported_and_blanks_are_not():
+    _, errors = apply_record_schema(make_frame())
+    assert sorted((error["행"], error["컬럼"], error["값"]) for error in errors) == [
+        (3, "단가", "가격 미정"),
+        (3, "신청시간", "어제"),
+        (4, "수량", "두 권"),
+    ]
+
+
+def test_missing_columns_are_skipped():
+    df, errors = apply_record_schema(pd.DataFrame({"_row": [2], "도서명": ["책"]}))
+    assert list(df.columns) == ["_row", "도서명"] and errors == []
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+from row_index import ID_HEADER, RowIndex, ensure_id_header, row_from_response
+
+
+class FakeWorksheet:
+    """행 목록으로 된 시트 (읽기 횟수를 셈)"""
+
+    def __init__(self, rows):
+        self.rows = [list(row) for row in rows]
+        self.reads = 0
+
+    def cell(self, row, col):
+        self.reads += 1
+        cells = self.rows[row - 1] if row <= len(self.rows) else []
+        return SimpleNamespace(value=cells[col - 1] if col <= len(cells) else None)
+
+    def col_values(self, col):
+        self.reads += 1
+        values = [row[col - 1] if col <= len(row) else "" for row in self.rows]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def update_cell(self, row, col, value):
+        cells = self.rows[row - 1]
+        cells.extend([""] * (col - len(cells)))
+        cells[col - 1] = value
+
+
+def test_header_is_added_to_sheet_without_id_column():
+    sheet = FakeWorksheet([["신청시간", "도서명"], ["2024-03-01", "책1"]])
+    assert ensure_id_header(sheet, 3) is True
+    assert sheet.rows[0] == ["신청시간", "도서명", ID_HEADER]
+    assert ensure_id_header(sheet, 3) is False
+
+
+def test_row_from_response():
+    assert row_from_response({"updates": {"updatedRange": "시트1!A5:J5"}}) == 5
+    assert row_from_response({"updates": {"updatedRange": "'신청 내역'!A12"}}) == 12
+    assert row_from_response({}) is None
+
+
+def test_resolve_follows_moved_rows():
+    sheet = FakeWorksheet([["ID"], ["a"], ["b"], [""], ["c"]])
+    index = RowIndex(1)
+    assert index.resolve(sheet, "c") == 5
+    assert index.rows == {"a": 2, "b": 3, "c": 5}
+
+    # 앞의 행이 지워져서 c가 위로 이동
+    del sheet.rows[1]
+    assert index.resolve(sheet, "c") == 4
+    assert index.resolve(sheet, "a") is None
+
+
+def test_resolve_checks_only_the_id_cell_when_row_is_unchanged():
+    sheet = FakeWorksheet([["ID"], ["a"], ["b"]])
+    index = RowIndex(1)
+    index.load(sheet)
+    sheet.reads = 0
+    assert index.resolve(sheet, "b") == 3
+    assert sheet.reads == 1
+
+
+def test_register_uses_append_response():
+    sheet = FakeWorksheet([["ID"], ["a"]])
+    index = RowIndex(1)
+    index.load(sheet)
+    assert index.register("b", {"updates": {"updatedRange": "시트1!A3:J3"}}) == 3
+    assert index.rows["b"] == 3 and index.loaded
+
+    # 행 번호를 알 수 없으면 다음 조회 때 ID 컬럼을 다시 읽음
+    assert index.register("c", {}) is None
+    assert not index.loaded
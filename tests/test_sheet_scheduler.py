@@ -0,0 +1,184 @@
+import threading
+import time
+
+import pytest
+
+import sheet_scheduler
+from sheet_scheduler import BACKGROUND, READ, SheetScheduler
+
+
+class Throttled(Exception):
+    """gspread APIError처럼 response.status_code가 429인 오류"""
+
+    class response:
+        status_code = 429
+
+
+class FakeWorksheet:
+    """호출을 기록하는 시트 (hold()로 스케줄러 스레드를 잡아 둘 수 있음)"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = []  # 앞에서부터 하나씩 꺼내서 던질 오류
+
+    def _call(self, name, *args):
+        self.calls.append((name, *args))
+        if self.fail:
+            raise self.fail.pop(0)
+
+    def hold(self):
+        self.calls.append(("hold",))
+        self.started.set()
+        self.release.wait(5)
+
+    def col_values(self, col):
+        self._call("col_values", col)
+        return [f"값{col}"]
+
+    def batch_update(self, data, value_input_option="RAW"):
+        self._call("batch_update", data, value_input_option)
+        return {"updated": len(data)}
+
+    def append_rows(self, rows):
+        self._call("append_rows", rows)
+        return {"updates": {"updatedRange": f"시트1!A5:C{4 + len(rows)}"}}
+
+
+@pytest.fixture
+def sheet():
+    return FakeWorksheet()
+
+
+def hold_scheduler(scheduler, sheet):
+    """스케줄러 스레드가 hold()에서 멈출 때까지 기다림 (그동안 넣은 요청은 대기열에 쌓임)"""
+    future = scheduler.write(sheet.hold)
+    assert sheet.started.wait(5)
+    return future
+
+
+def submit(fn):
+    """fn()을 다른 스레드에서 호출 (결과를 기다리는 세션 흉내)"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", fn()))
+    thread.start()
+    return thread, result
+
+
+def wait_pending(scheduler, count):
+    deadline = time.monotonic() + 5
+    while sum(scheduler.stats()["depth"].values()) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_queued_cell_updates_merge_into_one_batch_update(sheet):
+    scheduler = SheetScheduler(sheet)
+    proxy = scheduler.worksheet()
+    hold_scheduler(scheduler, sheet)
+    threads = [submit(lambda row=row: proxy.update_cell(row, 2, row * 10)) for row in (2, 3, 4)]
+    wait_pending(scheduler, 3)
+    sheet.release.set()
+    for thread, _ in threads:
+        thread.join(5)
+
+    updates = [call for call in sheet.calls if call[0] == "batch_update"]
+    assert len(updates) == 1
+    assert [item["range"] for item in updates[0][1]] == ["B2", "B3", "B4"]
+    assert updates[0][2] == "USER_ENTERED"
+    assert all(result["value"] == {"updated": 3} for _, result in threads)
+    assert scheduler.stats()["merged"] == 2
+
+
+def test_identical_reads_are_coalesced(sheet):
+    scheduler = SheetScheduler(sheet)
+    proxy = scheduler.worksheet()
+    hold_scheduler(scheduler, sheet)
+    threads = [submit(lambda: proxy.col_values(1)) for _ in range(3)]
+    deadline = time.monotonic() + 5
+    while scheduler.stats()["coalesced"] < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    sheet.release.set()
+    for thread, _ in threads:
+        thread.join(5)
+
+    assert sheet.calls.count(("col_values", 1)) == 1
+    assert all(result["value"] == ["값1"] for _, result in threads)
+
+
+def test_appended_rows_merge_and_get_their_own_ranges(sheet):
+    scheduler = SheetScheduler(sheet)
+    proxy = scheduler.worksheet()
+    hold_scheduler(scheduler, sheet)
+    threads = [submit(lambda i=i: proxy.append_row([f"id{i}", "책"])) for i in range(3)]
+    wait_pending(scheduler, 3)
+    sheet.release.set()
+    for thread, _ in threads:
+        thread.join(5)
+
+    appends = [call for call in sheet.calls if call[0] == "append_rows"]
+    assert len(appends) == 1 and len(appends[0][1]) == 3
+    ranges = sorted(result["value"]["updates"]["updatedRange"] for _, result in threads)
+    assert ranges == ["시트1!A5", "시트1!A6", "시트1!A7"]
+
+
+def test_writes_go_before_waiting_reads(sheet):
+    scheduler = SheetScheduler(sheet)
+    hold_scheduler(scheduler, sheet)
+    reads = [scheduler.read(("col_values", 1), lambda: sheet.col_values(1), BACKGROUND),
+             scheduler.read(("col_values", 2), lambda: sheet.col_values(2), READ)]
+    write = scheduler.write(lambda: sheet.batch_update([], "RAW"))
+    sheet.release.set()
+    write.result(5)
+    for future in reads:
+        future.result(5)
+
+    assert [call[0:2] for call in sheet.calls[1:]] == [
+        ("batch_update", []), ("col_values", 2), ("col_values", 1)]
+
+
+def test_throttled_request_is_retried_after_cooldown(sheet, monkeypatch):
+    monkeypatch.setattr(sheet_scheduler, "THROTTLE_COOLDOWN", 0.3)
+    scheduler = SheetScheduler(sheet)
+    sheet.fail = [Throttled()]
+    started = time.monotonic()
+    assert scheduler.worksheet().col_values(1) == ["값1"]
+
+    assert time.monotonic() - started >= 0.3
+    assert sheet.calls == [("col_values", 1), ("col_values", 1)]
+    stats = scheduler.stats()
+    assert stats["throttled"] == 1 and stats["failed"] == 0
+
+
+def test_throttled_twice_raises_to_caller(sheet, monkeypatch):
+    monkeypatch.setattr(sheet_scheduler, "THROTTLE_COOLDOWN", 0.05)
+    scheduler = SheetScheduler(sheet)
+    sheet.fail = [Throttled(), Throttled()]
+    with pytest.raises(Throttled):
+        scheduler.worksheet().col_values(1)
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_reads_wait_for_quota_window(sheet, monkeypatch):
+    monkeypatch.setattr(sheet_scheduler, "QUOTA_WINDOW", 0.3)
+    scheduler = SheetScheduler(sheet, reads_per_minute=2)
+    proxy = scheduler.worksheet()
+    started = time.monotonic()
+    for col in (1, 2, 3):
+        proxy.col_values(col)
+    assert time.monotonic() - started >= 0.3
+    assert scheduler.stats()["used"]["read"][1] == 2
+
+
+def test_unsent_write_is_cancelled_on_timeout(sheet, monkeypatch):
+    monkeypatch.setattr(sheet_scheduler, "WAIT_TIMEOUT", 0.1)
+    scheduler = SheetScheduler(sheet)
+    held = hold_scheduler(scheduler, sheet)
+    with pytest.raises(TimeoutError):
+        scheduler.worksheet().update_cell(2, 2, "x")
+    sheet.release.set()
+    held.result(5)
+    time.sleep(0.1)
+    assert not any(call[0] == "batch_update" for call in sheet.calls)
@@ -0,0 +1,133 @@
+import sqlite3
+
+import pytest
+import requests
+from gspread.exceptions import APIError
+
+from submission_queue import SubmissionQueue, is_sheet_unavailable, replay
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = "error"
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": "error", "status": "ERROR"}}
+
+
+class FakeWorksheet:
+    """신청ID 컬럼과 append_row만 흉내 내는 시트 (errors: 신청ID → append_row에서 던질 오류)"""
+
+    def __init__(self, ids=(), errors=None):
+        self.rows = [["신청ID"]] + [[app_id] for app_id in ids]
+        self.errors = errors or {}
+
+    def col_values(self, col):
+        return [row[0] for row in self.rows]
+
+    def append_row(self, values):
+        error = self.errors.get(values[0])
+        if error is not None:
+            raise error
+        self.rows.append(list(values))
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SubmissionQueue(str(tmp_path / "queue.sqlite3"))
+
+
+def test_put_is_idempotent_and_keeps_order(queue):
+    queue.put("b", ["b", "책2"])
+    queue.put("a", ["a", "책1"])
+    queue.put("b", ["b", "다른 행"])
+    assert [entry["app_id"] for entry in queue.pending()] == ["b", "a"]
+    assert queue.pending()[0]["row"] == ["b", "책2"]
+    assert len(queue) == 2
+
+
+def test_replay_appends_in_order_and_skips_existing(queue):
+    for app_id in ("a", "b", "c"):
+        queue.put(app_id, [app_id])
+    sheet = FakeWorksheet(ids=["b"])
+    result = replay(queue, sheet, 1)
+    assert result == {"applied": 2, "skipped": 1, "rejected": 0, "remaining": 0, "error": None}
+    assert [row[0] for row in sheet.rows[1:]] == ["b", "a", "c"]
+    assert len(queue) == 0
+
+
+def test_replay_stops_when_sheet_unavailable(queue):
+    for app_id in ("a", "b", "c"):
+        queue.put(app_id, [app_id])
+    sheet = FakeWorksheet(errors={"b": requests.exceptions.ConnectionError("down")})
+    result = replay(queue, sheet, 1)
+    assert result["applied"] == 1 and result["rejected"] == 0
+    assert result["remaining"] == 2 and "down" in result["error"]
+    # 순서를 지키기 위해 b 뒤의 c도 보내지 않음
+    pending = queue.pending()
+    assert [entry["app_id"] for entry in pending] == ["b", "c"]
+    assert pending[0]["attempts"] == 1
+    assert queue.failed_count() == 0
+
+
+def test_replay_rejects_bad_row_and_continues(queue):
+    for app_id in ("a", "b", "c"):
+        queue.put(app_id, [app_id])
+    sheet = FakeWorksheet(errors={"a": APIError(FakeResponse(400))})
+    result = replay(queue, sheet, 1)
+    assert result["applied"] == 2 and result["rejected"] == 1 and result["remaining"] == 0
+    assert [row[0] for row in sheet.rows[1:]] == ["b", "c"]
+    assert len(queue) == 0
+    assert queue.failed_count() == 1
+    assert queue.failed_entries()[0]["app_id"] == "a"
+
+
+def test_retry_failed_restores_entries(queue):
+    queue.put("a", ["a"])
+    queue.put("b", ["b"])
+    queue.reject("a", "bad row")
+    assert len(queue) == 1 and queue.failed_count() == 1
+    assert queue.retry_failed() == 1
+    assert [entry["app_id"] for entry in queue.pending()] == ["a", "b"]
+    assert queue.failed_count() == 0
+
+
+def test_replay_keeps_entries_when_id_column_unreadable(queue):
+    queue.put("a", ["a"])
+
+    class Unreadable(FakeWorksheet):
+        def col_values(self, col):
+            raise TimeoutError("quota")
+
+    result = replay(queue, Unreadable(), 1)
+    assert result["applied"] == 0 and result["remaining"] == 1 and "quota" in result["error"]
+    assert queue.last_error == result["error"]
+
+
+def test_migrates_queue_without_status_column(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE submissions (seq INTEGER PRIMARY KEY AUTOINCREMENT, app_id TEXT UNIQUE,"
+        " row_json TEXT, queued_at REAL, attempts INTEGER DEFAULT 0, last_error TEXT)"
+    )
+    conn.execute("INSERT INTO submissions (app_id, row_json, queued_at) VALUES ('a', '[\"a\"]', 0)")
+    conn.commit()
+    conn.close()
+
+    queue = SubmissionQueue(path)
+    assert [entry["app_id"] for entry in queue.pending()] == ["a"]
+    assert queue.failed_count() == 0
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (requests.exceptions.ConnectionError("down"), True),
+    (TimeoutError("quota"), True),
+    (APIError(FakeResponse(429)), True),
+    (APIError(FakeResponse(503)), True),
+    (APIError(FakeResponse(400)), False),
+    (ValueError("bad"), False),
+])
+def test_is_sheet_unavailable(exc, expected):
+    assert is_sheet_unavailable(exc) is expected
@@ -0,0 +1,48 @@
+from title_index import TitleIndex, normalize_text
+
+BOOKS = [
+    {"title": "파이썬 알고리즘 인터뷰", "author": "박상길", "publisher": "책만", "price": "34200", "url": "u1"},
+    {"title": "파이썬 코딩의 기술", "author": "브렛 슬라킨", "publisher": "길벗", "price": "", "url": "u2"},
+    {"title": "데이터 중심 애플리케이션 설계", "author": "마틴 클레프만", "publisher": "위키북스", "price": "36000", "url": "u3"},
+    {"title": "파이썬 코딩의 기술", "author": "브렛 슬라킨", "publisher": "", "price": "32000", "url": ""},
+    {"title": "", "author": "제목 없음"},
+]
+
+
+def titles(results):
+    return [book["title"] for book in results]
+
+
+def test_duplicates_are_merged_and_blank_titles_dropped():
+    index = TitleIndex(BOOKS)
+    assert len(index) == 3
+    book = index.prefix("파이썬 코딩")[0]
+    # 비어 있던 값은 같은 책의 다른 행에서 채움
+    assert book["publisher"] == "길벗" and book["price"] == "32000" and book["url"] == "u2"
+
+
+def test_prefix_ignores_spacing_and_case():
+    index = TitleIndex(BOOKS)
+    assert titles(index.prefix("파이썬")) == ["파이썬 알고리즘 인터뷰", "파이썬 코딩의 기술"]
+    assert titles(index.prefix("파이썬코딩")) == ["파이썬 코딩의 기술"]
+    assert titles(index.prefix("마틴")) == ["데이터 중심 애플리케이션 설계"]
+    assert index.prefix("") == []
+    assert titles(index.prefix("파이썬", limit=1)) == ["파이썬 알고리즘 인터뷰"]
+
+
+def test_search_finds_typos_and_substrings():
+    index = TitleIndex(BOOKS)
+    assert titles(index.search("데이타 중심 애플리케이션"))[0] == "데이터 중심 애플리케이션 설계"
+    assert titles(index.search("애플리케이션 설계"))[0] == "데이터 중심 애플리케이션 설계"
+    assert index.search("전혀 다른 검색어") == []
+
+
+def test_search_puts_prefix_matches_first():
+    index = TitleIndex(BOOKS)
+    results = titles(index.search("파이썬 코딩"))
+    assert results[0] == "파이썬 코딩의 기술"
+    assert len(results) == len(set(results))
+
+
+def test_normalize_text():
+    assert normalize_text("  Python  CookBook! ") == normalize_text("pythoncookbook")
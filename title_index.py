@@ -0,0 +1,124 @@
+"""
+도서명/저자명 메모리 인덱스 (직접입력 자동완성용)
+
+신청 시트와 로컬 캐시에 있는 도서를 모아서 정규화한 도서명/저자명으로
+  - 접두어 검색: 정렬된 키 목록 + 이진 탐색
+  - 유사 검색: 2-gram 역색인으로 후보를 모은 뒤 Dice 계수로 순위
+를 한다. 수만 건에서도 검색 한 번이 몇 ms 안에 끝나도록 만들 때 한 번만 색인한다.
+"""
+import bisect
+import re
+from collections import Counter
+
+NGRAM = 2
+
+BOOK_FIELDS = ["title", "author", "publisher", "price", "url"]
+
+
+def normalize_text(value):
+    """대소문자/공백/문장부호 차이를 없앤 검색용 문자열"""
+    return re.sub(r"[\W_]+", "", str(value or "")).lower()
+
+
+def ngrams(text, n=NGRAM):
+    """정규화된 문자열의 n-gram 집합 (n보다 짧으면 문자열 자체)"""
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class TitleIndex:
+    """도서 정보 목록 → 도서명/저자명 검색 인덱스"""
+
+    def __init__(self, books=()):
+        self.entries = []     # 도서 정보 dict
+        self._keys = []       # (정규화 문자열, 도서 번호, n-gram 수)
+        self._sorted = []     # 접두어 검색용 (정규화 문자열, 키 번호) 정렬 목록
+        self._postings = {}   # n-gram → 키 번호 목록
+
+        seen = {}
+        for book in books:
+            title = str(book.get("title") or "").strip()
+            if not title:
+                continue
+            entry = {field: str(book.get(field) or "").strip() for field in BOOK_FIELDS}
+            ident = (normalize_text(title), normalize_text(entry["author"]))
+            if ident in seen:
+                # 같은 책이면 비어 있는 값만 채움
+                existing = self.entries[seen[ident]]
+                for field in BOOK_FIELDS:
+                    existing[field] = existing[field] or entry[field]
+                continue
+            seen[ident] = len(self.entries)
+            self.entries.append(entry)
+
+        for entry_id, entry in enumerate(self.entries):
+            for field in ("title", "author"):
+                key = normalize_text(entry[field])
+                if not key:
+                    continue
+                grams = ngrams(key)
+                key_id = len(self._keys)
+                self._keys.append((key, entry_id, len(grams)))
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(key_id)
+        self._sorted = sorted((key, key_id) for key_id, (key, _, _) in enumerate(self._keys))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def prefix(self, query, limit=10):
+        """정규화한 도서명/저자명이 query로 시작하는 도서"""
+        query = normalize_text(query)
+        if not query:
+            return []
+        results, seen = [], set()
+        start = bisect.bisect_left(self._sorted, (query,))
+        for key, key_id in self._sorted[start:]:
+            if not key.startswith(query):
+                break
+            entry_id = self._keys[key_id][1]
+            if entry_id not in seen:
+                seen.add(entry_id)
+                results.append(self.entries[entry_id])
+                if len(results) >= limit:
+                    break
+        return results
+
+    def search(self, query, limit=10, min_score=0.3):
+        """
+        접두어 일치를 먼저, 그다음 2-gram 유사도(Dice) 순으로 도서 반환
+        오타나 띄어쓰기가 달라도 찾을 수 있다
+        """
+        query = normalize_text(query)
+        if not query:
+            return []
+        results = self.prefix(query, limit)
+        if len(results) >= limit:
+            return results
+
+        # 유사 검색: 쿼리 n-gram이 들어 있는 키마다 겹친 수를 센다
+        query_grams = ngrams(query)
+        overlap = Counter()
+        for gram in query_grams:
+            overlap.update(self._postings.get(gram, ()))
+
+        scores = {}
+        for key_id, common in overlap.items():
+            key, entry_id, key_grams = self._keys[key_id]
+            score = 2 * common / (len(query_grams) + key_grams)
+            # 긴 도서명 안에 쿼리가 통째로 들어 있으면 부분 일치로 점수 보정
+            if query in key:
+                score = max(score, 0.9)
+            if score >= min_score and score > scores.get(entry_id, 0):
+                scores[entry_id] = score
+
+        seen = {id(entry) for entry in results}
+        for entry_id, _ in sorted(scores.items(), key=lambda item: -item[1]):
+            entry = self.entries[entry_id]
+            if id(entry) in seen:
+                continue
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results